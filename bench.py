@@ -0,0 +1,302 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# 沒有螢幕也能跑繪圖的部分
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from grid import np
+from bitgrid import BitGrid
+from mazegen import generate_perfect_maze, generate_eller_maze, add_extra_paths
+from reach import is_reachable, ensure_exit_reachable
+from placement import PlacementPlanner
+from hpa import HierarchicalMap
+from levels import build_layout
+from mazebank import MazeBank, build_bank
+from flowfield import DistanceField
+from game import MazeGame, MOVES, CHASE_RADIUS
+
+# ---------------------- 效能基準 ----------------------
+# python bench.py                         跑全部，結果寫到 bench_results.json
+# python bench.py --sizes 101x101 --no-render
+# python bench.py --baseline old.json     和舊結果比較，變慢超過門檻就以 1 結束
+#
+# 每個項目跑 --repeat 次，每次呼叫前的準備（複製迷宮等）不計時；
+# 比較時用中位數，最小值只供參考。
+
+DEFAULT_SIZES = "24x36,101x101,301x301"
+
+def parse_size(text):
+    rows, _, cols = text.partition("x")
+    return int(rows), int(cols or rows)
+
+def measure(fn, setup=None, repeat=5):
+    """Run fn(setup()) `repeat` times; returns per-call times in ms."""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(arg)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+def summarize(times, ops=1):
+    # ops：一次呼叫裡做了幾次操作（例如 1000 步 move_player），換算成每次操作的時間
+    return {
+        'median_ms': statistics.median(times) / ops,
+        'min_ms': min(times) / ops,
+        'runs': len(times),
+        'ops': ops,
+    }
+
+# ---------------------- 項目 ----------------------
+def bench_grid(rows, cols, repeat, seed):
+    """Generation, reachability and placement on one grid size."""
+    rng = random.Random(seed)
+    results = {}
+    name = "%dx%d" % (rows, cols)
+
+    results['generate_perfect_maze[%s]' % name] = summarize(measure(
+        lambda _: generate_perfect_maze(rows, cols, rng=rng), repeat=repeat))
+
+    results['generate_eller_maze[%s]' % name] = summarize(measure(
+        lambda _: generate_eller_maze(rows, cols, rng=rng), repeat=repeat))
+
+    perfect = generate_perfect_maze(rows, cols, rng=rng)
+    results['add_extra_paths[%s]' % name] = summarize(measure(
+        lambda maze: add_extra_paths(maze, rng=rng),
+        setup=lambda: copy.deepcopy(perfect), repeat=repeat))
+
+    with_paths = copy.deepcopy(perfect)
+    add_extra_paths(with_paths, rng=rng)
+    results['ensure_exit_reachable[%s]' % name] = summarize(measure(
+        lambda maze: ensure_exit_reachable(maze, rng),
+        setup=lambda: copy.deepcopy(with_paths), repeat=repeat))
+
+    # 出口被牆圍住：量打通牆的那條路徑
+    walled = copy.deepcopy(with_paths)
+    for dr, dc in ((0, 0), (-1, 0), (0, -1)):
+        walled[rows - 2 + dr][cols - 2 + dc] = 1
+    results['ensure_exit_reachable_walled[%s]' % name] = summarize(measure(
+        lambda maze: ensure_exit_reachable(maze, rng),
+        setup=lambda: copy.deepcopy(walled), repeat=repeat))
+
+    maze = copy.deepcopy(with_paths)
+    exit_pos = ensure_exit_reachable(maze, rng)
+    results['is_reachable[%s]' % name] = summarize(measure(
+        lambda _: is_reachable(maze, 1, 1, exit_pos['x'], exit_pos['y']), repeat=repeat))
+    packed = BitGrid.from_rows(maze)
+    results['is_reachable_packed[%s]' % name] = summarize(measure(
+        lambda _: is_reachable(packed, 1, 1, exit_pos['x'], exit_pos['y']), repeat=repeat))
+
+    # 階層式尋路：建圖、第一次（要算塊內步數）與之後的查詢，以及牆變動後的局部重算
+    start, goal = (1, 1), (exit_pos['x'], exit_pos['y'])
+    results['hpa_build[%s]' % name] = summarize(measure(
+        lambda _: HierarchicalMap(maze), repeat=repeat))
+    results['hpa_distance_cold[%s]' % name] = summarize(measure(
+        lambda graph: graph.distance(start, goal), setup=lambda: HierarchicalMap(maze), repeat=repeat))
+    graph = HierarchicalMap(maze)
+    graph.distance(start, goal)
+    results['hpa_distance_warm[%s]' % name] = summarize(measure(
+        lambda _: graph.distance(start, goal), repeat=repeat))
+    graph.is_reachable(start, goal)
+    results['is_reachable_hpa_warm[%s]' % name] = summarize(measure(
+        lambda _: is_reachable(maze, 1, 1, exit_pos['x'], exit_pos['y'], graph), repeat=repeat))
+
+    def graph_of_copy():
+        walls = copy.deepcopy(perfect)
+        return HierarchicalMap(walls), walls
+
+    def reabstract(args):
+        graph, walls = args
+        add_extra_paths(walls, rng=rng, on_change=graph.update)
+    results['hpa_update_extra_paths[%s]' % name] = summarize(measure(
+        reabstract, setup=graph_of_copy, repeat=repeat))
+
+    def place(_):
+        planner = PlacementPlanner(maze, (1, 1), (exit_pos['x'], exit_pos['y']), rng=rng)
+        planner.place_pairs(2)
+        planner.place_single()
+    results['placement[%s]' % name] = summarize(measure(place, repeat=repeat))
+
+    # 整關配置：當場產生 vs 從題庫（mmap）讀出
+    results['build_layout[%s]' % name] = summarize(measure(
+        lambda _: build_layout(rows, cols, 3, rng.getrandbits(63), (1, 1)), repeat=repeat))
+    results['build_layout_chunked[%s]' % name] = summarize(measure(
+        lambda _: build_layout(rows, cols, 3, rng.getrandbits(63), (1, 1), chunked=True)['maze'].close(),
+        repeat=repeat))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.bank")
+        build_bank(path, rows, cols, repeat, levels=(3,), seed=seed, workers=1)
+        with MazeBank(path) as bank:
+            indices = iter(range(repeat))
+            results['bank_layout[%s]' % name] = summarize(measure(
+                bank.layout, setup=lambda: next(indices), repeat=repeat))
+    return results
+
+def bench_moves(rows, cols, repeat, seed, steps=1000):
+    """move_player random walk, stepping onto a trap (teleport), and the distance fields."""
+    results = {}
+    name = "%dx%d" % (rows, cols)
+    game = MazeGame(rows, cols, level=3, seed=seed)
+    game.generate_maze()
+    rng = random.Random(seed)
+    actions = [rng.choice(list(MOVES.values())) for _ in range(steps)]
+
+    def walk(_):
+        for dx, dy in actions:
+            game.move_player(dx, dy)
+            game.quiz_active = False  # 撞到問答怪就當作答完，繼續走
+    results['move_player[%s]' % name] = summarize(measure(walk, repeat=repeat), ops=steps)
+
+    # 每次都把玩家放到一個陷阱旁邊再踩上去
+    floor = [(r, c) for r in range(1, rows - 1) for c in range(1, cols - 1)
+             if game.maze[r][c] == 0 and game.maze[r][c + 1] == 0]
+
+    def setup_trap():
+        r, c = rng.choice(floor)
+        trap = (r, c + 1)
+        if trap not in game.traps:
+            game.traps.add(trap)
+            game.occupancy.add(trap, 'trap', trap)
+            game.teleport_cells.remove(trap)
+        game.player['x'], game.player['y'] = r, c
+        game.quiz_active = False
+        return trap
+
+    def teleport(trap):
+        game.move_player(0, 1)
+    results['move_player_teleport[%s]' % name] = summarize(
+        measure(teleport, setup=setup_trap, repeat=max(repeat, 50)))
+
+    # 出口距離場（每張迷宮一次），以及追人模式下每次怪物移動要重算的限半徑距離場
+    exit_cell = (game.exit_pos['x'], game.exit_pos['y'])
+    results['exit_field[%s]' % name] = summarize(measure(
+        lambda _: DistanceField(game.maze, exit_cell), repeat=repeat))
+    results['chase_field[%s]' % name] = summarize(measure(
+        lambda cell: DistanceField(game.maze, cell, radius=CHASE_RADIUS),
+        setup=lambda: rng.choice(floor), repeat=max(repeat, 50)))
+    return results
+
+def bench_render(repeat, seed, frames=60, world=(301, 301)):
+    """draw_game for each level, warm (cached layers), cold (new maze) and scrolling a big world."""
+    import pygame
+    import main
+    main.init_display()
+    results = {}
+    for level in (1, 2, 3):
+        game = MazeGame(main.ROWS, main.COLS, level=level, seed=seed)
+        game.on_explore = main.reveal_fog_cell
+        game.generate_maze()
+        main.game = game
+        fn = main.draw_game if level == 1 else main.draw_limited_view
+        label = 'draw_game' if level == 1 else 'draw_limited_view'
+        main.draw_game()  # 先建好快取
+
+        def warm(_):
+            for _ in range(frames):
+                main.draw_game()
+        results['draw_game_warm[level%d]' % level] = summarize(measure(warm, repeat=repeat), ops=frames)
+
+        def cold(_):
+            game.maze_version += 1  # 迫使靜態圖層與迷霧重建
+            fn()
+        results['%s_cold[level%d]' % (label, level)] = summarize(measure(cold, repeat=max(repeat, 20)))
+
+        def only(_):
+            for _ in range(frames):
+                fn()
+        results['%s_warm[level%d]' % (label, level)] = summarize(measure(only, repeat=repeat), ops=frames)
+
+    # 比視窗大的迷宮：鏡頭每幀跟著玩家往右下移一格，區塊快取會陸續補新區塊
+    rows, cols = world
+    for level in (1, 2, 3):
+        game = MazeGame(rows, cols, level=level, seed=seed)
+        game.on_explore = main.reveal_fog_cell
+        game.generate_maze()
+        main.game = game
+        path = [(rows // 4 + k, cols // 4 + k) for k in range(frames)]
+
+        def scroll(_):
+            for r, c in path:
+                game.player['x'], game.player['y'] = r, c
+                main.draw_game()
+        results['draw_game_scroll[level%d %dx%d]' % (level, rows, cols)] = summarize(
+            measure(scroll, repeat=repeat), ops=frames)
+    pygame.quit()
+    return results
+
+# ---------------------- 輸出與比較 ----------------------
+def metadata():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__ if np is not None else None,
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def compare(results, baseline, threshold):
+    """Print median changes vs `baseline`; returns the names that got slower than threshold."""
+    regressions = []
+    print("\n%-44s %12s %12s %8s" % ("benchmark", "baseline ms", "now ms", "change"))
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        old = baseline[name]['median_ms']
+        new = results[name]['median_ms']
+        change = (new - old) / old if old > 0 else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print("%-44s %12.4f %12.4f %+7.1f%%%s" % (name, old, new, change * 100, flag))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maze game benchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated ROWSxCOLS list")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-render", action="store_true", help="skip the pygame drawing benchmarks")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file to write ('-' for none)")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes.split(","):
+        rows, cols = parse_size(size.strip())
+        results.update(bench_grid(rows, cols, args.repeat, args.seed))
+        results.update(bench_moves(rows, cols, args.repeat, args.seed))
+    if not args.no_render:
+        results.update(bench_render(args.repeat, args.seed))
+
+    for name in sorted(results):
+        r = results[name]
+        print("%-44s median %10.4f ms   min %10.4f ms" % (name, r['median_ms'], r['min_ms']))
+
+    if args.output != "-":
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n%d benchmark(s) slower than %.0f%%" % (len(regressions), args.threshold * 100))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
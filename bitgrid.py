@@ -0,0 +1,173 @@
+# ---------------------- 位元格子 ----------------------
+# 一格一個 bit 的二維格子：每列補齊到整數個 byte，高位元在前（和 mazebank 的牆面
+# 位元圖同一種排列）。list of lists 每格要 8 bytes 的指標，這裡只要 1/8 byte。
+#
+# grid[r][c] 仍然可以讀寫（列是一個小小的 view），方便沿用舊程式；熱迴圈則直接用
+# bits 與 stride 算 flat bit index：i = r*stride + c，bits[i >> 3] & (128 >> (i & 7))。
+
+ONE_BITS = [tuple(k for k in range(8) if b & (128 >> k)) for b in range(256)]  # byte -> 1 的位置
+_BITS = [bytes((b >> (7 - k)) & 1 for k in range(8)) for b in range(256)]  # byte -> 8 個 0/1
+_ASCII01 = bytes.maketrans(b"\x00\x01", b"01")
+
+def pack_rows(rows, cols):
+    """Pack rows of 0/1 values (any iterables) into byte-aligned MSB-first bit rows."""
+    row_bytes = (cols + 7) // 8
+    pad = b"0" * (row_bytes * 8 - cols)
+    out = bytearray()
+    for row in rows:
+        # 一列 0/1 -> "0101..." -> 一個大整數 -> bytes
+        out += int(bytes(row).translate(_ASCII01) + pad, 2).to_bytes(row_bytes, "big")
+    return out
+
+def unpack_rows(buf, rows, cols):
+    """Inverse of pack_rows: a list of lists of 0/1."""
+    flat = b"".join(map(_BITS.__getitem__, buf))
+    stride = (cols + 7) // 8 * 8
+    return [list(flat[r*stride:r*stride + cols]) for r in range(rows)]
+
+class _BitRow:
+    # grid[r] 回傳的 view：grid[r][c] 讀寫同一份 bits
+    __slots__ = ('bits', 'base', 'cols')
+
+    def __init__(self, bits, base, cols):
+        self.bits, self.base, self.cols = bits, base, cols
+
+    def __len__(self):
+        return self.cols
+
+    def __getitem__(self, c):
+        return self.bits[self.base + (c >> 3)] >> (7 - (c & 7)) & 1
+
+    def __setitem__(self, c, value):
+        if value:
+            self.bits[self.base + (c >> 3)] |= 128 >> (c & 7)
+        else:
+            self.bits[self.base + (c >> 3)] &= ~(128 >> (c & 7)) & 255
+
+    def __iter__(self):
+        bits, base = self.bits, self.base
+        return (bits[base + (c >> 3)] >> (7 - (c & 7)) & 1 for c in range(self.cols))
+
+class BitGrid:
+    """rows x cols grid of bits in a bytearray; grid[r][c] works like a list of lists."""
+
+    def __init__(self, rows, cols, fill=0, bits=None):
+        self.rows, self.cols = rows, cols
+        self.row_bytes = (cols + 7) // 8
+        self.stride = self.row_bytes * 8  # bits per row, for flat indices
+        if bits is None:
+            bits = bytearray(rows * self.row_bytes)
+        elif len(bits) != rows * self.row_bytes:
+            raise ValueError("expected %d bytes for a %dx%d grid" % (rows * self.row_bytes, rows, cols))
+        self.bits = bits
+        self._views = [_BitRow(bits, r * self.row_bytes, cols) for r in range(rows)]
+        if fill:
+            self.fill(fill)
+
+    @classmethod
+    def from_rows(cls, rows, cols=None):
+        """Pack a list of lists (or other row sequence) of 0/1."""
+        cols = len(rows[0]) if cols is None else cols
+        return cls(len(rows), cols, bits=pack_rows(rows, cols))
+
+    @classmethod
+    def from_cells(cls, buf, rows, cols):
+        """Pack a row-major buffer with one 0/1 byte per cell."""
+        return cls(rows, cols, bits=pack_rows((buf[r*cols:(r+1)*cols] for r in range(rows)), cols))
+
+    # ---------------------- list of lists 相容 ----------------------
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, r):
+        return self._views[r]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __eq__(self, other):
+        if not isinstance(other, BitGrid):
+            return NotImplemented
+        return (self.rows, self.cols, self.bits) == (other.rows, other.cols, other.bits)
+
+    def __getstate__(self):
+        return self.rows, self.cols, self.bits
+
+    def __setstate__(self, state):
+        rows, cols, bits = state
+        self.__init__(rows, cols, bits=bits)
+
+    def copy(self):
+        return BitGrid(self.rows, self.cols, bits=bytearray(self.bits))
+
+    def tolist(self):
+        return unpack_rows(self.bits, self.rows, self.cols)
+
+    def tobytes(self):
+        return bytes(self.bits)
+
+    # ---------------------- 單格 ----------------------
+    def get(self, r, c):
+        i = r*self.stride + c
+        return self.bits[i >> 3] >> (7 - (i & 7)) & 1
+
+    def set(self, r, c, value=1):
+        self._views[r][c] = value
+
+    def test_and_set(self, r, c):
+        """Set (r, c) to 1; returns its previous value."""
+        i = r*self.stride + c
+        mask = 128 >> (i & 7)
+        old = self.bits[i >> 3] & mask
+        self.bits[i >> 3] |= mask
+        return 1 if old else 0
+
+    # ---------------------- 整列 / 整張 ----------------------
+    def fill(self, value):
+        # 重用同一塊記憶體（BFS 的暫存 visited 每次只要清一次）
+        n = len(self.bits)
+        self.bits[:] = (b"\xff" if value else b"\x00") * n
+        pad = self.stride - self.cols
+        if value and pad:
+            # 每列尾端補齊用的 bit 保持 0
+            keep = (0xff << pad) & 0xff
+            for k in range(self.row_bytes - 1, n, self.row_bytes):
+                self.bits[k] = keep
+
+    def clear(self):
+        self.fill(0)
+
+    def row_int(self, r):
+        """Row r as an int whose bit (cols-1-c) is cell c."""
+        base = r * self.row_bytes
+        return int.from_bytes(self.bits[base:base + self.row_bytes], "big") >> (self.stride - self.cols)
+
+    def ones(self, r, c0=0, c1=None):
+        """Columns c0 <= c < c1 of row r whose bit is 1 (whole zero bytes are skipped)."""
+        c1 = self.cols if c1 is None else min(c1, self.cols)
+        base = r * self.row_bytes
+        bits = self.bits
+        for k in range(c0 >> 3, (c1 + 7) >> 3):
+            b = bits[base + k]
+            if b:
+                for off in ONE_BITS[b]:
+                    c = (k << 3) + off
+                    if c0 <= c < c1:
+                        yield c
+
+    def zeros(self, r, c0=0, c1=None):
+        """Columns c0 <= c < c1 of row r whose bit is 0 (whole 0xff bytes are skipped)."""
+        c1 = self.cols if c1 is None else min(c1, self.cols)
+        base = r * self.row_bytes
+        bits = self.bits
+        for k in range(c0 >> 3, (c1 + 7) >> 3):
+            b = bits[base + k]
+            if b != 255:
+                for off in ONE_BITS[b ^ 255]:
+                    c = (k << 3) + off
+                    if c0 <= c < c1:
+                        yield c
+
+    def count(self):
+        """Number of 1 bits."""
+        return int.from_bytes(self.bits, "big").bit_count()
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flowfield import DistanceField
+from game import MazeGame, MOVES
+from hpa import HierarchicalMap
+from reach import is_reachable
+
+# ---------------------- 解題機器人 ----------------------
+# 不開視窗，直接用 MazeGame 的邏輯從第一關玩到第三關：沿距離場往目標走、碰到問答怪
+# 就作答（依 accuracy 答對）、第三關先去接小狗再送回起點，最後走到出口。
+# 大迷宮（packed）不建整張距離場：用 hpa.HierarchicalMap 判斷走不走得到、找一條路照著走，
+# 擋路的格子變了（小狗被接走）只在附近幾塊重算。
+# 很多局分給行程池一起跑，統計每一關的過關率、步數、問答次數與傳送次數。
+#
+# python bots.py --games 2000 --size 24x36
+# python bots.py --games 500 --accuracy 0.5 --chase --json report.json
+
+MAX_RESTARTS = 20  # 同一關重來這麼多次還過不了就算失敗
+
+_ACTIONS = {(-1, 0): 'up', (1, 0): 'down', (0, -1): 'left', (0, 1): 'right'}
+
+class SolverBot:
+    """Picks the next action for a MazeGame.
+
+    Normally the target's distance field, one O(1) lookup per step; on
+    packed mazes an HPA* route on the bot's own HierarchicalMap instead.
+    """
+
+    def __init__(self, game, accuracy=1.0, escort=True, rng=None):
+        self.game = game
+        self.accuracy = accuracy  # 答對的機率
+        self.escort = escort  # 第三關先去找小狗；False 就直接找出口（路上碰巧啟動了小狗還是得送牠回家）
+        self.rng = random.Random() if rng is None else rng
+        self._fields = {}  # (target, blocked) -> DistanceField, for the current maze
+        self._graph = None  # packed：小狗也算牆時自己的 HierarchicalMap
+        self._route = None  # packed：((target, blocked), path, i)
+        self._maze_version = None
+
+    def target(self):
+        game = self.game
+        puppy = game.puppy
+        if game.level == 3 and puppy is not None:
+            # 啟動了就回起點（牠的家），不然出口不讓過；還沒啟動就去找牠
+            if puppy['activated']:
+                return (1, 1)
+            if self.escort:
+                return puppy['pos']
+        return (game.exit_pos['x'], game.exit_pos['y'])
+
+    def _blocked(self, target):
+        game = self.game
+        if self._maze_version != game.maze_version:
+            self._fields.clear()
+            self._graph = self._route = None
+            self._maze_version = game.maze_version
+        # 情侶一直擋路；還沒啟動的小狗也擋路（目標就是牠的時候除外）
+        blocked = set().union(*(m['cells'] for m in game.monsters))
+        puppy = game.puppy
+        if puppy is not None and not puppy['activated'] and puppy['pos'] != target:
+            blocked.add(puppy['pos'])
+        return frozenset(blocked)
+
+    def _field(self, target):
+        blocked = self._blocked(target)
+        key = (target, blocked)
+        field = self._fields.get(key)
+        if field is None:
+            field = self._fields[key] = DistanceField(self.game.maze, target, blocked=blocked)
+        return field
+
+    def _route_step(self, r, c, target):
+        # packed：沿著快取的 HPA* 路線走；被傳送、換目標或擋路的格子變了才重找
+        key = (target, self._blocked(target))
+        route = self._route
+        if route is not None and route[0] == key:
+            _, path, i = route
+            if i + 1 < len(path) and path[i + 1] == (r, c):
+                i += 1
+            if path[i] == (r, c):
+                self._route = (key, path, i)
+                return (path[i + 1][0] - r, path[i + 1][1] - c)
+        # 只有情侶擋路時直接用遊戲建關時就建好的圖；小狗也擋路時才用自己的一份
+        graph = self.game.path_graph()
+        if graph.blocked != key[1]:
+            graph = self._graph
+            if graph is None:
+                graph = self._graph = HierarchicalMap(self.game.maze, blocked=key[1])
+            else:
+                graph.set_blocked(key[1])
+        if not is_reachable(self.game.maze, r, c, target[0], target[1], graph):
+            self._route = None
+            return None
+        path = graph.find_path((r, c), target)
+        self._route = (key, path, 0)
+        return (path[1][0] - r, path[1][1] - c)
+
+    def next_action(self):
+        """'up' / 'down' / 'left' / 'right', or None if the target cannot be reached."""
+        game = self.game
+        r, c = game.player['x'], game.player['y']
+        target = self.target()
+        if (r, c) == target:
+            # 已經站在目標上（例如答錯被送回起點，小狗要玩家「走」回家才算）：先離開一格
+            blocked = self._blocked(target)
+            for step in _ACTIONS:
+                nr, nc = r + step[0], c + step[1]
+                if 0 <= nr < game.rows and 0 <= nc < game.cols and game.maze[nr][nc] == 0 \
+                        and (nr, nc) not in blocked:
+                    return _ACTIONS[step]
+            return None
+        if game.packed:
+            step = self._route_step(r, c, target)
+        else:
+            step = self._field(target).direction(r, c)
+        return None if step is None else _ACTIONS[step]
+
+    def answer(self):
+        # 依 accuracy 決定答對還是亂答
+        quiz = self.game.quiz_current
+        correct = self.rng.random() < self.accuracy
+        return self.game.submit_answer(quiz['answer'] if correct else "?")
+
+def _new_level_stats(level):
+    return {'level': level, 'won': False, 'steps': 0, 'quizzes': 0, 'wrong': 0,
+            'teleports': 0, 'restarts': 0, 'time_ms': 0, 'puppy': None}
+
+def play_session(seed, rows=24, cols=36, accuracy=0.8, escort=True, chase=False, quiz_count=None,
+                 step_ms=100, max_steps=20000, packed=False):
+    """One bot session from level 1 to 3; returns {'seed', 'won', 'levels': [per-level stats]}."""
+    game = MazeGame(rows, cols, seed=seed, quiz_count=quiz_count, chase=chase, packed=packed)
+    game.generate_maze()
+    bot = SolverBot(game, accuracy, escort, random.Random(seed ^ 0x5eed))
+    stats = _new_level_stats(game.level)
+    levels = [stats]
+    level_start = game.time
+    while True:
+        if game.quiz_active:
+            stats['quizzes'] += 1
+            if not bot.answer():
+                stats['wrong'] += 1
+            continue
+        if 'next_maze' in game.timers:
+            # 過關後 2 秒才換成這一關真正的迷宮，等它
+            game.tick(step_ms)
+            continue
+        if game.show_victory:
+            # 第三關過關
+            stats['won'] = True
+            break
+        if stats['steps'] >= max_steps or stats['restarts'] >= MAX_RESTARTS:
+            break
+        action = bot.next_action()
+        if action is None:
+            # 走不到目標（被傳送到情侶擋住的死路裡）：像玩家一樣按 R 重來這一關
+            stats['restarts'] += 1
+            game.step('restart')
+            continue
+        level = game.level
+        dr, dc = MOVES[action]
+        ahead = (game.player['x'] + dr, game.player['y'] + dc)
+        trap = ahead if ahead in game.traps else None
+        game.step(action)
+        stats['steps'] += 1
+        if game.level != level:
+            # 走到出口：上一關結束，下一關從現在開始算
+            stats['won'] = True
+            stats['time_ms'] = game.time - level_start
+            stats = _new_level_stats(game.level)
+            levels.append(stats)
+            level_start = game.time
+            continue
+        if trap is not None and trap not in game.traps:
+            # 踩到陷阱才會把它用掉（換關時陷阱整批換掉，上面已經先處理）
+            stats['teleports'] += 1
+        if game.level == 3 and (bot.escort or game.puppy is None or game.puppy['activated']):
+            stats['puppy'] = game.puppy is None
+        game.tick(step_ms)
+    stats['time_ms'] = game.time - level_start
+    game.close()
+    return {'seed': seed, 'won': levels[-1]['level'] == 3 and levels[-1]['won'], 'levels': levels}
+
+# ---------------------- 平行執行與統計 ----------------------
+def _play(job):
+    seed, config = job
+    return play_session(seed, **config)
+
+def run_bots(games, seed=0, workers=None, **config):
+    """Play `games` sessions (keyword args as play_session) in a process pool; returns (sessions, seconds)."""
+    rng = random.Random(seed)
+    jobs = [(rng.getrandbits(63), config) for _ in range(games)]
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1:
+        sessions = list(map(_play, jobs))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            sessions = list(pool.map(_play, jobs, chunksize=max(1, games // (workers * 8))))
+    return sessions, time.perf_counter() - start
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def summarize_sessions(sessions, elapsed):
+    """Per-level statistics of run_bots() results, as a JSON-friendly dict."""
+    by_level = {}
+    for session in sessions:
+        for stats in session['levels']:
+            by_level.setdefault(stats['level'], []).append(stats)
+    levels = {}
+    for level, runs in sorted(by_level.items()):
+        won = [s for s in runs if s['won']]
+        steps = [s['steps'] for s in won] or [0]
+        levels[level] = {
+            'played': len(runs),
+            'won': len(won),
+            'win_rate': len(won) / len(runs),
+            'steps_mean': statistics.mean(steps),
+            'steps_median': statistics.median(steps),
+            'steps_p95': _percentile(steps, 0.95),
+            'quizzes_mean': statistics.mean(s['quizzes'] for s in runs),
+            'wrong_mean': statistics.mean(s['wrong'] for s in runs),
+            'teleports_mean': statistics.mean(s['teleports'] for s in runs),
+            'restarts_mean': statistics.mean(s['restarts'] for s in runs),
+            'game_seconds_mean': statistics.mean(s['time_ms'] for s in runs) / 1000,
+        }
+        if level == 3:
+            escorted = [s for s in runs if s['puppy'] is not None]
+            if escorted:
+                levels[level]['puppy_delivered_rate'] = sum(s['puppy'] for s in escorted) / len(escorted)
+    return {
+        'games': len(sessions),
+        'won': sum(s['won'] for s in sessions),
+        'seconds': elapsed,
+        'games_per_second': len(sessions) / max(elapsed, 1e-9),
+        'levels': levels,
+    }
+
+def format_report(report):
+    lines = ["%d games, %d cleared all 3 levels, %.1f s (%.1f games/s)"
+             % (report['games'], report['won'], report['seconds'], report['games_per_second'])]
+    lines.append("%-6s %7s %8s %8s %8s %8s %8s %8s %8s %10s"
+                 % ("level", "played", "win", "steps", "p95", "quiz", "wrong", "teleport", "restart", "game s"))
+    for level, s in report['levels'].items():
+        lines.append("%-6d %7d %7.1f%% %8.0f %8d %8.2f %8.2f %8.2f %8.2f %10.1f"
+                     % (level, s['played'], 100 * s['win_rate'], s['steps_mean'], s['steps_p95'],
+                        s['quizzes_mean'], s['wrong_mean'], s['teleports_mean'], s['restarts_mean'],
+                        s['game_seconds_mean']))
+        if 'puppy_delivered_rate' in s:
+            lines.append("       puppy delivered %.1f%%" % (100 * s['puppy_delivered_rate']))
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless solver bots for load and balance testing")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--size", default="24x36", help="maze size ROWSxCOLS")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="processes (default: CPU count)")
+    parser.add_argument("--accuracy", type=float, default=0.8, help="chance of answering a quiz correctly")
+    parser.add_argument("--no-escort", action="store_true", help="ignore the puppy on level 3")
+    parser.add_argument("--chase", action="store_true", help="quiz monsters chase the player")
+    parser.add_argument("--quiz-count", type=int, help="quiz monsters per level (default 5~6)")
+    parser.add_argument("--step-ms", type=int, default=100, help="game time per bot move")
+    parser.add_argument("--max-steps", type=int, default=20000, help="moves per level before giving up")
+    parser.add_argument("--packed", action="store_true",
+                        help="bit-packed mazes; the bots then route with HPA* instead of distance fields")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    rows, _, cols = args.size.partition("x")
+    sessions, elapsed = run_bots(
+        args.games, args.seed, args.workers, rows=int(rows), cols=int(cols or rows),
+        accuracy=args.accuracy, escort=not args.no_escort, chase=args.chase,
+        quiz_count=args.quiz_count, step_ms=args.step_ms, max_steps=args.max_steps, packed=args.packed)
+    report = summarize_sessions(sessions, elapsed)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+# ---------------------- 區塊快取 ----------------------
+# 大迷宮不能整張畫成一個 Surface（2000x2000 格就是 50000px 見方），所以把世界切成
+# CHUNK x CHUNK 格的區塊，各自畫成小 Surface，只保留最近用到的幾十塊。
+# key（迷宮版本、關卡）改變時全部作廢，但 Surface 留著給下一次重建重複使用。
+
+class ChunkCache:
+    """LRU of per-chunk surfaces; build(cr, cc, recycled) draws one chunk."""
+
+    def __init__(self, build, maxsize=64):
+        self.build = build
+        self.maxsize = maxsize
+        self.key = None
+        self._chunks = OrderedDict()  # (cr, cc) -> surface
+        self._spare = []  # surfaces from invalidated / evicted chunks
+
+    def _check(self, key):
+        if key != self.key:
+            self._spare.extend(self._chunks.values())
+            self._chunks.clear()
+            self.key = key
+
+    def get(self, key, cr, cc):
+        self._check(key)
+        surface = self._chunks.get((cr, cc))
+        if surface is not None:
+            self._chunks.move_to_end((cr, cc))
+            return surface
+        surface = self.build(cr, cc, self._spare.pop() if self._spare else None)
+        self._chunks[(cr, cc)] = surface
+        if len(self._chunks) > self.maxsize:
+            self._spare.append(self._chunks.popitem(last=False)[1])
+        return surface
+
+    def peek(self, key, cr, cc):
+        """The cached surface for (cr, cc) if it is built for `key`, else None."""
+        if key != self.key:
+            return None
+        return self._chunks.get((cr, cc))
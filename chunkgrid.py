@@ -0,0 +1,240 @@
+import mmap
+import os
+import tempfile
+from collections import OrderedDict
+
+from bitgrid import pack_rows, ONE_BITS
+
+# ---------------------- 分塊世界 ----------------------
+# 超大迷宮（上億格）連 BitGrid 都不想整張放在記憶體裡：把格子切成 chunk x chunk 的
+# 區塊，每塊是一小段位元圖，全部存在一個 mmap 的暫存檔裡。記憶體裡只保留最近用到的
+# max_chunks 塊（LRU）；被擠出去的塊有改過才寫回檔案，再用到時從檔案讀回來。
+#
+# 和 BitGrid 一樣可以 grid[r][c] 讀寫、get / set / test_and_set、整列掃描 ones / zeros，
+# 所以 move_player、繪圖與迷霧都不用知道格子放在哪裡。
+#
+# pickle 只帶檔案路徑（先把改過的區塊寫回檔案），另一個行程打開同一個檔案重新 mmap，
+# 所以背景行程建好的世界交給主行程時不必複製格子。暫存檔由最後一個拿到它的物件負責刪除。
+
+class _GridRow:
+    # grid[r] 回傳的 view
+    __slots__ = ('grid', 'r')
+
+    def __init__(self, grid, r):
+        self.grid, self.r = grid, r
+
+    def __len__(self):
+        return self.grid.cols
+
+    def __getitem__(self, c):
+        return self.grid.get(self.r, c)
+
+    def __setitem__(self, c, value):
+        self.grid.set(self.r, c, value)
+
+    def __iter__(self):
+        get, r = self.grid.get, self.r
+        return (get(r, c) for c in range(self.grid.cols))
+
+class ChunkedGrid:
+    """rows x cols bits in chunk x chunk blocks: an LRU of resident blocks over a memory-mapped file.
+
+    path=None uses a temporary file that close() deletes. Resident memory is
+    at most max_chunks * chunk * chunk / 8 bytes however big the grid is.
+    Pickling flushes and sends only the path; the unpickled grid maps the
+    same file and takes over deleting a temporary one.
+    """
+
+    def __init__(self, rows, cols, fill=0, chunk=64, max_chunks=256, path=None):
+        if chunk % 8:
+            raise ValueError("chunk must be a multiple of 8")
+        self.rows, self.cols = rows, cols
+        self.chunk = chunk
+        self.max_chunks = max_chunks
+        self.chunk_cols = -(-cols // chunk)
+        self.chunk_bytes = chunk * chunk // 8
+        self.line_bytes = chunk // 8  # 區塊裡一列的 bytes
+        self._owned = path is None  # 自己建的暫存檔，close() 時刪掉
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="maze-", suffix=".chunks")
+            os.close(fd)
+        self.path = path
+        self._file = open(path, "w+b")
+        self._file.truncate(self._size())
+        self._attach()
+        if fill:
+            self._fill_file(b"\xff")
+
+    def _size(self):
+        return -(-self.rows // self.chunk) * self.chunk_cols * self.chunk_bytes
+
+    def _attach(self):
+        # mmap 整個檔案，區塊快取從空的開始
+        self._mm = mmap.mmap(self._file.fileno(), self._size())
+        self._cache = OrderedDict()  # chunk index -> bytearray
+        self._dirty = set()
+        self._last_key, self._last_buf = None, None  # 最近一次用到的區塊，連續存取同一塊時免查 LRU
+        self.page_ins = self.page_outs = 0
+
+    def __getstate__(self):
+        # 只帶路徑與大小；刪暫存檔的責任交給拿到 pickle 的那一邊
+        self.flush()
+        state = {name: getattr(self, name) for name in
+                 ('rows', 'cols', 'chunk', 'max_chunks', 'chunk_cols', 'chunk_bytes', 'line_bytes',
+                  'path', '_owned')}
+        self._owned = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._file = open(self.path, "r+b")
+        self._attach()
+
+    @classmethod
+    def from_rows(cls, rows_iter, rows, cols, **kwargs):
+        """Build from a stream of rows of 0/1, written straight to the file (only one row in memory)."""
+        grid = cls(rows, cols, **kwargs)
+        chunk, lb, mm = grid.chunk, grid.line_bytes, grid._mm
+        pad = [0] * chunk
+        for r, row in enumerate(rows_iter):
+            cr, rr = divmod(r, chunk)
+            for cc in range(grid.chunk_cols):
+                seg = row[cc*chunk:(cc + 1)*chunk]
+                if len(seg) < chunk:
+                    seg = list(seg) + pad[len(seg):]
+                start = (cr*grid.chunk_cols + cc)*grid.chunk_bytes + rr*lb
+                mm[start:start + lb] = pack_rows([seg], chunk)
+        return grid
+
+    def _fill_file(self, byte):
+        block = byte * (1 << 20)
+        for start in range(0, len(self._mm), len(block)):
+            n = min(len(block), len(self._mm) - start)
+            self._mm[start:start + n] = block[:n]
+
+    # ---------------------- 區塊換頁 ----------------------
+    def _load(self, key):
+        if key == self._last_key:
+            return self._last_buf
+        cache = self._cache
+        buf = cache.get(key)
+        if buf is None:
+            start = key * self.chunk_bytes
+            buf = cache[key] = bytearray(self._mm[start:start + self.chunk_bytes])
+            self.page_ins += 1
+            if len(cache) > self.max_chunks:
+                self._evict()
+        else:
+            cache.move_to_end(key)
+        self._last_key, self._last_buf = key, buf
+        return buf
+
+    def _evict(self):
+        key, buf = self._cache.popitem(last=False)
+        if key in self._dirty:
+            self._dirty.discard(key)
+            start = key * self.chunk_bytes
+            self._mm[start:start + self.chunk_bytes] = buf
+            self.page_outs += 1
+        if key == self._last_key:
+            self._last_key = self._last_buf = None
+
+    def flush(self):
+        """Write every modified resident chunk back to the file."""
+        for key in self._dirty:
+            start = key * self.chunk_bytes
+            self._mm[start:start + self.chunk_bytes] = self._cache[key]
+        self._dirty.clear()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+            self._cache.clear()
+            if self._owned:
+                self._owned = False
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def __del__(self):
+        if getattr(self, '_mm', None) is not None:
+            self.close()
+
+    def resident_bytes(self):
+        return len(self._cache) * self.chunk_bytes
+
+    def __deepcopy__(self, memo):
+        # Replayer 的 keyframe：複製成另一個暫存檔
+        self.flush()
+        other = ChunkedGrid(self.rows, self.cols, chunk=self.chunk, max_chunks=self.max_chunks)
+        for start in range(0, len(self._mm), 1 << 20):
+            other._mm[start:start + (1 << 20)] = self._mm[start:start + (1 << 20)]
+        return other
+
+    # ---------------------- 單格 ----------------------
+    def _locate(self, r, c):
+        cr, rr = divmod(r, self.chunk)
+        cc, cl = divmod(c, self.chunk)
+        return cr*self.chunk_cols + cc, rr*self.chunk + cl
+
+    def get(self, r, c):
+        key, i = self._locate(r, c)
+        return self._load(key)[i >> 3] >> (7 - (i & 7)) & 1
+
+    def set(self, r, c, value=1):
+        key, i = self._locate(r, c)
+        buf = self._load(key)
+        if value:
+            buf[i >> 3] |= 128 >> (i & 7)
+        else:
+            buf[i >> 3] &= ~(128 >> (i & 7)) & 255
+        self._dirty.add(key)
+
+    def test_and_set(self, r, c):
+        """Set (r, c) to 1; returns its previous value."""
+        key, i = self._locate(r, c)
+        buf = self._load(key)
+        mask = 128 >> (i & 7)
+        if buf[i >> 3] & mask:
+            return 1
+        buf[i >> 3] |= mask
+        self._dirty.add(key)
+        return 0
+
+    # ---------------------- list of lists 相容 ----------------------
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, r):
+        return _GridRow(self, r)
+
+    def __iter__(self):
+        return (_GridRow(self, r) for r in range(self.rows))
+
+    # ---------------------- 整列掃描 ----------------------
+    def _scan(self, r, c0, c1, invert):
+        c1 = self.cols if c1 is None else min(c1, self.cols)
+        chunk, lb = self.chunk, self.line_bytes
+        cr, rr = divmod(r, chunk)
+        skip = 255 if invert else 0
+        for cc in range(c0 // chunk, -(-c1 // chunk)):
+            buf = self._load(cr*self.chunk_cols + cc)
+            base, col0 = rr*lb, cc*chunk
+            for k in range(lb):
+                b = buf[base + k]
+                if b != skip:
+                    for off in ONE_BITS[b ^ 255 if invert else b]:
+                        c = col0 + (k << 3) + off
+                        if c0 <= c < c1:
+                            yield c
+
+    def ones(self, r, c0=0, c1=None):
+        """Columns c0 <= c < c1 of row r whose bit is 1."""
+        return self._scan(r, c0, c1, False)
+
+    def zeros(self, r, c0=0, c1=None):
+        """Columns c0 <= c < c1 of row r whose bit is 0."""
+        return self._scan(r, c0, c1, True)
@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+
+# ---------------------- 字型路徑快取 ----------------------
+# pygame.font.match_font 每找一個名字都可能掃過整份系統字型清單（Linux 上還會
+# 呼叫 fc-list），啟動時逐一試 font_candidates 很花時間。找到的結果（包含「都
+# 找不到」）寫進一個小 JSON 檔，鍵是平台、候選名單與字型資料夾的 mtime；
+# 安裝或移除字型後資料夾 mtime 會變，快取就自動失效。
+
+CACHE_ENV = "MAZE_FONT_CACHE"  # 設定這個環境變數可改快取檔位置
+
+def font_dirs():
+    """System / user font directories for the current platform."""
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        local = os.environ.get("LOCALAPPDATA", os.path.join(home, "AppData", "Local"))
+        return [os.path.join(windir, "Fonts"),
+                os.path.join(local, "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts",
+                os.path.join(home, "Library", "Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts",
+            os.path.join(home, ".fonts"), os.path.join(home, ".local", "share", "fonts")]
+
+def default_cache_file():
+    path = os.environ.get(CACHE_ENV)
+    if path:
+        return path
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "maze_game", "font.json")
+
+def cache_key(candidates):
+    mtimes = []
+    for d in font_dirs():
+        try:
+            mtimes.append([d, os.stat(d).st_mtime_ns])
+        except OSError:
+            pass
+    return {'platform': sys.platform, 'candidates': list(candidates), 'dirs': mtimes}
+
+def _load(cache_file):
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save(cache_file, data):
+    # 快取只是加速用，寫不進去（唯讀家目錄等）就算了
+    try:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        tmp = cache_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
+
+def resolve_font(candidates, match_font, cache_file=None):
+    """Path of the first font in `candidates` that `match_font` finds, or None.
+
+    Uses the on-disk cache when its key still matches and the cached file
+    still exists; otherwise asks `match_font` and rewrites the cache.
+    """
+    if cache_file is None:
+        cache_file = default_cache_file()
+    key = cache_key(candidates)
+    cached = _load(cache_file)
+    if isinstance(cached, dict) and cached.get('key') == key:
+        path = cached.get('path')
+        if path is None or os.path.exists(path):
+            return path
+    path = None
+    for name in candidates:
+        match = match_font(name)
+        if match:
+            path = match
+            break
+    _save(cache_file, {'key': key, 'path': path})
+    return path
@@ -0,0 +1,71 @@
+import random
+
+from grid import probe_floor_cell
+
+# ---------------------- 可傳送的空地索引 ----------------------
+# 陷阱傳送的目的地是「地面，扣掉其他陷阱、出口與情侶占格」。以前每次踩到陷阱都
+# 掃整張迷宮再逐一過濾；現在每關建一次索引，陷阱被踩掉時把那格加回來，
+# 抽樣、加入、移除都是 O(1)。
+
+class FreeCellIndex:
+    """Set of cells with O(1) add / remove / uniform random choice (array + position map)."""
+
+    def __init__(self, cells=()):
+        self.reset(cells)
+
+    def reset(self, cells):
+        self._cells = list(dict.fromkeys(cells))
+        self._pos = {cell: i for i, cell in enumerate(self._cells)}
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __contains__(self, cell):
+        return cell in self._pos
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    def add(self, cell):
+        if cell not in self._pos:
+            self._pos[cell] = len(self._cells)
+            self._cells.append(cell)
+
+    def remove(self, cell):
+        # 把最後一格搬到被移除的位置，陣列保持緊密
+        i = self._pos.pop(cell, None)
+        if i is None:
+            return
+        last = self._cells.pop()
+        if i < len(self._cells):
+            self._cells[i] = last
+            self._pos[last] = i
+
+    def choice(self, rng=None):
+        """A uniformly random cell, or None if the index is empty."""
+        if not self._cells:
+            return None
+        if rng is None:
+            rng = random
+        return self._cells[rng.randrange(len(self._cells))]
+
+class ProbedFreeCells:
+    """FreeCellIndex stand-in for worlds too big to list: floor minus `blocked`, sampled by probing."""
+
+    def __init__(self, maze, blocked=()):
+        self.maze = maze
+        self.blocked = set(blocked)
+
+    def __contains__(self, cell):
+        r, c = cell
+        return 0 <= r < len(self.maze) and 0 <= c < len(self.maze[0]) \
+            and self.maze[r][c] == 0 and cell not in self.blocked
+
+    def add(self, cell):
+        self.blocked.discard(cell)
+
+    def remove(self, cell):
+        self.blocked.add(cell)
+
+    def choice(self, rng=None):
+        return probe_floor_cell(self.maze, self.blocked, rng)
@@ -0,0 +1,489 @@
+import random
+from collections import deque
+
+from bitgrid import BitGrid
+from chunkgrid import ChunkedGrid
+from flowfield import DistanceField
+from hpa import HierarchicalMap
+from levels import build_layout, LevelPrefetcher
+from occupancy import OccupancyIndex
+from freecells import FreeCellIndex, ProbedFreeCells
+from swarm import QuizSwarm
+
+# ---------------------- 配置 ----------------------
+# 預設大小對應 900x600 視窗、每格 25px
+ROWS = 24
+COLS = 36
+
+# 方向鍵動作 -> (dr, dc)
+MOVES = {
+    'up': (-1, 0),
+    'down': (1, 0),
+    'left': (0, -1),
+    'right': (0, 1),
+}
+
+CHASE_RADIUS = 12  # 追人模式：離玩家這麼多步以內的問答怪會沿距離場走向玩家
+
+# 題庫（問題 -> 答案）
+QUESTIONS = [
+    ("中央大學英文全名", "National Central University"),
+    ("中央松果餐廳的飲料店叫?", "Comebuy"),
+    ("中央裡面的全家打幾折", "85"),
+    ("中央裡面的7-11打幾折", "9"),
+    ("中央iHouse開到幾點?", "21:00"),
+]
+
+# ---------------------- 遊戲狀態 ----------------------
+class MazeGame:
+    """Headless game state: maze, entities and rules, driven by step()/tick().
+
+    Time is an internal millisecond clock advanced only by tick(dt), so the
+    game runs the same with or without a display. All randomness comes from
+    `seed` (self.rng during play, a separate stream for level layouts), so a
+    seed plus the recorded inputs (see replay.py) reproduces a whole session.
+    """
+
+    def __init__(self, rows=ROWS, cols=COLS, level=1, verbose=False, use_numpy=False, quiz_count=None, seed=None,
+                 prefetch=None, bank=None, packed=False, chunked=False, chase=False):
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        # 關卡配置用自己的亂數流（見 levels.py），背景預先建關不會打亂遊戲中的亂數
+        self._layout_rng = random.Random(self.rng.getrandbits(64))
+        self._layout_seed = self._layout_rng.getrandbits(63)
+        # prefetch='thread' / 'process'：遊玩時在背景先建好下一關；None 則每次當場建
+        self.prefetcher = LevelPrefetcher(prefetch) if prefetch else None
+        # bank：mazebank.MazeBank，有這一關的配置就直接從題庫讀，不用產生
+        if bank is not None and chunked:
+            raise ValueError("a maze bank cannot be used with chunked storage")
+        if bank is not None and (bank.rows, bank.cols) != (rows, cols):
+            raise ValueError("maze bank is %dx%d, game is %dx%d" % (bank.rows, bank.cols, rows, cols))
+        self.bank = bank
+        self.recorder = None  # optional replay.InputLog; every input below is appended to it
+        self.rows = rows
+        self.cols = cols
+        self.use_numpy = use_numpy  # store the maze as a NumPy uint8 grid (see grid.py)
+        self.packed = packed  # store the maze as a BitGrid, one bit per cell (for very large mazes)
+        # store the maze in a ChunkedGrid (LRU of chunks over a mmap file) so memory stays bounded;
+        # such levels are built by levels.build_world_layout
+        self.chunked = chunked
+        self.level = level
+        self.verbose = verbose  # print messages / quiz questions to the console
+        self.time = 0  # ms, advanced by tick()
+        self.timers = {}  # name -> due time (ms); like pygame.time.set_timer, re-setting replaces
+        self.finished = False  # 第三關勝利 5 秒後結束
+
+        self.maze = []
+        self.maze_version = 0  # bumped whenever walls are regenerated (for render caches)
+        self.player = {'x': 1, 'y': 1}
+        self.exit_pos = {'x': rows - 2, 'y': cols - 2}
+        self.show_victory = False
+        self.traps = set()  # 存放 (r,c) 的傳送陷阱位置
+        self.monsters = []  # list of {'cells': {(r1,c1),(r2,c2)}, 'triggered': False}
+        self.reveal_until = 0  # game time (ms) until which fog is removed
+        self.puppy = None  # {'pos':(r,c), 'activated':False, 'delivered':False}
+        self.path_history = deque(maxlen=32)  # recent player positions for following behavior
+        self.exit_attempts = 0  # attempts to step on exit while puppy active and undelivered
+        self.show_message = False
+        self.message_text = ""
+        self.message_suppressed = False  # last_message_text was closed by the player and shouldn't re-show
+        self.last_message_text = None
+        self.visible_map = None  # 第二關用：走過的格子（BitGrid）
+        self.occupancy = OccupancyIndex()  # cell -> traps / monsters / puppy
+        self.teleport_cells = FreeCellIndex()  # 陷阱傳送的目的地：地面 - 陷阱 - 出口 - 情侶
+        self.on_explore = None  # optional callback(r, c) when a cell is newly marked in visible_map
+
+        # 中央常識題庫怪物（移動怪）
+        # positions + per-monster question/answer; the vectorized swarm copies the whole maze, so not for chunked
+        self.quiz_monsters = QuizSwarm(vectorized=False if chunked else None)
+        self.quiz_count = quiz_count  # None: 5~6 per level; set higher for stress levels
+        self.quiz_move_interval = 500  # ms between moves (0.5s)
+        self.quiz_last_move = 0
+        self.chase = chase  # quiz monsters within CHASE_RADIUS steps walk toward the player
+        self._chase_field = None  # DistanceField around the player, rebuilt after the player moves
+        self._exit_field = None  # DistanceField from the exit, built on first use for each maze
+        self._path_graph = None  # hpa.HierarchicalMap of the maze, built on first use
+        self._route = None  # (cells to the exit, index of the player's cell) for packed mazes
+        self.quiz_active = False
+        self.quiz_current = None  # {'index': i, 'question': q, 'answer': a, 'input': ''}
+
+    def _say(self, text):
+        if self.verbose:
+            print(text)
+
+    def _post_message(self, new_msg):
+        # only show if user hasn't suppressed this exact message
+        if not (self.message_suppressed and self.last_message_text == new_msg):
+            self.message_text = new_msg
+            self.show_message = True
+            # reset suppression when showing a new/different message
+            self.message_suppressed = False
+            self.last_message_text = None
+        self._say(new_msg)
+
+    # ---------------------- 迷宮生成 ----------------------
+    def generate_maze(self):
+        # 新迷宮（重來 / R / 空白鍵）：玩家回到起點
+        self.player = {'x': 1, 'y': 1}
+        self._build_level()
+        self.path_history.append((1, 1))
+        # reset any message suppression when generating a new maze (allow messages again)
+        self.message_suppressed = False
+        self.last_message_text = None
+
+    def generate_maze_for_next_level(self):
+        # 過關時立刻換下一關的迷宮；玩家位置不變
+        self._build_level()
+
+    def _build_level(self):
+        # 每次建關都用 layout 亂數流的下一個 seed，不論是背景先算好的還是當場算的都一樣
+        start = (self.player['x'], self.player['y'])
+        key = self._layout_key(self.level, start)
+        self._layout_seed = self._layout_rng.getrandbits(63)
+        layout = None
+        if self.bank is not None:
+            # 題庫裡有這一關就直接讀出來（mmap），用這次的 seed 挑一筆，重播時挑到同一筆
+            layout = self.bank.choose(self.level, key[3], self.use_numpy, self.packed)
+        if layout is None and self.prefetcher is not None:
+            layout = self.prefetcher.take(key)
+        if layout is None:
+            layout = build_layout(*key)
+        self._apply_layout(layout)
+        if self.prefetcher is not None:
+            level, start = self._predict_next_build()
+            if self.bank is None or not self.bank.has_level(level):
+                self.prefetcher.prefetch(self._layout_key(level, start))
+
+    def _layout_key(self, level, start):
+        return (self.rows, self.cols, level, self._layout_seed, start, self.use_numpy, self.quiz_count,
+                self.packed, self.chunked)
+
+    def _predict_next_build(self):
+        # 最可能的下一次建關：過關後的計時器 / 第三關重來 -> 同一關、回起點；
+        # 否則是走到出口時的下一關（玩家站在出口上）
+        if 'next_maze' in self.timers or self.level >= 3:
+            return self.level, (1, 1)
+        return self.level + 1, (self.exit_pos['x'], self.exit_pos['y'])
+
+    def _apply_layout(self, layout):
+        rows, cols = self.rows, self.cols
+        player = self.player
+        self.maze = maze = layout['maze']
+        self.maze_version += 1
+        self.exit_pos = dict(layout['exit_pos'])
+        self.show_victory = False
+        self.reveal_until = 0
+        self.path_history.clear()
+        self.exit_attempts = 0
+        self.show_message = False
+        self.message_text = ""
+        # 問答的 index 指向舊迷宮的怪物群，換關（例如問答中 next_maze 計時到了）就作廢
+        self.quiz_active = False
+        self.quiz_current = None
+        self._chase_field = self._exit_field = self._route = None
+        self._path_graph = layout['path_graph']  # 大迷宮建關時已經建好並跟著牆更新
+
+        self.traps.clear()
+        self.traps.update(layout['traps'])
+        self.monsters = [{'cells': set(cells), 'triggered': False} for cells in layout['monsters']]
+        self.puppy = None
+        if layout['puppy'] is not None:
+            self.puppy = {'pos': layout['puppy'], 'activated': False, 'delivered': False}
+        self.quiz_monsters.reset(maze, layout['quiz_cells'], rng=random.Random(layout['swarm_seed']))
+        # reset movement timer
+        self.quiz_last_move = self.time
+
+        self._index_entities()
+        if layout['teleport_cells'] is None:
+            # 大世界不列舉地面：傳送目的地也用隨機探測
+            blocked = set(layout['traps']).union(*layout['monsters'])
+            blocked.add((self.exit_pos['x'], self.exit_pos['y']))
+            self.teleport_cells = ProbedFreeCells(maze, blocked)
+        else:
+            self.teleport_cells = FreeCellIndex(layout['teleport_cells'])
+
+        # 關卡視野設定：第二關記錄走過的格子
+        if self.level == 2:
+            self.visible_map = ChunkedGrid(rows, cols) if self.chunked else BitGrid(rows, cols)
+            self.visible_map.set(player['x'], player['y'])
+        else:
+            self.visible_map = None
+
+    def _index_entities(self):
+        occ = self.occupancy
+        occ.clear()
+        for cell in self.traps:
+            occ.add(cell, 'trap', cell)
+        for m in self.monsters:
+            for cell in m['cells']:
+                occ.add(cell, 'monster', m)
+        if self.puppy is not None:
+            occ.add(self.puppy['pos'], 'puppy', self.puppy)
+
+    def _move_puppy(self, pos):
+        self.occupancy.move(self.puppy['pos'], pos, 'puppy', self.puppy)
+        self.puppy['pos'] = pos
+
+    # ---------------------- 遊戲邏輯 ----------------------
+    def explore(self, r, c):
+        # 第二關：標記走過的格子，並通知前端只更新這一格的迷霧
+        if not self.visible_map.test_and_set(r, c):
+            if self.on_explore is not None:
+                self.on_explore(r, c)
+
+    def step(self, action):
+        """Apply one player action ('up'/'down'/'left'/'right' or 'restart')."""
+        if self.recorder is not None:
+            self.recorder.record(action)
+        if action == 'restart':
+            self.generate_maze()
+            return
+        # 作答中或勝利畫面不能移動
+        if self.quiz_active or self.show_victory:
+            return
+        self.move_player(*MOVES[action])
+
+    def tick(self, dt):
+        """Advance the game clock by dt ms: fire timers and move quiz monsters."""
+        if self.recorder is not None:
+            self.recorder.record('tick', dt)
+        self.time += dt
+        for name, due in list(self.timers.items()):
+            if self.time >= due:
+                del self.timers[name]
+                if name == 'next_maze':
+                    self.generate_maze()
+                elif name == 'finish':
+                    # 第三關勝利後 5 秒自動關閉
+                    self.finished = True
+
+        # update moving quiz monsters every 0.5s (if no quiz active)
+        if not self.quiz_active and self.quiz_monsters and self.time - self.quiz_last_move >= self.quiz_move_interval:
+            self.move_quiz_monsters()
+            self.quiz_last_move = self.time
+
+    def move_player(self, dx, dy):
+        player, maze, occ = self.player, self.maze, self.occupancy
+        nx, ny = player['x'] + dx, player['y'] + dy
+        # 不能移動到牆或怪物占格
+        blocked_by_monster = occ.has((nx, ny), 'monster')
+        blocked_by_puppy = (self.puppy is not None and not self.puppy.get('activated', False)
+                            and occ.has((nx, ny), 'puppy'))
+
+        if not (0 <= nx < self.rows and 0 <= ny < self.cols and maze[nx][ny] == 0
+                and not blocked_by_monster and not blocked_by_puppy):
+            return
+        player['x'], player['y'] = nx, ny
+
+        # ★ 第2關：只記錄“走過”的格子
+        if self.level == 2:
+            self.explore(nx, ny)
+
+        # append path history for puppy following
+        self.path_history.append((player['x'], player['y']))
+
+        # 過關判定：如果有被啟動但未被送走的心碎小狗，則不能過關
+        if nx == self.exit_pos['x'] and ny == self.exit_pos['y']:
+            puppy = self.puppy
+            if self.level == 3 and puppy is not None and puppy.get('activated', False) and not puppy.get('delivered', False):
+                self.exit_attempts += 1
+                if self.exit_attempts > 3:
+                    self._post_message("你怎麼可以不送小狗回家?")
+                else:
+                    self._post_message("你是不是忘了要送誰回家")
+            else:
+                self.show_victory = True
+                if self.level == 3:
+                    # 第三關勝利，5 秒後自動關閉
+                    self.timers['finish'] = self.time + 5000
+                else:
+                    self.timers['next_maze'] = self.time + 2000
+                    self.level += 1
+                    self.generate_maze_for_next_level()
+
+        # ★ 處理傳送陷阱：踩到 trap 則傳送至另一個隨機非牆位置（排除出口與其他陷阱），並移除該陷阱
+        if (nx, ny) in self.traps:
+            self.traps.discard((nx, ny))
+            occ.remove((nx, ny), 'trap', occ.first((nx, ny), 'trap'))
+            # teleport_cells 已排除其他陷阱、出口與情侶占格；目前這格還沒加回去，
+            # 所以不會原地傳送。抽完再把用掉的陷阱格當成一般地面加回索引
+            dest = self.teleport_cells.choice(self.rng)
+            self.teleport_cells.add((nx, ny))
+            if dest is not None:
+                dest_r, dest_c = dest
+                player['x'], player['y'] = int(dest_r), int(dest_c)
+                # 如果是第二關，也要把傳送到的新格子標記為已探索
+                if self.level == 2 and self.visible_map is not None:
+                    self.explore(int(dest_r), int(dest_c))
+
+        # ★ 四向相鄰未觸發的情侶怪物時，移除視野遮蔽四秒
+        px, py = player['x'], player['y']
+        for dr, dc in MOVES.values():
+            m = occ.first((px + dr, py + dc), 'monster')
+            if m is not None and not m.get('triggered', False):
+                m['triggered'] = True
+                self.reveal_until = self.time + 4000
+
+        # 心碎小狗：啟動 / 跟隨 / 送回家
+        puppy = self.puppy
+        if self.level == 3 and puppy is not None:
+            if not puppy.get('activated', False):
+                # activation when puppy is inside view (5x5 centered on player)
+                if abs(puppy['pos'][0] - px) <= 2 and abs(puppy['pos'][1] - py) <= 2:
+                    puppy['activated'] = True
+                    self._post_message("終於有人要送我回家了嗎!!!!")
+                    if len(self.path_history) >= 3:
+                        self._move_puppy(self.path_history[-3])
+            elif not puppy.get('delivered', False) and len(self.path_history) >= 3:
+                # once activated and not delivered, puppy follows two tiles behind
+                self._move_puppy(self.path_history[-3])
+
+        # 若玩家回到起點並且 puppy 已啟動未送達，視為送回家 -> 消失並顯示訊息
+        if self.level == 3 and puppy is not None and puppy.get('activated', False) and not puppy.get('delivered', False):
+            if (px, py) == (1, 1):
+                puppy['delivered'] = True
+                occ.remove(puppy['pos'], 'puppy', puppy)
+                self.puppy = None
+                self._post_message("謝謝你帶我回家")
+                self.exit_attempts = 0
+
+        # ---- 碰到 quiz monster by player movement ----
+        if not self.quiz_active:
+            i = self.quiz_monsters.find((px, py))
+            if i is not None:
+                self._start_quiz(i)
+
+    def move_quiz_monsters(self):
+        # 全部怪物一起走一步；若有怪物走到玩家身上就觸發問答
+        player = (self.player['x'], self.player['y'])
+        field = None
+        if self.chase:
+            # 玩家沒動就沿用上次的距離場；所有怪物共用這一個
+            field = self._chase_field
+            if field is None or field.source != player:
+                field = self._chase_field = DistanceField(self.maze, player, radius=CHASE_RADIUS)
+        i = self.quiz_monsters.step(player, field)
+        if i is not None and not self.quiz_active:
+            self._start_quiz(i)
+
+    # ---------------------- 出口距離 ----------------------
+    def _couple_cells(self):
+        return set().union(*(m['cells'] for m in self.monsters))
+
+    def exit_field(self):
+        """DistanceField from the exit (couples count as walls); None for packed and chunked mazes."""
+        if self._exit_field is None and not (self.packed or self.chunked):
+            # 牆不會再變，每張迷宮只算一次
+            self._exit_field = DistanceField(self.maze, (self.exit_pos['x'], self.exit_pos['y']),
+                                             blocked=self._couple_cells())
+        return self._exit_field
+
+    def path_graph(self):
+        """HierarchicalMap of the maze (couples count as walls); None if chunked.
+
+        Packed layouts bring one kept in sync while the level was built;
+        otherwise it is built on first use.
+        """
+        if self._path_graph is None and not self.chunked:
+            self._path_graph = HierarchicalMap(self.maze, blocked=self._couple_cells())
+        return self._path_graph
+
+    def _exit_route(self):
+        # 大迷宮不存整張距離場：用 path_graph 找一條到出口的路；玩家照著走只要往前移一格索引
+        player = (self.player['x'], self.player['y'])
+        path, i = self._route or (None, 0)
+        if path is not None and i + 1 < len(path) and path[i + 1] == player:
+            i += 1
+        elif path is None or path[i] != player:
+            path, i = self.path_graph().find_path(player, (self.exit_pos['x'], self.exit_pos['y'])), 0
+        self._route = (path, i)
+        return path, i
+
+    def exit_distance(self):
+        """Steps from the player to the exit, or None if unknown."""
+        field = self.exit_field()
+        if field is not None:
+            return field.dist(self.player['x'], self.player['y'])
+        if self.chunked:
+            return None
+        path, i = self._exit_route()
+        return None if path is None else len(path) - 1 - i
+
+    def exit_hint(self):
+        """(dr, dc) of the player's next step toward the exit, or None."""
+        field = self.exit_field()
+        if field is not None:
+            return field.direction(self.player['x'], self.player['y'])
+        if self.chunked:
+            return None
+        path, i = self._exit_route()
+        if path is None or i + 1 >= len(path):
+            return None
+        return (path[i + 1][0] - path[i][0], path[i + 1][1] - path[i][1])
+
+    # ---------------------- 問答 ----------------------
+    def _start_quiz(self, i):
+        swarm = self.quiz_monsters
+        # choose a question for this monster when triggered
+        if not swarm.question[i]:
+            swarm.question[i], swarm.answer[i] = self.rng.choice(QUESTIONS)
+        self.quiz_active = True
+        self.quiz_current = {'index': i, 'question': swarm.question[i], 'answer': swarm.answer[i], 'input': ""}
+        self._say(swarm.question[i])
+
+    def type_text(self, text):
+        if self.recorder is not None:
+            self.recorder.record('text', text)
+        if self.quiz_active and self.quiz_current is not None:
+            if len(self.quiz_current['input']) < 120:
+                self.quiz_current['input'] += text
+
+    def backspace(self):
+        if self.recorder is not None:
+            self.recorder.record('backspace')
+        if self.quiz_current is not None:
+            self.quiz_current['input'] = self.quiz_current['input'][:-1]
+
+    def submit_answer(self, text=None):
+        """Submit the typed answer (or `text`); returns True if it was correct."""
+        if self.recorder is not None:
+            self.recorder.record('submit', text)
+        if self.quiz_current is None:
+            return False
+        if text is not None:
+            self.quiz_current['input'] = text
+        user_ans = self.quiz_current['input'].strip()
+        correct = user_ans.lower() == self.quiz_current['answer'].strip().lower()
+        # 問答期間怪物不會移動；換關時 _apply_layout 會關掉問答，index 仍多檢查一次範圍
+        i = self.quiz_current['index']
+        valid = 0 <= i < len(self.quiz_monsters)
+        if correct:
+            if valid:
+                self.quiz_monsters.remove(i)
+        else:
+            # 答錯：被當掉，回起點重修
+            if valid:
+                self.quiz_monsters.question[i] = None
+                self.quiz_monsters.answer[i] = None
+            self.player['x'], self.player['y'] = 1, 1
+            self.path_history.append((1, 1))
+        self.quiz_active = False
+        self.quiz_current = None
+        return correct
+
+    def dismiss_message(self):
+        # suppress re-showing the same message until it changes
+        if self.recorder is not None:
+            self.recorder.record('dismiss')
+        self.last_message_text = self.message_text
+        self.message_suppressed = True
+        self.show_message = False
+        self.message_text = ""
+
+    def reveal_active(self):
+        return self.time < self.reveal_until
+
+    def close(self):
+        # 停掉背景建關
+        if self.prefetcher is not None:
+            self.prefetcher.close()
@@ -0,0 +1,124 @@
+import random
+
+from bitgrid import BitGrid
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 是選用的：沒有安裝時迷宮維持 list of lists
+    np = None
+
+# ---------------------- 迷宮格子 ----------------------
+# 迷宮可以是 list of lists（預設）、NumPy uint8 陣列或 BitGrid（一格一個 bit，
+# 給非常大的迷宮用）；三種都用 maze[r][c] 存取，這裡的查詢在陣列上改用向量化運算、
+# 在 BitGrid 上整個 byte 一起掃。抽樣都透過 random 模組（或傳入的 rng）挑「索引」，
+# 所以同一個亂數種子在三種表示法下會選到同樣的格子。
+
+def is_array(maze):
+    return np is not None and isinstance(maze, np.ndarray)
+
+def is_packed(maze):
+    return isinstance(maze, BitGrid)
+
+def as_array(maze):
+    # 任一種表示法 -> NumPy uint8 陣列（BitGrid 用 unpackbits 展開）
+    if is_packed(maze):
+        bits = np.frombuffer(maze.bits, dtype=np.uint8).reshape(maze.rows, maze.row_bytes)
+        return np.unpackbits(bits, axis=1, count=maze.cols)
+    return np.asarray(maze, dtype=np.uint8)
+
+def new_grid(rows, cols, fill=1, use_numpy=False, packed=False):
+    if packed:
+        return BitGrid(rows, cols, fill)
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("use_numpy=True requires NumPy to be installed")
+        return np.full((rows, cols), fill, dtype=np.uint8)
+    return [[fill]*cols for _ in range(rows)]
+
+def from_bytes(buf, rows, cols, use_numpy=False, packed=False):
+    # 由 row-major 的 bytearray 建立迷宮
+    if packed:
+        return BitGrid.from_cells(buf, rows, cols)
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("use_numpy=True requires NumPy to be installed")
+        return np.frombuffer(buf, dtype=np.uint8).reshape(rows, cols).copy()
+    return [list(buf[r*cols:(r+1)*cols]) for r in range(rows)]
+
+def open_cells(maze, cells):
+    # 把一批 (r, c) 設為地面
+    if is_array(maze):
+        if cells:
+            rs, cs = zip(*cells)
+            maze[list(rs), list(cs)] = 0
+    else:
+        for r, c in cells:
+            maze[r][c] = 0
+
+def _floor_mask(maze, exclude):
+    mask = maze == 0
+    for r, c in exclude:
+        mask[r, c] = False
+    return np.flatnonzero(mask)
+
+def floor_cells(maze, exclude=()):
+    """All floor cells (row-major) that are not in `exclude`."""
+    if is_array(maze):
+        cols = maze.shape[1]
+        return [divmod(int(i), cols) for i in _floor_mask(maze, exclude)]
+    exclude = set(exclude)
+    if is_packed(maze):
+        return [(r, c) for r in range(maze.rows) for c in maze.zeros(r) if (r, c) not in exclude]
+    return [(r, c) for r, row in enumerate(maze) for c, v in enumerate(row)
+            if v == 0 and (r, c) not in exclude]
+
+def sample_floor_cells(maze, k, exclude=(), rng=None):
+    """Up to k distinct random floor cells that are not in `exclude`."""
+    if rng is None:
+        rng = random
+    if is_array(maze):
+        flat = _floor_mask(maze, exclude)
+        cols = maze.shape[1]
+        k = min(k, len(flat))
+        return [divmod(int(flat[i]), cols) for i in rng.sample(range(len(flat)), k)]
+    available = floor_cells(maze, exclude)
+    return rng.sample(available, min(k, len(available)))
+
+def choice_floor_cell(maze, exclude=(), rng=None):
+    """One random floor cell that is not in `exclude`, or None."""
+    if rng is None:
+        rng = random
+    if is_array(maze):
+        flat = _floor_mask(maze, exclude)
+        if len(flat) == 0:
+            return None
+        return divmod(int(flat[rng.randrange(len(flat))]), maze.shape[1])
+    available = floor_cells(maze, exclude)
+    return rng.choice(available) if available else None
+
+def probe_floor_cell(maze, exclude=(), rng=None, tries=100000):
+    """A random floor cell not in `exclude` (a set), found by probing random coordinates.
+
+    Expected O(1) tries since a maze is roughly half floor; used where the
+    maze is too big to list its floor cells. None if every try misses.
+    """
+    if rng is None:
+        rng = random
+    rows, cols = len(maze), len(maze[0])
+    for _ in range(tries):
+        r, c = rng.randrange(rows), rng.randrange(cols)
+        if maze[r][c] == 0 and (r, c) not in exclude:
+            return r, c
+    return None
+
+def probe_floor_cells(maze, k, exclude=(), rng=None):
+    """Up to k distinct floor cells from probe_floor_cell."""
+    taken = set(exclude)
+    cells = []
+    while len(cells) < k:
+        cell = probe_floor_cell(maze, taken, rng)
+        if cell is None:
+            break
+        cells.append(cell)
+        taken.add(cell)
+    return cells
@@ -0,0 +1,325 @@
+import heapq
+from collections import deque
+from itertools import count
+
+# ---------------------- 階層式尋路 (HPA*) ----------------------
+# 迷宮切成 cluster x cluster 的區塊。相鄰兩塊的交界上，每一段「兩邊都是地面」的
+# 連續開口取中間一組當入口（兩格各是一個節點，之間成本 1）；同一塊裡節點兩兩之間的
+# 步數第一次用到那一塊時才在塊內 BFS 算好並快取。查詢先在起點、終點所在的塊裡
+# 連到節點，再在這張小圖上跑 A*，最後把抽象路線逐段展開成格子。
+#
+# 牆有變動時（add_extra_paths、打通出口）呼叫 update(cells)，只重算附近幾塊的
+# 入口與塊內步數；大迷宮（packed）建關時一產生迷宮就建圖，之後的牆變動都經由
+# on_change 接到 update，情侶放好後再用 set_blocked 當成牆。遊戲的出口提示與剩餘步數、
+# reach.is_reachable(graph=...) 和 bots 在大迷宮上都查這張圖。
+# 路線長度是近似最短（每段開口只走中間那組）。
+
+_DIRS = [(1,0), (-1,0), (0,1), (0,-1)]
+_GOAL = 'goal'  # A* 裡代表終點的虛擬節點
+
+class HierarchicalMap:
+    """Cluster graph of a maze for HPA* distance, path and reachability queries.
+
+    Building only scans cluster borders; intra-cluster costs are computed
+    per cluster on first use. Cells in `blocked` count as walls.
+    """
+
+    def __init__(self, maze, cluster=16, blocked=()):
+        self.maze = maze
+        self.rows, self.cols = len(maze), len(maze[0])
+        self.cluster = cluster
+        self.blocked = set(blocked)
+        self.cluster_rows = -(-self.rows // cluster)
+        self.cluster_cols = -(-self.cols // cluster)
+        self._transitions = {}  # border -> [(a, b), ...]
+        self._refs = {}  # node -> number of transitions using it
+        self._inter = {}  # node -> nodes one step away across a border
+        self._nodes = {}  # cluster -> set of nodes
+        self._intra = {}  # cluster -> {node: {node: steps}}, filled on first use
+        self._component = None  # node -> component root, for is_reachable
+        self.abstractions = 0  # clusters whose intra costs were computed
+        for cr in range(self.cluster_rows):
+            for cc in range(self.cluster_cols):
+                if cc + 1 < self.cluster_cols:
+                    self._add_transitions(('h', cr, cc))
+                if cr + 1 < self.cluster_rows:
+                    self._add_transitions(('v', cr, cc))
+
+    def cluster_of(self, r, c):
+        return (r // self.cluster, c // self.cluster)
+
+    def node_count(self):
+        return len(self._refs)
+
+    def _open(self, r, c):
+        return self.maze[r][c] == 0 and (r, c) not in self.blocked
+
+    # ---------------------- 入口 ----------------------
+    def _border_cells(self, border):
+        # 交界兩側成對的格子；'h' 是 (cr, cc) 和右邊那塊，'v' 是和下面那塊
+        kind, cr, cc = border
+        size = self.cluster
+        if kind == 'h':
+            c = (cc + 1)*size - 1
+            return [((r, c), (r, c + 1)) for r in range(cr*size, min((cr + 1)*size, self.rows))]
+        r = (cr + 1)*size - 1
+        return [((r, c), (r + 1, c)) for c in range(cc*size, min((cc + 1)*size, self.cols))]
+
+    def _add_transitions(self, border):
+        pairs, run = [], []
+        for a, b in self._border_cells(border) + [(None, None)]:
+            if a is not None and self._open(*a) and self._open(*b):
+                run.append((a, b))
+            elif run:
+                # 每段連續的開口只取中間一組
+                pairs.append(run[len(run) // 2])
+                run = []
+        for a, b in pairs:
+            for n, m in ((a, b), (b, a)):
+                self._refs[n] = self._refs.get(n, 0) + 1
+                self._nodes.setdefault(self.cluster_of(*n), set()).add(n)
+                self._inter.setdefault(n, set()).add(m)
+        self._transitions[border] = pairs
+
+    def _remove_transitions(self, border):
+        for a, b in self._transitions.pop(border, ()):
+            for n, m in ((a, b), (b, a)):
+                self._inter[n].discard(m)
+                self._refs[n] -= 1
+                if not self._refs[n]:
+                    del self._refs[n], self._inter[n]
+                    self._nodes[self.cluster_of(*n)].discard(n)
+
+    def _borders_of(self, k):
+        cr, cc = k
+        if cc + 1 < self.cluster_cols:
+            yield ('h', cr, cc)
+        if cc > 0:
+            yield ('h', cr, cc - 1)
+        if cr + 1 < self.cluster_rows:
+            yield ('v', cr, cc)
+        if cr > 0:
+            yield ('v', cr - 1, cc)
+
+    def update(self, cells):
+        """Re-abstract the clusters around `cells` after their walls changed."""
+        clusters = set()
+        for r, c in cells:
+            clusters.add(self.cluster_of(r, c))
+            for dr, dc in _DIRS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < self.rows and 0 <= nc < self.cols:
+                    clusters.add(self.cluster_of(nr, nc))
+        touched = set(clusters)
+        for border in {b for k in clusters for b in self._borders_of(k)}:
+            self._remove_transitions(border)
+            self._add_transitions(border)
+            # 交界另一邊那塊的節點也變了
+            kind, cr, cc = border
+            touched.add((cr, cc))
+            touched.add((cr, cc + 1) if kind == 'h' else (cr + 1, cc))
+        for k in touched:
+            self._intra.pop(k, None)
+        self._component = None
+
+    def set_blocked(self, blocked):
+        """Replace the cells that count as walls, re-abstracting only around the ones that changed."""
+        blocked = set(blocked)
+        changed = blocked ^ self.blocked
+        if changed:
+            self.blocked = blocked
+            self.update(changed)
+
+    # ---------------------- 塊內 ----------------------
+    def _local(self, src, k):
+        # 只在區塊 k 裡的 BFS：{格子: 步數}, {格子: 上一格}
+        size = self.cluster
+        r0, c0 = k[0]*size, k[1]*size
+        r1, c1 = min(r0 + size, self.rows), min(c0 + size, self.cols)
+        maze, blocked = self.maze, self.blocked
+        dist, parent = {src: 0}, {src: None}
+        queue = deque([src])
+        while queue:
+            cell = queue.popleft()
+            x, y = cell
+            d = dist[cell] + 1
+            for dx, dy in _DIRS:
+                nx, ny = x + dx, y + dy
+                nxt = (nx, ny)
+                if r0 <= nx < r1 and c0 <= ny < c1 and nxt not in dist \
+                        and maze[nx][ny] == 0 and nxt not in blocked:
+                    dist[nxt] = d
+                    parent[nxt] = cell
+                    queue.append(nxt)
+        return dist, parent
+
+    def _intra_costs(self, k):
+        costs = self._intra.get(k)
+        if costs is not None:
+            return costs
+        # 每個節點各做一次塊內 BFS
+        floor, w, index = self._flat(k)
+        costs = self._intra[k] = {}
+        for n, src in index.items():
+            dist = _flat_bfs(floor, w, src)
+            costs[n] = {m: dist[j] for m, j in index.items() if m != n and dist[j] >= 0}
+        self.abstractions += 1
+        return costs
+
+    def _flat(self, k):
+        # 區塊 k 的地面標記（flat index）、寬度，以及節點 -> flat index
+        size = self.cluster
+        r0, c0 = k[0]*size, k[1]*size
+        h, w = min(size, self.rows - r0), min(size, self.cols - c0)
+        maze, blocked = self.maze, self.blocked
+        floor = bytearray(h * w)
+        for lr in range(h):
+            row = maze[r0 + lr]
+            for lc in range(w):
+                if row[c0 + lc] == 0 and (r0 + lr, c0 + lc) not in blocked:
+                    floor[lr*w + lc] = 1
+        index = {n: (n[0] - r0)*w + (n[1] - c0) for n in self._nodes.get(k, ())}
+        return floor, w, index
+
+    @staticmethod
+    def _trace(parent, cell):
+        # parent 鏈走回起點，回傳起點 -> cell
+        path = []
+        while cell is not None:
+            path.append(cell)
+            cell = parent[cell]
+        path.reverse()
+        return path
+
+    # ---------------------- 查詢 ----------------------
+    def _search(self, start, goal):
+        # (步數, 抽象節點列表, 起點塊的 parent, 終點塊的 parent)，走不到就 None
+        if not (self._open(*start) and self._open(*goal)):
+            return None
+        ks, kg = self.cluster_of(*start), self.cluster_of(*goal)
+        s_dist, s_parent = self._local(start, ks)
+        g_dist, g_parent = self._local(goal, kg)
+        gr, gc = goal
+        best = {}
+        came = {}
+        heap = []
+        tie = count()
+        if goal in s_dist:
+            # 同一塊裡直接走得到（不一定最短，繼續讓 A* 比較）
+            best[_GOAL] = s_dist[goal]
+            came[_GOAL] = None
+            heap.append((s_dist[goal], s_dist[goal], next(tie), _GOAL))
+        for n in self._nodes.get(ks, ()):
+            if n in s_dist:
+                g = s_dist[n]
+                best[n], came[n] = g, None
+                heapq.heappush(heap, (g + abs(n[0] - gr) + abs(n[1] - gc), g, next(tie), n))
+        inf = float('inf')
+        while heap:
+            _, g, _, n = heapq.heappop(heap)
+            if n is _GOAL:
+                nodes = []
+                n = came[_GOAL]
+                while n is not None:
+                    nodes.append(n)
+                    n = came[n]
+                nodes.reverse()
+                return g, nodes, s_parent, g_parent
+            if g > best[n]:
+                continue
+            if n in g_dist:
+                ng = g + g_dist[n]
+                if ng < best.get(_GOAL, inf):
+                    best[_GOAL], came[_GOAL] = ng, n
+                    heapq.heappush(heap, (ng, ng, next(tie), _GOAL))
+            steps = list(self._intra_costs(self.cluster_of(*n))[n].items())
+            steps.extend((m, 1) for m in self._inter[n])
+            for m, cost in steps:
+                ng = g + cost
+                if ng < best.get(m, inf):
+                    best[m], came[m] = ng, n
+                    heapq.heappush(heap, (ng + abs(m[0] - gr) + abs(m[1] - gc), ng, next(tie), m))
+        return None
+
+    def distance(self, start, goal):
+        """Steps from start to goal along the HPA* route, or None if unreachable."""
+        found = self._search(start, goal)
+        return None if found is None else found[0]
+
+    def find_path(self, start, goal):
+        """Cells from start to goal (both included), or None if unreachable."""
+        found = self._search(start, goal)
+        if found is None:
+            return None
+        _, nodes, s_parent, g_parent = found
+        if not nodes:
+            return self._trace(s_parent, goal)
+        path = self._trace(s_parent, nodes[0])
+        for a, b in zip(nodes, nodes[1:]):
+            k = self.cluster_of(*a)
+            if self.cluster_of(*b) != k:
+                path.append(b)  # 跨過交界，一步
+            else:
+                path.extend(self._trace(self._local(a, k)[1], b)[1:])
+        tail = self._trace(g_parent, nodes[-1])
+        tail.reverse()
+        path.extend(tail[1:])
+        return path
+
+    def _components(self):
+        # 整張抽象圖的連通元件（union-find）；塊內只做連通標記，不算步數
+        if self._component is not None:
+            return self._component
+        root = {n: n for n in self._refs}
+
+        def find(n):
+            while root[n] != n:
+                root[n] = root[root[n]]
+                n = root[n]
+            return n
+
+        for k, nodes in self._nodes.items():
+            if len(nodes) < 2:
+                continue
+            floor, w, index = self._flat(k)
+            left = dict(index)
+            while left:
+                n, src = left.popitem()
+                dist = _flat_bfs(floor, w, src)
+                for m in [m for m, j in left.items() if dist[j] >= 0]:
+                    del left[m]
+                    root[find(m)] = find(n)
+        for n, others in self._inter.items():
+            for m in others:
+                root[find(m)] = find(n)
+        self._component = {n: find(n) for n in root}
+        return self._component
+
+    def is_reachable(self, start, goal):
+        """Whether goal can be reached from start; after the first call only the two clusters are searched."""
+        if not (self._open(*start) and self._open(*goal)):
+            return False
+        ks, kg = self.cluster_of(*start), self.cluster_of(*goal)
+        s_dist = self._local(start, ks)[0]
+        if goal in s_dist:
+            return True
+        component = self._components()
+        g_dist = self._local(goal, kg)[0]
+        roots = {component[n] for n in self._nodes.get(ks, ()) if n in s_dist}
+        return any(component[n] in roots for n in self._nodes.get(kg, ()) if n in g_dist)
+
+def _flat_bfs(floor, w, src):
+    # 塊內 BFS：floor 是 0/1 的 flat 地面標記，回傳每格步數（走不到是 -1）
+    n = len(floor)
+    dist = [-1] * n
+    dist[src] = 0
+    queue = deque([src])
+    while queue:
+        i = queue.popleft()
+        d = dist[i] + 1
+        lc = i % w
+        for j in (i - w, i + w, i - 1 if lc else -1, i + 1 if lc + 1 < w else -1):
+            if 0 <= j < n and floor[j] and dist[j] < 0:
+                dist[j] = d
+                queue.append(j)
+    return dist
@@ -0,0 +1,167 @@
+import multiprocessing
+import random
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from chunkgrid import ChunkedGrid
+from grid import floor_cells, sample_floor_cells, probe_floor_cells
+from hpa import HierarchicalMap
+from mazegen import generate_perfect_maze, eller_rows, add_extra_paths
+from reach import ensure_exit_reachable, link_exit
+from placement import PlacementPlanner, DeadEndPlanner
+
+# ---------------------- 關卡配置 ----------------------
+# 一關的迷宮與所有實體位置只由 (大小, 關卡, seed, 玩家起始格) 決定，
+# 算成一個可以 pickle 的 dict；MazeGame 再把它套用到遊戲狀態上。
+# 因為是純函式，可以丟到背景執行緒 / 行程先算好，結果和當場算的一模一樣。
+
+def build_layout(rows, cols, level, seed, start, use_numpy=False, quiz_count=None, packed=False, chunked=False):
+    """Maze and entity placement of one level, as a plain (picklable) dict."""
+    if chunked:
+        return build_world_layout(rows, cols, level, seed, start, quiz_count)
+    rng = random.Random(seed)
+    maze = generate_perfect_maze(rows, cols, use_numpy, rng, packed)
+    # 大迷宮（packed）不存整張距離場，改用 HPA* 的抽象圖：迷宮一產生就建，
+    # 之後打通的牆只在附近幾塊重算
+    graph = HierarchicalMap(maze) if packed else None
+    on_change = graph.update if graph is not None else None
+    add_extra_paths(maze, rng=rng, on_change=on_change)
+    exit_pos = ensure_exit_reachable(maze, rng, on_change=on_change)
+    exit_cell = (exit_pos['x'], exit_pos['y'])
+
+    # ★ 隨機放置 3~7 個傳送陷阱，放在地面上，且不能放在玩家位置或出口
+    start_exit = {start, exit_cell}
+    traps = sample_floor_cells(maze, rng.randint(3, 7), start_exit, rng)
+
+    # 第二、三關必定生成兩個雙格怪物（放閃情侶），第三關再放 1 個心碎小狗；
+    # 兩者都會擋路，放置後出口仍須可達
+    monsters, puppy = [], None
+    if level in (2, 3):
+        planner = PlacementPlanner(maze, (1, 1), exit_cell, exclude=set(traps) | start_exit, rng=rng)
+        monsters = planner.place_pairs(2)
+        if level == 3:
+            puppy = planner.place_single()
+
+    if graph is not None:
+        # 情侶不會動，當成牆
+        graph.set_blocked(set().union(*monsters))
+
+    # 在所有關卡放置 5~6 個移動的題庫怪物，不可生於起點或出口或陷阱或固定怪物占格
+    blocked = set(traps).union(*monsters)
+    occupied = blocked | start_exit
+    if puppy is not None:
+        occupied.add(puppy)
+    qm_count = rng.randint(5, 6) if quiz_count is None else quiz_count
+    quiz_cells = sample_floor_cells(maze, qm_count, occupied, rng)
+
+    # 陷阱傳送的目的地：地面 - 陷阱 - 出口 - 情侶
+    blocked.add(exit_cell)
+    return {
+        'level': level,
+        'seed': seed,
+        'maze': maze,
+        'exit_pos': exit_pos,
+        'traps': traps,
+        'monsters': monsters,
+        'puppy': puppy,
+        'quiz_cells': quiz_cells,
+        'swarm_seed': rng.getrandbits(64),  # 問答怪移動用的亂數
+        'teleport_cells': floor_cells(maze, blocked),
+        'path_graph': graph,  # hpa.HierarchicalMap（情侶算牆），只有 packed 才有
+    }
+
+def build_world_layout(rows, cols, level, seed, start, quiz_count=None):
+    """build_layout for worlds too big to hold or search (the maze is a ChunkedGrid).
+
+    The maze streams from eller_rows straight into chunk storage, the exit
+    is linked in O(1), blockers go on dead ends and everything else is
+    placed by probing random cells, so apart from writing the maze nothing
+    is proportional to rows*cols. teleport_cells is None: MazeGame probes
+    for teleport targets as well. Pickling sends only the grid's file path,
+    so the process prefetcher can hand the world over without copying it.
+    """
+    rng = random.Random(seed)
+    maze = ChunkedGrid.from_rows(eller_rows(cols, rows, rng), rows, cols)
+    add_extra_paths(maze, rng=rng)
+    exit_pos = link_exit(maze)
+    exit_cell = (exit_pos['x'], exit_pos['y'])
+
+    start_exit = {start, exit_cell}
+    traps = probe_floor_cells(maze, rng.randint(3, 7), start_exit, rng)
+    monsters, puppy = [], None
+    if level in (2, 3):
+        # (1, 1) 是送小狗回家的終點，也不能被擋住
+        planner = DeadEndPlanner(maze, exclude=set(traps) | start_exit | {(1, 1)}, rng=rng)
+        monsters = planner.place_pairs(2)
+        if level == 3:
+            puppy = planner.place_single()
+
+    occupied = set(traps).union(*monsters) | start_exit
+    if puppy is not None:
+        occupied.add(puppy)
+    qm_count = rng.randint(5, 6) if quiz_count is None else quiz_count
+    quiz_cells = probe_floor_cells(maze, qm_count, occupied, rng)
+    return {
+        'level': level,
+        'seed': seed,
+        'maze': maze,
+        'exit_pos': exit_pos,
+        'traps': traps,
+        'monsters': monsters,
+        'puppy': puppy,
+        'quiz_cells': quiz_cells,
+        'swarm_seed': rng.getrandbits(64),
+        'teleport_cells': None,
+        'path_graph': None,
+    }
+
+class LevelPrefetcher:
+    """Builds the predicted next layout on a worker so a level switch is just a swap.
+
+    mode is 'thread' or 'process' (a spawn-based process pool, which keeps
+    big builds off the GIL). take() never waits: a layout that is not
+    finished yet counts as a miss and the caller builds it synchronously.
+    """
+
+    def __init__(self, mode='thread'):
+        self.mode = mode
+        self._executor = None
+        self._key = None
+        self._future = None
+        self.hits = 0
+        self.misses = 0
+
+    def _pool(self):
+        if self._executor is None:
+            if self.mode == 'process':
+                self._executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix='level-prefetch')
+        return self._executor
+
+    def prefetch(self, key):
+        """Start build_layout(*key) in the background (replacing any other pending build)."""
+        if key == self._key:
+            return
+        if self._future is not None:
+            self._future.cancel()
+        self._key = key
+        self._future = self._pool().submit(build_layout, *key)
+
+    def take(self, key):
+        """The prefetched layout for `key` if it is ready, else None."""
+        future, ready = self._future, False
+        if future is not None and self._key == key and future.done() and not future.cancelled():
+            ready = future.exception() is None
+        if future is not None and self._key == key:
+            self._key = self._future = None
+        if ready:
+            self.hits += 1
+            return future.result()
+        self.misses += 1
+        return None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._key = self._future = None
@@ -1,43 +1,30 @@
+import time
+START_TIME = time.perf_counter()  # 啟動時間量測的起點（盡量早）
+
 import pygame
-import random
+import argparse
 import math
-from collections import deque
+import threading
+
+import placement
+import reach
+from chunkcache import ChunkCache
+from fontcache import resolve_font
+from game import MazeGame
+from mazebank import MazeBank
+from profiler import FrameProfiler
+from replay import InputLog, Replayer
+from textcache import TextCache
 
 # ---------------------- 配置 ----------------------
 CELL_SIZE = 25
 WIDTH = 900
 HEIGHT = 600
+# 預設迷宮剛好填滿視窗；--size 可以指定更大的迷宮，畫面會跟著玩家捲動
 ROWS = HEIGHT // CELL_SIZE
 COLS = WIDTH // CELL_SIZE
-EXTRA_PATHS = 350
 FPS = 60
 
-# ---------------------- 初始化 ----------------------
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Maze Game - 3 Levels")
-clock = pygame.time.Clock()
-# 狀態：是否在說明畫面
-show_intro = True
-# Pick a font that supports Chinese characters; prefer common Windows fonts then fall back to default.
-font_candidates = [
-    "Microsoft JhengHei", "Microsoft JhengHei UI", "SimHei", "SimSun",
-    "Arial Unicode MS", "NotoSansCJK-Regular"
-]
-font_path = None
-for name in font_candidates:
-    match = pygame.font.match_font(name)
-    if match:
-        font_path = match
-        break
-
-if font_path:
-    # Use a specific TTF path to ensure Chinese glyphs render
-    font = pygame.font.Font(font_path, 48)
-else:
-    # Fallback to the default system font
-    font = pygame.font.SysFont(None, 48)
-
 # ---------------------- 顏色 ----------------------
 BG_COLOR = (0, 26, 51)
 WALL_COLOR = (255, 255, 255)
@@ -49,532 +36,299 @@ MONSTER_COLOR = (255, 105, 180)  # 粉紅色：半夜放閃的情侶（定點）
 PUPPY_COLOR = (255, 200, 200)  # 心碎小狗顏色（淺粉）
 START_COLOR = (255, 165, 0)  # 起點方塊（橘色），可穿透
 QUIZ_MONSTER_COLOR = (255, 0, 0)  # 紅色：中央常識題庫怪物（移動、可穿透）
+HINT_COLOR = (0, 200, 255)  # 提示箭頭（淺藍）
 
-# ---------------------- 遊戲狀態 ----------------------
-maze = []
-player = {'x': 1, 'y': 1}
-exit_pos = {'x': ROWS - 2, 'y': COLS - 2}
+# ---------------------- 前端狀態 ----------------------
+# 遊戲邏輯都在 game.MazeGame；這裡只負責顯示與輸入
+screen = None
+clock = None
+font = None
+font_path = None
+font_path_resolved = False
+game = None
 glow_time = 0
-show_victory = False
-traps = set()  # 存放 (r,c) 的傳送陷阱位置
-monsters = []  # list of {'cells': {(r1,c1),(r2,c2)}, 'triggered': False}
-reveal_until = 0  # pygame.time.get_ticks() ms until which fog is removed
-puppy = None  # heartbroken puppy dict or None: {'pos':(r,c), 'activated':False, 'delivered':False}
-path_history = deque(maxlen=32)  # keep recent player positions for following behavior
-exit_attempts = 0  # attempts to step on exit while puppy active and undelivered
-show_message = False
-message_text = ""
-message_suppressed = False  # if True, the last_message_text was closed by the player (space) and shouldn't re-show
-last_message_text = None
-
-# ---------------------- 中央常識題庫怪物（移動怪） ----------------------
-quiz_monsters = []  # list of {'pos':(r,c)}
-quiz_move_interval = 500  # ms between moves (0.5s)
-quiz_last_move = 0
-quiz_active = False
-quiz_current = None  # {'index': idx, 'question': q, 'answer': a, 'input': ''}
+text_cache = TextCache()
 quiz_input_focused = False
 quiz_caret_last = 0
+show_hint = False  # H 鍵：顯示往出口的提示箭頭與剩餘步數
+# 啟動各階段完成的時間（ms，從 START_TIME 起算）；first_frame 即 time-to-first-frame
+startup_times = {}
 
-# 題庫（問題 -> 答案）
-QUESTIONS = [
-    ("中央大學英文全名", "National Central University"),
-    ("中央松果餐廳的飲料店叫?", "Comebuy"),
-    ("中央裡面的全家打幾折", "85"),
-    ("中央裡面的7-11打幾折", "9"),
-    ("中央iHouse開到幾點?", "21:00"),
+# Pick a font that supports Chinese characters; prefer common Windows fonts then fall back to default.
+font_candidates = [
+    "Microsoft JhengHei", "Microsoft JhengHei UI", "SimHei", "SimSun",
+    "Arial Unicode MS", "NotoSansCJK-Regular"
 ]
 
-level = 1
-visible_map = None  # 第二關用：走過的格子
-
-# ---------------------- 迷宮生成 ----------------------
-def generate_perfect_maze():
-    maze = [[1]*COLS for _ in range(ROWS)]
-
-    def carve(x, y):
-        maze[x][y] = 0
-        dirs = [(1,0), (-1,0), (0,1), (0,-1)]
-        random.shuffle(dirs)
-        for dx, dy in dirs:
-            nx, ny = x + dx*2, y + dy*2
-            if 0 < nx < ROWS-1 and 0 < ny < COLS-1 and maze[nx][ny] == 1:
-                maze[x+dx][y+dy] = 0
-                carve(nx, ny)
-    carve(1, 1)
-    return maze
-
-def add_extra_paths(maze, amount=EXTRA_PATHS):
-    for _ in range(amount):
-        r = random.randint(0, ROWS-1)
-        c = random.randint(0, COLS-1)
-        maze[r][c] = 0
-
-def is_reachable(maze, startX, startY, endX, endY):
-    visited = [[False]*COLS for _ in range(ROWS)]
-    queue = deque([(startX, startY)])
-    visited[startX][startY] = True
-    while queue:
-        x, y = queue.popleft()
-        if x == endX and y == endY:
-            return True
-        for dx, dy in [(1,0), (-1,0), (0,1), (0,-1)]:
-            nx, ny = x+dx, y+dy
-            if 0<=nx<ROWS and 0<=ny<COLS and not visited[nx][ny] and maze[nx][ny]==0:
-                visited[nx][ny] = True
-                queue.append((nx, ny))
-    return False
-
-def ensure_exit_reachable(maze):
-    global exit_pos
-    exit_pos = {'x': ROWS-2, 'y': COLS-2}
-    maze[exit_pos['x']][exit_pos['y']] = 0
-    if not is_reachable(maze, 1,1, exit_pos['x'], exit_pos['y']):
-        cx, cy = exit_pos['x'], exit_pos['y']
-        while not is_reachable(maze, 1,1, cx, cy):
-            dirs = [(-1,0),(0,-1),(1,0),(0,1)]
-            random.shuffle(dirs)
-            for dx, dy in dirs:
-                nx, ny = cx+dx, cy+dy
-                if 0<nx<ROWS-1 and 0<ny<COLS-1:
-                    maze[nx][ny] = 0
-                    if is_reachable(maze,1,1,nx,ny):
-                        cx, cy = nx, ny
-                        break
-
-def generate_maze():
-    global maze, player, show_victory
-    global level, visible_map
-    global monster, reveal_until
-    global puppy, path_history, exit_attempts, show_message, message_text, message_suppressed, last_message_text
-
-    global monsters
-    maze = generate_perfect_maze()
-    add_extra_paths(maze)
-    ensure_exit_reachable(maze)
-    player = {'x':1, 'y':1}
-    show_victory = False
-    # reset any message suppression when generating a new maze (allow messages again)
-    message_suppressed = False
-    last_message_text = None
-    # start path history with starting position
-    path_history.append((player['x'], player['y']))
-
-    # ★ 在每張迷宮上隨機放置 3~7 個傳送陷阱，放在地面 (maze == 0) 上，且不能放在玩家起點或出口
-    traps.clear()
-    available = [(r, c) for r in range(ROWS) for c in range(COLS)
-                 if maze[r][c] == 0 and not (r == player['x'] and c == player['y'])
-                 and not (r == exit_pos['x'] and c == exit_pos['y'])]
-    trap_count = random.randint(3, 7)
-    if available:
-        trap_count = min(trap_count, len(available))
-        chosen = random.sample(available, trap_count)
-        for pos in chosen:
-            traps.add(pos)
-
-    # 在所有關卡放置 5~6 個移動的題庫怪物（紅色，可穿透），不可生於起點或出口或陷阱或固定怪物占格
-    quiz_monsters.clear()
-    qm_count = random.randint(5, 6)
-    available_qm = [(r, c) for r in range(ROWS) for c in range(COLS)
-                    if maze[r][c] == 0 and (r, c) != (player['x'], player['y'])
-                    and (r, c) != (exit_pos['x'], exit_pos['y'])
-                    and (r, c) not in traps]
-    # also exclude two-cell monster cells if exists
-    for m in monsters:
-        for cell in m['cells']:
-            if cell in available_qm:
-                available_qm.remove(cell)
-    # and avoid puppy location if present
-    if puppy is not None and puppy.get('pos') in available_qm:
-        available_qm.remove(puppy.get('pos'))
-
-    if available_qm:
-        qm_count = min(qm_count, len(available_qm))
-        chosen_qm = random.sample(available_qm, qm_count)
-        for pos in chosen_qm:
-            # Each quiz monster stores its current question/answer (None until it picks one)
-            quiz_monsters.append({'pos': pos, 'question': None, 'answer': None})
-    # reset movement timer
-    global quiz_last_move
-    quiz_last_move = pygame.time.get_ticks()
-
-    # 第二、三關必定生成兩個雙格怪物（放閃情侶）
-    monsters = []
-    reveal_until = 0
-    if level in (2, 3):
-        needed = 2
-        attempts = 500
-        used_cells = set()
-        for _ in range(attempts):
-            if len(monsters) >= needed:
-                break
-            r = random.randint(1, ROWS-2)
-            c = random.randint(1, COLS-2)
-            if maze[r][c] != 0 or (r, c) in used_cells:
-                continue
-            dirs = [(1,0), (-1,0), (0,1), (0,-1)]
-            random.shuffle(dirs)
-            for dr, dc in dirs:
-                r2, c2 = r+dr, c+dc
-                if 0 <= r2 < ROWS and 0 <= c2 < COLS and maze[r2][c2] == 0 and (r2, c2) not in used_cells:
-                    # 不可與起點、終點、陷阱重疊
-                    if (r, c) == (player['x'], player['y']) or (r2, c2) == (player['x'], player['y']):
-                        continue
-                    if (r, c) == (exit_pos['x'], exit_pos['y']) or (r2, c2) == (exit_pos['x'], exit_pos['y']):
-                        continue
-                    if (r, c) in traps or (r2, c2) in traps:
-                        continue
-                    # 不可與其他怪物重疊
-                    overlap = False
-                    for m in monsters:
-                        if (r, c) in m['cells'] or (r2, c2) in m['cells']:
-                            overlap = True
-                            break
-                    if overlap:
-                        continue
-                    # 暫時設為牆測試可達性
-                    maze[r][c] = 1
-                    maze[r2][c2] = 1
-                    reachable = is_reachable(maze, 1, 1, exit_pos['x'], exit_pos['y'])
-                    maze[r][c] = 0
-                    maze[r2][c2] = 0
-                    if reachable:
-                        monsters.append({'cells': {(r, c), (r2, c2)}, 'triggered': False})
-                        used_cells.add((r, c))
-                        used_cells.add((r2, c2))
-                        break
-
-    # 關卡視野設定
-    if level == 1:
-        visible_map = None
-    elif level == 2:
-        visible_map = [[False]*COLS for _ in range(ROWS)]
-        visible_map[player['x']][player['y']] = True
-    elif level == 3:
-        visible_map = None
-    # 第三關：必定生成 1 個心碎小狗（單格，不可穿過），放置時需保證出口可達
-    puppy = None
-    path_history.clear()
-    path_history.append((player['x'], player['y']))
-    exit_attempts = 0
-    show_message = False
-    message_text = ""
-    message_suppressed = False
-    last_message_text = None
-    message_suppressed = False
-    last_message_text = None
-    if level == 3:
-        # find a candidate floor tile not start/exit/traps/other monster and that doesn't block the path
-        attempts = 200
-        for _ in range(attempts):
-            r = random.randint(1, ROWS-2)
-            c = random.randint(1, COLS-2)
-            if maze[r][c] != 0:
-                continue
-            if (r, c) == (player['x'], player['y']) or (r, c) == (exit_pos['x'], exit_pos['y']):
-                continue
-            if (r, c) in traps:
-                continue
-            skip = False
-            for m in monsters:
-                if (r, c) in m['cells']:
-                    skip = True
-                    break
-            if skip:
-                continue
-
-            # temporarily mark puppy tile as wall to test reachability
-            maze[r][c] = 1
-            ok = is_reachable(maze, 1, 1, exit_pos['x'], exit_pos['y'])
-            maze[r][c] = 0
-            if ok:
-                puppy = {'pos': (r, c), 'activated': False, 'delivered': False}
-                break
-
-# ---------------------- 遊戲邏輯 ----------------------
-def move_player(dx, dy):
-    global show_victory, level, visible_map
-    global reveal_until
-    global puppy, path_history, exit_attempts, show_message, message_text, message_suppressed, last_message_text
-    global quiz_monsters, quiz_active, quiz_current
-
-    nx, ny = player['x'] + dx, player['y'] + dy
-    # 不能移動到牆或怪物占格
-    blocked_by_monster = False
-    for m in monsters:
-        if (nx, ny) in m['cells']:
-            blocked_by_monster = True
-            break
-
-    blocked_by_puppy = False
-    if puppy is not None and not puppy.get('activated', False):
-        if (nx, ny) == puppy.get('pos'):
-            blocked_by_puppy = True
-
-    if 0 <= nx < ROWS and 0 <= ny < COLS and maze[nx][ny] == 0 and not blocked_by_monster and not blocked_by_puppy:
-        player['x'], player['y'] = nx, ny
-
-        # ★ 第2關：只記錄“走過”的格子
-        if level == 2:
-            visible_map[nx][ny] = True
-
-        # append path history for puppy following
-        path_history.append((player['x'], player['y']))
-
-        # 過關判定：如果有被啟動但未被送走的心碎小狗，則不能過關
-        if nx == exit_pos['x'] and ny == exit_pos['y']:
-            # if puppy active and not delivered, block victory and show message
-            if level == 3 and puppy is not None and puppy.get('activated', False) and not puppy.get('delivered', False):
-                exit_attempts += 1
-                if exit_attempts > 3:
-                    new_msg = "你怎麼可以不送小狗回家?"
-                else:
-                    new_msg = "你是不是忘了要送誰回家"
-                # only show if user hasn't suppressed this exact message
-                if message_suppressed and last_message_text == new_msg:
-                    # do not re-show
-                    pass
-                else:
-                    message_text = new_msg
-                    show_message = True
-                    # reset suppression when showing a new/different message
-                    message_suppressed = False
-                    last_message_text = None
-                print(new_msg)
-            else:
-                show_victory = True
-                if level == 3:
-                    # 第三關勝利，5 秒後自動關閉
-                    pygame.time.set_timer(pygame.USEREVENT + 1, 5000, loops=1)
-                else:
-                    pygame.time.set_timer(pygame.USEREVENT, 2000, loops=1)
-                    if level < 3:
-                        level += 1
-                        generate_maze_for_next_level()
-
-        # ★ 處理傳送陷阱：如果踩到 trap，則立即傳送至地圖上另一個隨機非牆位置（排除出口與其他陷阱），並且移除該陷阱
-        if (nx, ny) in traps:
-            # remove the trap so it cannot be retriggered
-            traps.discard((nx, ny))
-
-            # 找所有可傳送的位置：非牆且不是其他陷阱、不是出口，也不能是玩家當前位置（避免原地傳送）
-            curr_pos = (nx, ny)
-            destinations = [(r, c) for r in range(ROWS) for c in range(COLS)
-                            if maze[r][c] == 0 and (r, c) not in traps
-                            and not (r == exit_pos['x'] and c == exit_pos['y'])
-                            and not (r, c) == curr_pos]
-            # exclude monster cells
-            for m in monsters:
-                destinations = [d for d in destinations if d not in m['cells']]
-            if destinations:
-                dest_r, dest_c = random.choice(destinations)
-                # 明確設定整數格座標以確保角色仍在格子中心
-                player['x'], player['y'] = int(dest_r), int(dest_c)
-
-                # 如果是第二關，也要把傳送到的新格子標記為已探索
-                if level == 2 and visible_map is not None:
-                    visible_map[int(dest_r)][int(dest_c)] = True
-            else:
-                # 沒有可傳送的合法位置：保留在原地，但已移除觸發陷阱
-                pass
-
-        # ★ 檢查是否接近（撞上）怪物的範圍（距離 ≤ 1）以觸發視野消失效果，如果怪物尚未被觸發
-        for m in monsters:
-            if not m.get('triggered', False):
-                # player's current position
-                px, py = player['x'], player['y']
-                triggered = False
-                for (mr, mc) in m['cells']:
-                    # 僅在四向相鄰（不包含對角）才視為觸發
-                    if abs(mr - px) + abs(mc - py) == 1:
-                        triggered = True
-                        break
-                if triggered:
-                    m['triggered'] = True
-                    # 取消視野遮蔽：把 reveal_until 設為四秒以後
-                    reveal_until = pygame.time.get_ticks() + 4000
-
-        # 心碎小狗：啟動 / 跟隨 / 送回家
-        if level == 3 and puppy is not None:
-            # activation when puppy is inside view (5x5 centered on player)
-            if not puppy.get('activated', False):
-                if abs(puppy['pos'][0] - player['x']) <= 2 and abs(puppy['pos'][1] - player['y']) <= 2:
-                    puppy['activated'] = True
-                    new_msg = "終於有人要送我回家了嗎!!!!"
-                    if message_suppressed and last_message_text == new_msg:
-                        # suppressed by player previously -> don't re-show
-                        pass
-                    else:
-                        message_text = new_msg
-                        show_message = True
-                        message_suppressed = False
-                        last_message_text = None
-                    print(new_msg)
-                    # set initial follow position
-                    if len(path_history) >= 3:
-                        puppy['pos'] = path_history[-3]
-            else:
-                # once activated and not delivered, puppy follows two tiles behind
-                if not puppy.get('delivered', False) and len(path_history) >= 3:
-                    puppy['pos'] = path_history[-3]
-
-        # 若玩家回到起點並且 puppy 已啟動未送達，視為送回家 -> 消失並顯示訊息
-        if level == 3 and puppy is not None and puppy.get('activated', False) and not puppy.get('delivered', False):
-            start_pos = (1, 1)
-            if (player['x'], player['y']) == start_pos:
-                puppy['delivered'] = True
-                puppy = None
-                new_msg = "謝謝你帶我回家"
-                if not (message_suppressed and last_message_text == new_msg):
-                    message_text = new_msg
-                    show_message = True
-                    message_suppressed = False
-                    last_message_text = None
-                print(new_msg)
-                exit_attempts = 0
-
-        # ---- 碰到 quiz monster by player movement (未觸發前重疊即觸發) ----
-        if not quiz_active:
-            for i, qm in enumerate(quiz_monsters):
-                if qm.get('pos') == (player['x'], player['y']):
-                    # choose a question for this monster when triggered
-                    if not qm.get('question'):
-                        q, a = random.choice(QUESTIONS)
-                        qm['question'], qm['answer'] = q, a
-                    else:
-                        q, a = qm['question'], qm['answer']
-                    quiz_active = True
-                    quiz_current = {'index': i, 'question': q, 'answer': a, 'input': ""}
-                    quiz_input_focused = True
-                    # enable IME / text input mode so TEXTINPUT events provide composed characters (Chinese)
-                    try:
-                        pygame.key.start_text_input()
-                    except Exception:
-                        pass
-                    print(q)
-                    break
+def mark_startup(phase):
+    if phase not in startup_times:
+        startup_times[phase] = (time.perf_counter() - START_TIME) * 1000
+
+def init_display():
+    # 只初始化用得到的模組（不開音效、搖桿）；字型等第一次畫字時再載入
+    global screen, clock
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Maze Game - 3 Levels")
+    clock = pygame.time.Clock()
+    mark_startup('display')
+
+def get_font_path():
+    # 字型路徑存在磁碟快取裡（見 fontcache.py），平常啟動不必再 match_font
+    global font_path, font_path_resolved
+    if not font_path_resolved:
+        font_path = resolve_font(font_candidates, pygame.font.match_font)
+        font_path_resolved = True
+        mark_startup('font_path')
+    return font_path
+
+def get_font():
+    global font
+    if font is None:
+        if get_font_path():
+            # Use a specific TTF path to ensure Chinese glyphs render
+            font = pygame.font.Font(font_path, 48)
+        else:
+            # Fallback to the default system font
+            font = pygame.font.SysFont(None, 48)
+    return font
+
+# ---------------------- 鏡頭 ----------------------
+# 迷宮可以比視窗大：鏡頭跟著玩家，世界座標（px）減掉 camera 就是螢幕座標。
+# 迷宮不比視窗大時 camera 固定在 (0, 0)，畫面和以前一樣。
+camera = [0, 0]  # 視窗左上角的世界座標 (x, y)
+VIEW_MARGIN = 1  # 視窗外多畫的格數
+
+def update_camera():
+    world_w, world_h = game.cols*CELL_SIZE, game.rows*CELL_SIZE
+    x = game.player['y']*CELL_SIZE + CELL_SIZE//2 - WIDTH//2
+    y = game.player['x']*CELL_SIZE + CELL_SIZE//2 - HEIGHT//2
+    camera[0] = max(0, min(x, world_w - WIDTH))
+    camera[1] = max(0, min(y, world_h - HEIGHT))
+
+def view_range():
+    # 視窗內（加上 margin）的格子範圍 (r0, c0, r1, c1)，r1 / c1 不含
+    cx, cy = camera
+    return (max(0, cy // CELL_SIZE - VIEW_MARGIN), max(0, cx // CELL_SIZE - VIEW_MARGIN),
+            min(game.rows, (cy + HEIGHT) // CELL_SIZE + 1 + VIEW_MARGIN),
+            min(game.cols, (cx + WIDTH) // CELL_SIZE + 1 + VIEW_MARGIN))
+
+def cell_rect(r, c):
+    # 格子在螢幕上的位置
+    return (c*CELL_SIZE - camera[0], r*CELL_SIZE - camera[1], CELL_SIZE, CELL_SIZE)
+
+# ---------------------- 靜態圖層 ----------------------
+# 牆/地板/起點只在產生新迷宮時改變：按區塊預先畫到離屏 Surface（見 chunkcache.py），
+# 每幀只 blit 視窗看得到的幾塊
+CHUNK = 16  # 每個區塊的格數（邊長）
+CHUNK_PX = CHUNK * CELL_SIZE
+
+def visible_chunks():
+    cx, cy = camera
+    for cr in range(cy // CHUNK_PX, (cy + HEIGHT - 1) // CHUNK_PX + 1):
+        for cc in range(cx // CHUNK_PX, (cx + WIDTH - 1) // CHUNK_PX + 1):
+            yield cr, cc
+
+def build_static_chunk(cr, cc, surface):
+    if surface is None:
+        surface = pygame.Surface((CHUNK_PX, CHUNK_PX)).convert()
+    surface.fill(BG_COLOR)
+    maze = game.maze
+    r0, c0 = cr*CHUNK, cc*CHUNK
+    c1 = min(c0 + CHUNK, game.cols)
+    for r in range(r0, min(r0 + CHUNK, game.rows)):
+        row = maze[r]
+        y = (r - r0)*CELL_SIZE
+        for c in range(c0, c1):
+            if row[c] == 1:
+                surface.fill(WALL_COLOR, ((c - c0)*CELL_SIZE, y, CELL_SIZE, CELL_SIZE))
+    # 第三關起點方塊 (可穿透)
+    if game.level == 3 and r0 <= 1 < r0 + CHUNK and c0 <= 1 < c0 + CHUNK:
+        x, y = (1 - c0)*CELL_SIZE, (1 - r0)*CELL_SIZE
+        surface.fill(START_COLOR, (x + CELL_SIZE//8, y + CELL_SIZE//8, CELL_SIZE*3//4, CELL_SIZE*3//4))
+    return surface
+
+static_chunks = ChunkCache(build_static_chunk)
+
+def draw_static_layer():
+    key = (game.maze_version, game.level)
+    for cr, cc in visible_chunks():
+        screen.blit(static_chunks.get(key, cr, cc), (cc*CHUNK_PX - camera[0], cr*CHUNK_PX - camera[1]))
+
+# 同一格多個實體時的繪製順序（問答怪最後畫）
+ENTITY_ORDER = {'trap': 0, 'monster': 1, 'puppy': 2}
+
+def draw_cell_entities(r, c, records):
+    x, y = c*CELL_SIZE - camera[0], r*CELL_SIZE - camera[1]
+    for kind, _ in sorted(records, key=lambda rec: ENTITY_ORDER[rec[0]]):
+        if kind == 'trap':
+            pygame.draw.rect(screen, TRAP_COLOR, (x + CELL_SIZE//6, y + CELL_SIZE//6, CELL_SIZE*2//3, CELL_SIZE*2//3))
+        elif kind == 'monster':
+            pygame.draw.rect(screen, MONSTER_COLOR, (x, y, CELL_SIZE, CELL_SIZE))
+        elif kind == 'puppy':
+            # 如果尚未啟動則視為阻擋方塊(整格)，啟動後改為可穿透但仍顯示
+            pygame.draw.rect(screen, PUPPY_COLOR, (x, y, CELL_SIZE, CELL_SIZE))
+
+def draw_quiz_monster(r, c):
+    x, y = c*CELL_SIZE - camera[0], r*CELL_SIZE - camera[1]
+    pygame.draw.rect(screen, QUIZ_MONSTER_COLOR, (x + CELL_SIZE//6, y + CELL_SIZE//6, CELL_SIZE*2//3, CELL_SIZE*2//3))
+
+def draw_entities(cells=None):
+    # 只畫會變動的東西（陷阱、情侶、小狗、問答怪）；cells 為 None 時畫視窗內所有被占用的格子
+    occ, swarm = game.occupancy, game.quiz_monsters
+    if cells is None:
+        r0, c0, r1, c1 = view_range()
+        if len(occ) <= (r1 - r0) * (c1 - c0):
+            # 實體比視窗格子少：掃實體再裁切
+            for (r, c), records in occ.items():
+                if r0 <= r < r1 and c0 <= c < c1:
+                    draw_cell_entities(r, c, records)
+        else:
+            for r in range(r0, r1):
+                for c in range(c0, c1):
+                    records = occ.at((r, c))
+                    if records:
+                        draw_cell_entities(r, c, records)
+        for r, c in swarm.cells_in(r0, c0, r1, c1):
+            draw_quiz_monster(r, c)
+    else:
+        for (r, c) in cells:
+            records = occ.at((r, c))
+            if records:
+                draw_cell_entities(r, c, records)
+            if swarm.count_at((r, c)):
+                draw_quiz_monster(r, c)
 
 # ---------------------- 視野繪圖 ----------------------
-def draw_limited_view():
-    radius = 2
-    px, py = player['x'], player['y']
-
-    for r in range(ROWS):
-        for c in range(COLS):
-            rect = (c*CELL_SIZE, r*CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            in_current_view = abs(r - px) <= radius and abs(c - py) <= radius
-
-            if level == 2:
-                # ★顯示條件：走過 or 目前 5×5
-                if not visible_map[r][c] and not in_current_view:
-                    pygame.draw.rect(screen, HIDDEN_COLOR, rect)
-                    continue
+# 迷霧也按區塊存成 per-pixel alpha Surface：產生新迷宮時作廢，區塊第一次被看到時
+# 整塊蓋黑再挖開走過的格子；之後只在 MazeGame.explore 標記新格子時挖開那一格。
+VIEW_RADIUS = 2
+
+def build_fog_chunk(cr, cc, surface):
+    if surface is None:
+        surface = pygame.Surface((CHUNK_PX, CHUNK_PX), pygame.SRCALPHA)
+    surface.fill(HIDDEN_COLOR + (255,))
+    # 第二關：補上這塊裡已走過的格子
+    visible = game.visible_map
+    if visible is not None:
+        r0, c0 = cr*CHUNK, cc*CHUNK
+        c1 = min(c0 + CHUNK, game.cols)
+        for r in range(r0, min(r0 + CHUNK, game.rows)):
+            for c in visible.ones(r, c0, c1):
+                surface.fill((0, 0, 0, 0), ((c - c0)*CELL_SIZE, (r - r0)*CELL_SIZE, CELL_SIZE, CELL_SIZE))
+    return surface
+
+fog_chunks = ChunkCache(build_fog_chunk)
+
+def reveal_fog_cell(r, c):
+    fog = fog_chunks.peek((game.maze_version, game.level), r // CHUNK, c // CHUNK)
+    if fog is not None:
+        fog.fill((0, 0, 0, 0), ((c % CHUNK)*CELL_SIZE, (r % CHUNK)*CELL_SIZE, CELL_SIZE, CELL_SIZE))
+
+def draw_fog(hole):
+    # 目前 5×5 視野：暫時在迷霧區塊上挖洞，整塊 blit，再把洞補回去
+    key = (game.maze_version, game.level)
+    for cr, cc in visible_chunks():
+        fog = fog_chunks.get(key, cr, cc)
+        origin = (cc*CHUNK_PX, cr*CHUNK_PX)
+        pos = (origin[0] - camera[0], origin[1] - camera[1])
+        local = hole.move(-origin[0], -origin[1]).clip(fog.get_rect())
+        if local.width and local.height:
+            saved = fog.subsurface(local).copy()
+            fog.fill((0, 0, 0, 0), local)
+            screen.blit(fog, pos)
+            fog.blit(saved, local.topleft, special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            screen.blit(fog, pos)
 
-            if level == 3:
-                if not in_current_view:
-                    pygame.draw.rect(screen, HIDDEN_COLOR, rect)
-                    continue
+def draw_limited_view():
+    exit_pos = game.exit_pos
+    px, py = game.player['x'], game.player['y']
+
+    draw_static_layer()
+    pygame.draw.rect(screen, EXIT_COLOR, cell_rect(exit_pos['x'], exit_pos['y']))
+    if game.level == 2:
+        # 走過的格子也看得到；被迷霧蓋住的東西不會被看到，所以視窗內的實體全部照畫
+        draw_entities()
+    else:
+        # 第三關只看得到目前 5×5：逐格查索引
+        draw_entities([(r, c) for r in range(px - VIEW_RADIUS, px + VIEW_RADIUS + 1)
+                       for c in range(py - VIEW_RADIUS, py + VIEW_RADIUS + 1)])
 
-            # 正常繪製
-            if maze[r][c] == 1:
-                pygame.draw.rect(screen, WALL_COLOR, rect)
-            else:
-                pygame.draw.rect(screen, BG_COLOR, rect)
-
-            if r == exit_pos['x'] and c == exit_pos['y']:
-                pygame.draw.rect(screen, EXIT_COLOR, rect)
-            # 第三關起點方塊 (可穿透)
-            if level == 3 and (r, c) == (1, 1):
-                inner = (rect[0]+CELL_SIZE//8, rect[1]+CELL_SIZE//8, CELL_SIZE*3//4, CELL_SIZE*3//4)
-                pygame.draw.rect(screen, START_COLOR, inner)
-            # 畫陷阱（若該格是地面且目前可見）
-            if (r, c) in traps:
-                # 畫一個小方塊代表陷阱
-                inner = (rect[0]+CELL_SIZE//6, rect[1]+CELL_SIZE//6, CELL_SIZE*2//3, CELL_SIZE*2//3)
-                pygame.draw.rect(screen, TRAP_COLOR, inner)
-            # 畫怪物（若該格屬於怪物且目前可見）
-            for m in monsters:
-                if (r, c) in m['cells']:
-                    pygame.draw.rect(screen, MONSTER_COLOR, rect)
-            # 畫心碎小狗（若在可見格）
-            if puppy is not None and (r, c) == puppy['pos']:
-                # 如果尚未啟動則視為阻擋方塊(整格)，啟動後改為可穿透但仍顯示
-                pygame.draw.rect(screen, PUPPY_COLOR, rect)
-            # 畫移動題庫怪（若可見）
-            for qm in quiz_monsters:
-                if (r, c) == qm['pos']:
-                    inner = (rect[0]+CELL_SIZE//6, rect[1]+CELL_SIZE//6, CELL_SIZE*2//3, CELL_SIZE*2//3)
-                    pygame.draw.rect(screen, QUIZ_MONSTER_COLOR, inner)
+    # 洞的位置用世界座標，並裁在迷宮範圍內
+    hole = pygame.Rect((py - VIEW_RADIUS)*CELL_SIZE, (px - VIEW_RADIUS)*CELL_SIZE,
+                       (2*VIEW_RADIUS + 1)*CELL_SIZE, (2*VIEW_RADIUS + 1)*CELL_SIZE)
+    draw_fog(hole.clip(pygame.Rect(0, 0, game.cols*CELL_SIZE, game.rows*CELL_SIZE)))
 
 # ---------------------- 繪圖 ----------------------
 def draw_exit_glow():
     global glow_time
     glow_time += 0.15
-    px = exit_pos['y']*CELL_SIZE + CELL_SIZE//2
-    py = exit_pos['x']*CELL_SIZE + CELL_SIZE//2
+    px = game.exit_pos['y']*CELL_SIZE + CELL_SIZE//2 - camera[0]
+    py = game.exit_pos['x']*CELL_SIZE + CELL_SIZE//2 - camera[1]
     glow = 12 + math.sin(glow_time)*6
     for i in range(6):
         pygame.draw.circle(screen, EXIT_COLOR, (px,py), int(glow*(i/6)), 2)
 
+def draw_exit_hint():
+    # 出口距離場每張迷宮只算一次，之後每幀只查玩家這一格
+    step = game.exit_hint()
+    if step is not None:
+        dr, dc = step
+        x0, y0, size, _ = cell_rect(game.player['x'], game.player['y'])
+        cx, cy = x0 + size//2, y0 + size//2
+        tip = (cx + dc*size, cy + dr*size)
+        half = size // 3
+        base = (cx + dc*size//3, cy + dr*size//3)
+        pygame.draw.polygon(screen, HINT_COLOR, [tip, (base[0] + dr*half, base[1] + dc*half),
+                                                 (base[0] - dr*half, base[1] - dc*half)])
+    dist = game.exit_distance()
+    if dist is not None:
+        text = text_cache.render(get_hud_font(), "出口 %d 步" % dist, HINT_COLOR)
+        screen.blit(text, (WIDTH - text.get_width() - 10, 10))
+
 def draw_game():
-    global quiz_input_focused, quiz_caret_last
+    global quiz_caret_last
+    font = get_font()
     screen.fill(BG_COLOR)
-    current_time = pygame.time.get_ticks()
-    reveal_active = current_time < reveal_until
+    level, player = game.level, game.player
+    update_camera()
 
-    if level == 1 or reveal_active:
+    if level == 1 or game.reveal_active():
         # 完整視野
-        for r in range(ROWS):
-            for c in range(COLS):
-                if maze[r][c] == 1:
-                    pygame.draw.rect(screen, WALL_COLOR, (c*CELL_SIZE, r*CELL_SIZE, CELL_SIZE, CELL_SIZE))
-                else:
-                    pygame.draw.rect(screen, BG_COLOR, (c*CELL_SIZE, r*CELL_SIZE, CELL_SIZE, CELL_SIZE))
-                    if (r, c) in traps:
-                        inner = (c*CELL_SIZE + CELL_SIZE//6, r*CELL_SIZE + CELL_SIZE//6, CELL_SIZE*2//3, CELL_SIZE*2//3)
-                        pygame.draw.rect(screen, TRAP_COLOR, inner)
-                    for m in monsters:
-                        if (r, c) in m['cells']:
-                            pygame.draw.rect(screen, MONSTER_COLOR, (c*CELL_SIZE, r*CELL_SIZE, CELL_SIZE, CELL_SIZE))
-                    # 第三關的起點方塊（橘色）
-                    if level == 3 and (r, c) == (1, 1):
-                        inner = (c*CELL_SIZE+CELL_SIZE//8, r*CELL_SIZE+CELL_SIZE//8, CELL_SIZE*3//4, CELL_SIZE*3//4)
-                        pygame.draw.rect(screen, START_COLOR, inner)
-                    # 心碎小狗（全圖模式也顯示）
-                    if puppy is not None and (r, c) == puppy['pos']:
-                        pygame.draw.rect(screen, PUPPY_COLOR, (c*CELL_SIZE, r*CELL_SIZE, CELL_SIZE, CELL_SIZE))
-                    # 顯示移動題庫怪
-                    for qm in quiz_monsters:
-                        if (r, c) == qm['pos']:
-                            pygame.draw.rect(screen, QUIZ_MONSTER_COLOR, (c*CELL_SIZE + CELL_SIZE//6, r*CELL_SIZE + CELL_SIZE//6, CELL_SIZE*2//3, CELL_SIZE*2//3))
+        draw_static_layer()
+        draw_entities()
     else:
         draw_limited_view()
 
     draw_exit_glow()
 
     # 玩家
-    pygame.draw.rect(screen, PLAYER_COLOR, (player['y']*CELL_SIZE, player['x']*CELL_SIZE, CELL_SIZE, CELL_SIZE))
+    pygame.draw.rect(screen, PLAYER_COLOR, cell_rect(player['x'], player['y']))
+    if show_hint:
+        draw_exit_hint()
 
-    if show_victory:
-        text = font.render("Victory!", True, (255,255,0))
+    if game.show_victory:
+        text = text_cache.render(font, "Victory!", (255,255,0))
         screen.blit(text, (WIDTH//2-100, HEIGHT//2-24))
 
-    if show_message and message_text:
-        text = font.render(message_text, True, (255,255,255))
+    if game.show_message and game.message_text:
+        text = text_cache.render(font, game.message_text, (255,255,255))
         screen.blit(text, (20, HEIGHT - 60))
 
     # quiz overlay for question/answer (centered white box)
-    if quiz_active and quiz_current is not None:
+    quiz_current = game.quiz_current
+    if game.quiz_active and quiz_current is not None:
         box_w, box_h = WIDTH * 2 // 3, HEIGHT // 3
         box_x = (WIDTH - box_w) // 2
         box_y = (HEIGHT - box_h) // 2
         # white background
         pygame.draw.rect(screen, (255,255,255), (box_x, box_y, box_w, box_h))
         # question text (top part)
-        q_text = font.render(quiz_current['question'], True, (0,0,0))
+        q_text = text_cache.render(font, quiz_current['question'], (0,0,0))
         screen.blit(q_text, (box_x + 20, box_y + 20))
         # input box bottom area
-        # 增加作答框寬度（原本 box_w - 40，改為 box_w * 1.5 - 40，並限制不超過畫面寬度-40）
         # 作答框長度為白色區域的0.9倍，左右有邊界
         input_box_width = int(box_w * 0.9)
         input_box_height = int(50 * 1.5)
@@ -582,20 +336,11 @@ def draw_game():
         input_box_y = box_y + box_h - input_box_height - 15
         input_box = (input_box_x, input_box_y, input_box_width, input_box_height)
         pygame.draw.rect(screen, (230,230,230), input_box)
-        # 處理作答內容超出框時的水平捲動
+        # 處理作答內容超出框時的水平捲動：只顯示放得下的最後一段（從右邊開始顯示）
         user_input = quiz_current.get('input', '')
-        input_text = font.render(user_input, True, (0,0,0))
         max_text_width = input_box[2] - 20  # 框內可用寬度（左右各留 10px）
-        if input_text.get_width() > max_text_width:
-            # 計算要顯示的子字串（從右邊開始顯示）
-            cut = len(user_input)
-            while cut > 0 and font.render(user_input[-cut:], True, (0,0,0)).get_width() > max_text_width:
-                cut -= 1
-            display_text = user_input[-cut:]
-            display_render = font.render(display_text, True, (0,0,0))
-        else:
-            display_text = user_input
-            display_render = input_text
+        display_text = text_cache.fit_tail(font, user_input, max_text_width)
+        display_render = text_cache.render(font, display_text, (0,0,0))
         screen.blit(display_render, (input_box[0] + 10, input_box[1] + 10))
         # caret blinking when focused，游標位置跟隨顯示文字
         if quiz_input_focused:
@@ -609,400 +354,403 @@ def draw_game():
                 caret_y2 = input_box[1] + 8 + display_render.get_height()
                 pygame.draw.line(screen, (0,0,0), (caret_x, caret_y1), (caret_x, caret_y2), 2)
 
+# ---------------------- 效能 HUD ----------------------
+# F3 開關 HUD（關掉時連計時和 pygame.draw 的包裝一起拿掉），F4 把環狀緩衝區存成 CSV
+# 可達性計數看的是產生關卡時真正跑的：ReachField 每次淹水、st_separators 每次找必經格。
+# 背景執行緒預載的關卡算在當下那一幀；行程預載在別的行程裡跑，不會被算到。
+profiler = FrameProfiler(counters=('draw_calls', 'reach_floods', 'separators'))
+profile_hud = False
+profile_hud_lines = []
+hud_font = None
+PROFILE_CSV = "frame_profile.csv"
+PROFILE_HUD_EVERY = 15  # 每幾幀重算一次百分位數
+COUNTED_DRAW_CALLS = ('rect', 'circle', 'line', 'lines', 'polygon', 'ellipse', 'arc')
+
+def enable_profiler():
+    if profiler.enabled:
+        return
+    profiler.enabled = True
+    profiler.watch(reach.ReachField, '_flood', 'reach_floods')
+    profiler.watch(placement, 'st_separators', 'separators')
+    for name in COUNTED_DRAW_CALLS:
+        profiler.watch(pygame.draw, name, 'draw_calls')
+
+def disable_profiler():
+    profiler.enabled = False
+    profiler.cancel_frame()
+    profiler.unwatch_all()
+
+def handle_profiler_key(key):
+    global profile_hud
+    if key == pygame.K_F3:
+        profile_hud = not profile_hud
+        if profile_hud:
+            enable_profiler()
+        else:
+            disable_profiler()
+    elif key == pygame.K_F4:
+        # 只匯出已經記錄的幀，不會自己打開 profiler
+        if profiler.frames:
+            print("frame profile written to " + profiler.dump_csv(PROFILE_CSV))
+        else:
+            print("no frames recorded yet: press F3 to start the profiler")
+
+def get_hud_font():
+    global hud_font
+    if hud_font is None:
+        path = get_font_path()
+        hud_font = pygame.font.Font(path, 16) if path else pygame.font.SysFont(None, 18)
+    return hud_font
+
+def draw_profile_hud():
+    global profile_hud_lines
+    if not profile_hud_lines or profiler.frames % PROFILE_HUD_EVERY == 0:
+        s = profiler.summary()
+        profile_hud_lines = [
+            "frame p50 %.2f  p95 %.2f  p99 %.2f ms (%d)" % (s['frame'] + (s['frames'],)),
+            "  ".join("%s %.2f" % (p, s[p]) for p in profiler.phases) + " ms",
+            "draw calls %d  reach floods %d  separators %d"
+            % (s['draw_calls'], s['reach_floods'], s['separators']),
+        ]
+    hud_font = get_hud_font()
+    y = 4
+    for line in profile_hud_lines:
+        text = text_cache.render(hud_font, line, (255, 255, 0))
+        screen.fill((0, 0, 0), (4, y, text.get_width() + 8, text.get_height()))
+        screen.blit(text, (8, y))
+        y += text.get_height()
+
+# ---------------------- 說明畫面 ----------------------
+INTRO_TITLE = "歡迎來到: 迷路的分店:迷宮"
+# 角色圖示資料: (顏色, 說明)
+INTRO_ROLES = (
+    (QUIZ_MONSTER_COLOR, "紅色隨機移動方塊: 問題怪物，玩家觸碰到該角色後須回答問題，若正確即可繼續遊戲，若錯誤則被遣返原點。"),
+    (TRAP_COLOR, "紫色固定方塊: 隨機傳送通道，玩家觸碰該角色後會被隨機傳送到迷宮的任何一個位置。"),
+    (PUPPY_COLOR, "膚色方塊: 心碎小狗，玩家觸碰該角色後必須帶著小狗回到原點(心碎小狗的家)，否則無法過關。"),
+    (MONSTER_COLOR, "粉色雙格方塊: 放閃情侶，玩家觸碰到該角色後有一段可以看見迷宮全知視野的時間。"),
+)
+INTRO_STAGES = (
+    "第一關: 全知視野+問題怪物+隨機傳送通道",
+    "第二關: 有限視野+問題怪物+隨機傳送通道+放閃情侶",
+    "第三關: 有限視野+問題怪物+隨機傳送通道+放閃情侶+心碎小狗",
+)
+INTRO_START = "START"
+intro_layer = None
+intro_key = None
+
+def build_intro_layer(size):
+    # 遊戲說明畫面：字型、換行與文字只在這裡算一次，畫進離屏 Surface
+    font_path = get_font_path()
+    surface = pygame.Surface(size).convert()
+    surface.fill((255,255,255))
+    # 標題縮小一半
+    title_font = pygame.font.Font(font_path, 30) if font_path else pygame.font.SysFont(None, 30)
+    title = title_font.render(INTRO_TITLE, True, (0,26,51))
+    surface.blit(title, (WIDTH//2 - title.get_width()//2, 20))
+
+
+    # 角色介紹（字放大1.25倍，並加圖示，超出自動換行）
+    info_font_size = int(16 * 1.25)
+    info_font = pygame.font.Font(font_path, info_font_size) if font_path else pygame.font.SysFont(None, info_font_size)
+    y = 70
+    max_width = WIDTH - 110  # 85起始 + 25邊界
+
+    # 角色介紹標題
+    text = info_font.render("角色介紹", True, (0,26,51))
+    surface.blit(text, (60, y))
+    y += info_font_size + 6
+    for color, desc in INTRO_ROLES:
+        # 畫方塊圖示
+        pygame.draw.rect(surface, color, (60, y+2, 18, 18), border_radius=4)
+        # 文字自動換行，並在「心碎小狗的家」後加橘色方塊
+        if color == PUPPY_COLOR:
+            # 將『心碎小狗的家』替換為帶有標記的特殊字串
+            mark = "[HOME_ICON]"
+            desc_mod = desc.replace("心碎小狗的家)", "心碎小狗的家)" + mark)
+            words = desc_mod.split(' ')
+        else:
+            mark = None
+            words = desc.split(' ')
+        line = ''
+        lines = []
+        for word in words:
+            test_line = line + ('' if line == '' else ' ') + word
+            if info_font.size(test_line.replace(mark or '', ''))[0] > max_width:
+                if line:
+                    lines.append(line)
+                line = word
+            else:
+                line = test_line
+        if line:
+            lines.append(line)
+        for i, l in enumerate(lines):
+            # 若有標記，分割顯示
+            if color == PUPPY_COLOR and mark and mark in l:
+                before, after = l.split(mark)
+                text = info_font.render(before, True, (0,26,51))
+                text_x = 85
+                y_pos = y + i * (info_font_size + 2)
+                surface.blit(text, (text_x, y_pos))
+                # 畫橘色方塊
+                icon_x = text_x + text.get_width() + 8
+                icon_y = y_pos + 2
+                pygame.draw.rect(surface, START_COLOR, (icon_x, icon_y, 18, 18), border_radius=4)
+                # 若標記後還有文字，繼續顯示
+                if after.strip():
+                    text2 = info_font.render(after, True, (0,26,51))
+                    surface.blit(text2, (icon_x + 18 + 8, y_pos))
+            else:
+                text = info_font.render(l, True, (0,26,51))
+                text_x = 85
+                surface.blit(text, (text_x, y + i * (info_font_size + 2)))
+        y += (info_font_size + 2) * len(lines) + 6
+
+    y += 6
+    # 關卡介紹（字放大1.25倍，超出自動換行）
+    text = info_font.render("關卡介紹", True, (0,26,51))
+    surface.blit(text, (60, y))
+    y += info_font_size + 2
+    for line in INTRO_STAGES:
+        # 關卡說明自動換行
+        words = line.split(' ')
+        l = ''
+        lines = []
+        for word in words:
+            test_line = l + ('' if l == '' else ' ') + word
+            if info_font.size(test_line)[0] > max_width:
+                if l:
+                    lines.append(l)
+                l = word
+            else:
+                l = test_line
+        if l:
+            lines.append(l)
+        for i, ll in enumerate(lines):
+            text = info_font.render(ll, True, (0,26,51))
+            surface.blit(text, (85, y + i * (info_font_size + 2)))
+        y += (info_font_size + 2) * len(lines)
+
+    # start 按鈕
+    btn_w, btn_h = 200, 60
+    btn_x = WIDTH//2 - btn_w//2
+    btn_y = HEIGHT - 100
+    pygame.draw.rect(surface, (0,26,51), (btn_x, btn_y, btn_w, btn_h), border_radius=16)
+    btn_font = pygame.font.Font(font_path, 18) if font_path else pygame.font.SysFont(None, 18)
+    btn_text = btn_font.render(INTRO_START, True, (255,255,255))
+    surface.blit(btn_text, (btn_x + btn_w//2 - btn_text.get_width()//2, btn_y + btn_h//2 - btn_text.get_height()//2))
+    return surface
+
+def draw_intro():
+    # 只有視窗大小或說明文字（語言）改變時才重建
+    global intro_layer, intro_key
+    key = (screen.get_size(), INTRO_TITLE, INTRO_ROLES, INTRO_STAGES, INTRO_START)
+    if intro_layer is None or intro_key != key:
+        intro_layer = build_intro_layer(screen.get_size())
+        intro_key = key
+    screen.blit(intro_layer, (0, 0))
     pygame.display.flip()
+    mark_startup('first_frame')
 
-# ---------------------- 下一關迷宮生成 ----------------------
-def generate_maze_for_next_level():
-    global maze, visible_map, show_victory
-    global monster, reveal_until
-    global puppy, path_history, exit_attempts, show_message, message_text, message_suppressed, last_message_text
-
-    global monsters
-    maze = generate_perfect_maze()
-    add_extra_paths(maze)
-    ensure_exit_reachable(maze)
-    show_victory = False
-
-    # 下一關同樣要放陷阱（3~7 個）
-    traps.clear()
-    available = [(r, c) for r in range(ROWS) for c in range(COLS)
-                 if maze[r][c] == 0 and not (r == player['x'] and c == player['y'])
-                 and not (r == exit_pos['x'] and c == exit_pos['y'])]
-    trap_count = random.randint(3, 7)
-    if available:
-        trap_count = min(trap_count, len(available))
-        for pos in random.sample(available, trap_count):
-            traps.add(pos)
-
-    # 在所有關卡放置 5~6 個移動的題庫怪物（紅色，可穿透），不可生於起點或出口或陷阱或固定怪物占格
-    quiz_monsters.clear()
-    qm_count = random.randint(5, 6)
-    available_qm = [(r, c) for r in range(ROWS) for c in range(COLS)
-                    if maze[r][c] == 0 and (r, c) != (player['x'], player['y'])
-                    and (r, c) != (exit_pos['x'], exit_pos['y'])
-                    and (r, c) not in traps]
-    for m in monsters:
-        for cell in m['cells']:
-            if cell in available_qm:
-                available_qm.remove(cell)
-    if puppy is not None and puppy.get('pos') in available_qm:
-        available_qm.remove(puppy.get('pos'))
-
-    if available_qm:
-        qm_count = min(qm_count, len(available_qm))
-        for pos in random.sample(available_qm, qm_count):
-            quiz_monsters.append({'pos': pos, 'question': None, 'answer': None})
-    # reset movement timer
-    global quiz_last_move
-    quiz_last_move = pygame.time.get_ticks()
-
-    if level == 2:
-        visible_map = [[False]*COLS for _ in range(ROWS)]
-        visible_map[player['x']][player['y']] = True
-    elif level == 3:
-        visible_map = None
-
-    # 同樣在下一關嘗試放置 0~1 個怪物（第二、三關）
-    monsters = []
-    reveal_until = 0
-    if level in (2, 3):
-        needed = 2
-        attempts = 500
-        used_cells = set()
-        for _ in range(attempts):
-            if len(monsters) >= needed:
-                break
-            r = random.randint(1, ROWS-2)
-            c = random.randint(1, COLS-2)
-            if maze[r][c] != 0 or (r, c) in used_cells:
-                continue
-            dirs = [(1,0), (-1,0), (0,1), (0,-1)]
-            random.shuffle(dirs)
-            for dr, dc in dirs:
-                r2, c2 = r+dr, c+dc
-                if 0 <= r2 < ROWS and 0 <= c2 < COLS and maze[r2][c2] == 0 and (r2, c2) not in used_cells:
-                    if (r, c) == (player['x'], player['y']) or (r2, c2) == (player['x'], player['y']):
-                        continue
-                    if (r, c) == (exit_pos['x'], exit_pos['y']) or (r2, c2) == (exit_pos['x'], exit_pos['y']):
-                        continue
-                    if (r, c) in traps or (r2, c2) in traps:
-                        continue
-                    overlap = False
-                    for m in monsters:
-                        if (r, c) in m['cells'] or (r2, c2) in m['cells']:
-                            overlap = True
-                            break
-                    if overlap:
-                        continue
-                    maze[r][c] = 1
-                    maze[r2][c2] = 1
-                    reachable = is_reachable(maze, 1, 1, exit_pos['x'], exit_pos['y'])
-                    maze[r][c] = 0
-                    maze[r2][c2] = 0
-                    if reachable:
-                        monsters.append({'cells': {(r, c), (r2, c2)}, 'triggered': False})
-                        used_cells.add((r, c))
-                        used_cells.add((r2, c2))
-                        break
-    # 第三關 - 放置心碎小狗（1 個），確保放置後出口仍可達
-    puppy = None
-    path_history.clear()
-    exit_attempts = 0
-    show_message = False
-    message_text = ""
-    if level == 3:
-        attempts = 200
-        for _ in range(attempts):
-            r = random.randint(1, ROWS-2)
-            c = random.randint(1, COLS-2)
-            if maze[r][c] != 0:
+# ---------------------- 主程式 ----------------------
+KEY_ACTIONS = {
+    pygame.K_UP: 'up',
+    pygame.K_DOWN: 'down',
+    pygame.K_LEFT: 'left',
+    pygame.K_RIGHT: 'right',
+}
+
+PROCESS_PREFETCH_CELLS = 250000  # 迷宮大於這個格數時改用背景行程建下一關（不搶 GIL）
+PACKED_CELLS = 1000000  # 迷宮大於這個格數時牆面改存成 BitGrid（一格一個 bit）
+CHUNKED_CELLS = 25000000  # 再大就改用 ChunkedGrid：只有最近用到的區塊在記憶體裡
+
+def start_first_maze(seed=None, rows=ROWS, cols=COLS, bank=None, chase=False):
+    # 第一張迷宮在背景執行緒產生，和開視窗、畫說明畫面同時進行；
+    # 回傳的函式會等它做完並交出 MazeGame（執行緒失敗時改在這裡同步產生）。
+    # bank：已開啟的 MazeBank，迷宮大小以題庫為準；chase：問答怪會追玩家
+    result = {}
+    if bank is not None:
+        rows, cols = bank.rows, bank.cols
+    chunked = bank is None and rows * cols >= CHUNKED_CELLS
+    packed = not chunked and rows * cols >= PACKED_CELLS
+    # ChunkedGrid pickle 時只帶暫存檔路徑，背景行程建好的世界主行程直接打開同一個檔案
+    prefetch = 'process' if rows * cols >= PROCESS_PREFETCH_CELLS else 'thread'
+
+    def work():
+        g = MazeGame(rows, cols, verbose=True, seed=seed, prefetch=prefetch, bank=bank,
+                     packed=packed, chunked=chunked, chase=chase)
+        g.generate_maze()
+        result['game'] = g
+
+    worker = threading.Thread(target=work, daemon=True)
+    worker.start()
+
+    def finish():
+        worker.join()
+        g = result.get('game')
+        if g is None:
+            g = MazeGame(rows, cols, verbose=True, seed=seed, prefetch=prefetch, bank=bank,
+                         packed=packed, chunked=chunked, chase=chase)
+            g.generate_maze()
+        g.on_explore = reveal_fog_cell
+        mark_startup('maze_ready')
+        return g
+    return finish
+
+def report_startup():
+    phases = sorted(startup_times.items(), key=lambda kv: kv[1])
+    print("startup: " + ", ".join("%s %.1f ms" % kv for kv in phases))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Maze Game - 3 Levels")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible game")
+    parser.add_argument("--size", default="%dx%d" % (ROWS, COLS), help="maze size ROWSxCOLS (may exceed the window)")
+    parser.add_argument("--record", metavar="LOG", help="save the inputs of this session to LOG")
+    parser.add_argument("--replay", metavar="LOG", help="play back a recorded session")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--bank", metavar="FILE", help="load levels from a maze bank built by mazebank.py")
+    parser.add_argument("--chase", action="store_true", help="quiz monsters near the player chase it")
+    parser.add_argument("--profile", action="store_true", help="time each frame phase and show the HUD (F3)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global game, quiz_input_focused, show_hint
+    args = parse_args(argv)
+    if args.profile:
+        handle_profiler_key(pygame.K_F3)
+    replayer = None
+    if args.replay:
+        # 重播：不顯示說明畫面、不接受輸入，依紀錄推進
+        replayer = Replayer(InputLog.load(args.replay))
+        game = replayer.game
+        game.on_explore = reveal_fog_cell
+        init_display()
+        show_intro = False
+    else:
+        rows, _, cols = args.size.partition("x")
+        bank = MazeBank(args.bank) if args.bank else None
+        finish_first_maze = start_first_maze(args.seed, int(rows), int(cols or rows), bank, args.chase)
+        init_display()
+        draw_intro()  # 第一幀不等 clock.tick
+        # 狀態：是否在說明畫面
+        show_intro = True
+    text_input_on = False
+
+    running = True
+    while running:
+        dt = clock.tick(FPS)
+        profiler.begin_frame(dt)
+        for event in pygame.event.get():
+            if event.type==pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_F3, pygame.K_F4):
+                handle_profiler_key(event.key)
                 continue
-            if (r, c) == (player['x'], player['y']) or (r, c) == (exit_pos['x'], exit_pos['y']):
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_h and not show_intro \
+                    and not game.quiz_active:
+                # 只影響畫面，不是遊戲輸入，不寫進重播紀錄
+                show_hint = not show_hint
                 continue
-            if (r, c) in traps:
+            if replayer is not None:
                 continue
-            skip = False
-            for m in monsters:
-                if (r, c) in m['cells']:
-                    skip = True
-                    break
-            if skip:
+            # intro 畫面處理
+            if show_intro:
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    mx, my = event.pos
+                    btn_w, btn_h = 200, 60
+                    btn_x = WIDTH//2 - btn_w//2
+                    btn_y = HEIGHT - 100
+                    if btn_x <= mx <= btn_x+btn_w and btn_y <= my <= btn_y+btn_h:
+                        show_intro = False
+                elif event.type == pygame.KEYDOWN:
+                    # 按 Enter 或空白也可開始
+                    if event.key in [pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_SPACE]:
+                        show_intro = False
+                if not show_intro:
+                    game = finish_first_maze()
+                    if args.record:
+                        game.recorder = InputLog.for_game(game)
+                    report_startup()
                 continue
+            elif event.type==pygame.KEYDOWN:
+                # If quiz overlay is active, only handle special keys here (Enter, Backspace, Tab)
+                if game.quiz_active:
+                    if event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
+                        game.submit_answer()
+                    elif event.key == pygame.K_BACKSPACE:
+                        game.backspace()
+                    elif event.key == pygame.K_TAB:
+                        quiz_input_focused = not quiz_input_focused
+                    # don't process other keys while in quiz
+                    continue
 
-            maze[r][c] = 1
-            ok = is_reachable(maze, 1, 1, exit_pos['x'], exit_pos['y'])
-            maze[r][c] = 0
-            if ok:
-                puppy = {'pos': (r, c), 'activated': False, 'delivered': False}
-                break
+                # close any message overlay first (space to close)
+                if game.show_message and event.key == pygame.K_SPACE:
+                    game.dismiss_message()
+                    continue
 
-# ---------------------- 主程式 ----------------------
-generate_maze()
+                if game.show_victory:
+                    if event.key == pygame.K_SPACE:
+                        game.step('restart')
+                elif event.key in KEY_ACTIONS:
+                    game.step(KEY_ACTIONS[event.key])
+                elif event.key in [pygame.K_r, pygame.K_SPACE]:
+                    game.step('restart')
+            elif event.type == pygame.TEXTINPUT:
+                # IME / unicode text events for quiz input
+                if quiz_input_focused:
+                    game.type_text(event.text)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                # if quiz overlay active, clicking inside the input box gives it focus
+                if game.quiz_active and game.quiz_current is not None:
+                    mouse_x, mouse_y = event.pos
+                    box_w, box_h = WIDTH * 2 // 3, HEIGHT // 3
+                    box_x = (WIDTH - box_w) // 2
+                    box_y = (HEIGHT - box_h) // 2
+                    input_box = (box_x + 20, box_y + box_h - 70, box_w - 40, 50)
+                    ix, iy, iw, ih = input_box
+                    quiz_input_focused = ix <= mouse_x <= ix + iw and iy <= mouse_y <= iy + ih
 
-running = True
-while running:
-    clock.tick(FPS)
-    for event in pygame.event.get():
-        if event.type==pygame.QUIT:
-            running = False
-        # intro 畫面處理
         if show_intro:
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                mx, my = event.pos
-                btn_w, btn_h = 200, 60
-                btn_x = WIDTH//2 - btn_w//2
-                btn_y = HEIGHT - 100
-                if btn_x <= mx <= btn_x+btn_w and btn_y <= my <= btn_y+btn_h:
-                    show_intro = False
-            elif event.type == pygame.KEYDOWN:
-                # 按 Enter 或空白也可開始
-                if event.key in [pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_SPACE]:
-                    show_intro = False
+            draw_intro()
             continue
-        elif event.type==pygame.KEYDOWN:
-            # If quiz overlay is active, only handle special keys here (Enter, Backspace, Tab)
-            if quiz_active:
-                if event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
-                    # submit answer
-                    if quiz_current is not None:
-                        user_ans = quiz_current['input'].strip()
-                        correct = user_ans.lower() == quiz_current['answer'].strip().lower()
-                        idx = quiz_current['index']
-                        if correct:
-                            if 0 <= idx < len(quiz_monsters):
-                                del quiz_monsters[idx]
-                            quiz_active = False
-                            quiz_current = None
-                            try:
-                                pygame.key.stop_text_input()
-                            except Exception:
-                                pass
-                            quiz_input_focused = False
-                        else:
-                            if 0 <= idx < len(quiz_monsters):
-                                quiz_monsters[idx]['question'] = None
-                                quiz_monsters[idx]['answer'] = None
-                            player['x'], player['y'] = 1, 1
-                            path_history.append((player['x'], player['y']))
-                            quiz_active = False
-                            quiz_current = None
-                            try:
-                                pygame.key.stop_text_input()
-                            except Exception:
-                                pass
-                            quiz_input_focused = False
-                elif event.key == pygame.K_BACKSPACE:
-                    if quiz_current is not None:
-                        quiz_current['input'] = quiz_current['input'][:-1]
-                elif event.key == pygame.K_TAB:
-                    quiz_input_focused = not quiz_input_focused
-                # don't process other keys while in quiz
-                continue
-
-            # close any message overlay first (space to close)
-            if show_message and event.key == pygame.K_SPACE:
-                # suppress re-showing the same message until it changes
-                last_message_text = message_text
-                message_suppressed = True
-                show_message = False
-                message_text = ""
-                continue
-            # click/focus handled in MOUSEBUTTONDOWN; if the player presses TAB to toggle focus we support it
-            if quiz_active and event.key == pygame.K_TAB:
-                quiz_input_focused = not quiz_input_focused
-                continue
+        profiler.mark('events')
 
-            if show_victory:
-                if event.key == pygame.K_SPACE:
-                    generate_maze()
-            else:
-                if event.key==pygame.K_UP:
-                    move_player(-1,0)
-                elif event.key==pygame.K_DOWN:
-                    move_player(1,0)
-                elif event.key==pygame.K_LEFT:
-                    move_player(0,-1)
-                elif event.key==pygame.K_RIGHT:
-                    move_player(0,1)
-                elif event.key in [pygame.K_r, pygame.K_SPACE]:
-                    generate_maze()
-        elif event.type == pygame.TEXTINPUT:
-            # IME / unicode text events for quiz input
-            if quiz_active and quiz_input_focused and quiz_current is not None:
-                if len(quiz_current['input']) < 120:
-                    quiz_current['input'] += event.text
-        elif event.type==pygame.USEREVENT:
-            generate_maze()
-        elif event.type == pygame.USEREVENT + 1:
-            # 第三關勝利後 5 秒自動關閉
+        # timers (next maze / auto close) and quiz monster movement
+        if replayer is not None:
+            game = replayer.advance_to(game.time + dt * args.speed)
+        else:
+            game.tick(dt)
+        profiler.mark('tick')
+        if game.finished:
             running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            # if quiz overlay active, clicking inside the input box gives it focus
-            if quiz_active and quiz_current is not None:
-                mouse_x, mouse_y = event.pos
-                box_w, box_h = WIDTH * 2 // 3, HEIGHT // 3
-                box_x = (WIDTH - box_w) // 2
-                box_y = (HEIGHT - box_h) // 2
-                input_box = (box_x + 20, box_y + box_h - 70, box_w - 40, 50)
-                ix, iy, iw, ih = input_box
-                if ix <= mouse_x <= ix + iw and iy <= mouse_y <= iy + ih:
-                    quiz_input_focused = True
-                else:
-                    quiz_input_focused = False
-
-    # update moving quiz monsters every 0.5s (if no quiz active)
-    now = pygame.time.get_ticks()
-    if not quiz_active and quiz_monsters and now - quiz_last_move >= quiz_move_interval:
-        for qm in quiz_monsters:
-            # try a random direction; if invalid keep position
-            dirs = [(1,0), (-1,0), (0,1), (0,-1)]
-            random.shuffle(dirs)
-            for dr, dc in dirs:
-                nr, nc = qm['pos'][0] + dr, qm['pos'][1] + dc
-                # cannot move out of bounds, into wall, or into start (1,1)
-                if 0 <= nr < ROWS and 0 <= nc < COLS and maze[nr][nc] == 0 and (nr, nc) != (1,1):
-                    # do not move into player's exact position if that would immediately trigger
-                    qm['pos'] = (nr, nc)
-                    break
-            # if a quiz monster moved onto the player, trigger the quiz (if not cleared)
-            if qm.get('pos') == (player['x'], player['y']) and not quiz_active:
-                # if this monster hasn't chosen a question yet, give it one now
-                if not qm.get('question'):
-                    q, a = random.choice(QUESTIONS)
-                    qm['question'], qm['answer'] = q, a
-                else:
-                    q, a = qm['question'], qm['answer']
-                quiz_active = True
-                # find index
-                idx = quiz_monsters.index(qm)
-                quiz_current = {'index': idx, 'question': q, 'answer': a, 'input': ""}
-                quiz_input_focused = True
-                try:
-                    pygame.key.start_text_input()
-                except Exception:
-                    pass
-                print(q)
-                quiz_input_focused = True
-                try:
+
+        # enable IME / text input mode while a quiz is open so TEXTINPUT events provide composed characters (Chinese)
+        if game.quiz_active != text_input_on:
+            text_input_on = game.quiz_active
+            quiz_input_focused = text_input_on
+            try:
+                if text_input_on:
                     pygame.key.start_text_input()
-                except Exception:
-                    pass
-                print(q)
-        quiz_last_move = now
-
-    if show_intro:
-        # 遊戲說明畫面
-        screen.fill((255,255,255))
-        # 標題縮小一半
-        title_font = pygame.font.Font(font_path, 30) if font_path else pygame.font.SysFont(None, 30)
-        title = title_font.render("歡迎來到: 迷路的分店:迷宮", True, (0,26,51))
-        screen.blit(title, (WIDTH//2 - title.get_width()//2, 20))
-
-
-        # 角色介紹（字放大1.25倍，並加圖示，超出自動換行）
-        info_font_size = int(16 * 1.25)
-        info_font = pygame.font.Font(font_path, info_font_size) if font_path else pygame.font.SysFont(None, info_font_size)
-        y = 70
-        max_width = WIDTH - 110  # 85起始 + 25邊界 
- 
-        # 角色圖示資料: (顏色, 說明)
-        role_icons = [
-            (QUIZ_MONSTER_COLOR, "紅色隨機移動方塊: 問題怪物，玩家觸碰到該角色後須回答問題，若正確即可繼續遊戲，若錯誤則被遣返原點。"),
-            (TRAP_COLOR, "紫色固定方塊: 隨機傳送通道，玩家觸碰該角色後會被隨機傳送到迷宮的任何一個位置。"),
-            (PUPPY_COLOR, "膚色方塊: 心碎小狗，玩家觸碰該角色後必須帶著小狗回到原點(心碎小狗的家)，否則無法過關。"),
-            (MONSTER_COLOR, "粉色雙格方塊: 放閃情侶，玩家觸碰到該角色後有一段可以看見迷宮全知視野的時間。"),
-        ]
-        # 角色介紹標題
-        text = info_font.render("角色介紹", True, (0,26,51))
-        screen.blit(text, (60, y))
-        y += info_font_size + 6
-        for color, desc in role_icons:
-            # 畫方塊圖示
-            pygame.draw.rect(screen, color, (60, y+2, 18, 18), border_radius=4)
-            # 文字自動換行，並在「心碎小狗的家」後加橘色方塊
-            if color == PUPPY_COLOR:
-                # 將『心碎小狗的家』替換為帶有標記的特殊字串
-                mark = "[HOME_ICON]"
-                desc_mod = desc.replace("心碎小狗的家)", "心碎小狗的家)" + mark)
-                words = desc_mod.split(' ')
-            else:
-                mark = None
-                words = desc.split(' ')
-            line = ''
-            lines = []
-            for word in words:
-                test_line = line + ('' if line == '' else ' ') + word
-                if info_font.size(test_line.replace(mark or '', ''))[0] > max_width:
-                    if line:
-                        lines.append(line)
-                    line = word
                 else:
-                    line = test_line
-            if line:
-                lines.append(line)
-            for i, l in enumerate(lines):
-                # 若有標記，分割顯示
-                if color == PUPPY_COLOR and mark and mark in l:
-                    before, after = l.split(mark)
-                    text = info_font.render(before, True, (0,26,51))
-                    text_x = 85
-                    y_pos = y + i * (info_font_size + 2)
-                    screen.blit(text, (text_x, y_pos))
-                    # 畫橘色方塊
-                    icon_x = text_x + text.get_width() + 8
-                    icon_y = y_pos + 2
-                    pygame.draw.rect(screen, START_COLOR, (icon_x, icon_y, 18, 18), border_radius=4)
-                    # 若標記後還有文字，繼續顯示
-                    if after.strip():
-                        text2 = info_font.render(after, True, (0,26,51))
-                        screen.blit(text2, (icon_x + 18 + 8, y_pos))
-                else:
-                    text = info_font.render(l, True, (0,26,51))
-                    text_x = 85
-                    screen.blit(text, (text_x, y + i * (info_font_size + 2)))
-            y += (info_font_size + 2) * len(lines) + 6
-
-        y += 6
-        # 關卡介紹（字放大1.25倍，超出自動換行）
-        text = info_font.render("關卡介紹", True, (0,26,51))
-        screen.blit(text, (60, y))
-        y += info_font_size + 2
-        stage_lines = [
-            "第一關: 全知視野+問題怪物+隨機傳送通道",
-            "第二關: 有限視野+問題怪物+隨機傳送通道+放閃情侶",
-            "第三關: 有限視野+問題怪物+隨機傳送通道+放閃情侶+心碎小狗",
-        ]
-        for line in stage_lines:
-            # 關卡說明自動換行
-            words = line.split(' ')
-            l = ''
-            lines = []
-            for word in words:
-                test_line = l + ('' if l == '' else ' ') + word
-                if info_font.size(test_line)[0] > max_width:
-                    if l:
-                        lines.append(l)
-                    l = word
-                else:
-                    l = test_line
-            if l:
-                lines.append(l)
-            for i, ll in enumerate(lines):
-                text = info_font.render(ll, True, (0,26,51))
-                screen.blit(text, (85, y + i * (info_font_size + 2)))
-            y += (info_font_size + 2) * len(lines)
-
-        # start 按鈕
-        btn_w, btn_h = 200, 60
-        btn_x = WIDTH//2 - btn_w//2
-        btn_y = HEIGHT - 100
-        pygame.draw.rect(screen, (0,26,51), (btn_x, btn_y, btn_w, btn_h), border_radius=16)
-        btn_font = pygame.font.Font(font_path, 18) if font_path else pygame.font.SysFont(None, 18)
-        btn_text = btn_font.render("START", True, (255,255,255))
-        screen.blit(btn_text, (btn_x + btn_w//2 - btn_text.get_width()//2, btn_y + btn_h//2 - btn_text.get_height()//2))
-        pygame.display.flip()
-        continue
-    else:
-        draw_game()
+                    pygame.key.stop_text_input()
+            except Exception:
+                pass
 
-pygame.quit()
+        draw_game()
+        if profile_hud:
+            draw_profile_hud()
+        profiler.mark('draw')
+        pygame.display.flip()
+        profiler.mark('flip')
+        profiler.end_frame()
+
+    disable_profiler()
+    pygame.quit()
+    if game is not None:
+        game.close()
+    if game is not None and game.recorder is not None:
+        game.recorder.save(args.record)
+        print("recorded %d inputs to %s (seed %d)" % (len(game.recorder.events), args.record, game.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitgrid import BitGrid, pack_rows, unpack_rows
+from grid import np, is_array, is_packed, floor_cells
+from levels import build_layout
+
+# ---------------------- 迷宮題庫 ----------------------
+# 事先產生好的關卡存成一個二進位檔，遊戲用 mmap 開啟：重來 / 換關時只是從
+# 對應的位置讀出牆面與實體位置，不必重新產生迷宮。
+#
+# 檔案格式（little-endian）：
+#   檔頭    magic "MAZEBANK", version, rows, cols, 筆數, 索引位置
+#   每一筆  seed, 問答怪亂數, 關卡, 有無小狗, 陷阱數, 情侶數, 問答怪數, 起點, 出口
+#           牆面位元圖：每列 ceil(cols/8) bytes，高位元在前（1 = 牆）
+#           實體座標 (r, c) u32：陷阱、情侶（每對兩格）、小狗、問答怪
+#   索引    每筆的起始位置 u64
+# 同一個題庫的迷宮大小都相同；每一筆都能用 build_layout(rows, cols, 關卡, seed, 起點) 重現。
+
+MAGIC = b"MAZEBANK"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIQ")
+RECORD = struct.Struct("<QQBBHHIIIII")
+
+def pack_walls(maze, cols):
+    """Wall bitmap of `maze`: one byte-aligned, MSB-first bit row per maze row."""
+    if is_packed(maze):
+        return maze.tobytes()  # BitGrid 本身就是同樣的排列
+    if is_array(maze):
+        return np.packbits(maze != 0, axis=1).tobytes()
+    return bytes(pack_rows(maze, cols))
+
+def unpack_walls(buf, rows, cols, use_numpy=False, packed=False):
+    """Inverse of pack_walls: a list of lists, NumPy uint8 grid or BitGrid of 0/1."""
+    if packed:
+        return BitGrid(rows, cols, bits=bytearray(buf))
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("use_numpy=True requires NumPy to be installed")
+        row_bytes = (cols + 7) // 8
+        bits = np.frombuffer(buf, dtype=np.uint8, count=rows * row_bytes).reshape(rows, row_bytes)
+        return np.unpackbits(bits, axis=1, count=cols)
+    return unpack_rows(buf, rows, cols)
+
+def pack_layout(cols, layout, start):
+    """One bank record for a build_layout() result built from `start`."""
+    monsters = [sorted(cells) for cells in layout['monsters']]
+    puppy = layout['puppy']
+    cells = list(layout['traps'])
+    for pair in monsters:
+        cells.extend(pair)
+    if puppy is not None:
+        cells.append(puppy)
+    cells.extend(layout['quiz_cells'])
+    exit_pos = layout['exit_pos']
+    head = RECORD.pack(layout['seed'], layout['swarm_seed'], layout['level'], puppy is not None,
+                       len(layout['traps']), len(monsters), len(layout['quiz_cells']),
+                       start[0], start[1], exit_pos['x'], exit_pos['y'])
+    coords = [int(v) for cell in cells for v in cell]
+    return head + pack_walls(layout['maze'], cols) + struct.pack("<%dI" % len(coords), *coords)
+
+def write_bank(path, rows, cols, records):
+    """Write packed records (an iterable of bytes) as a bank; returns the record count."""
+    offsets = []
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, cols, 0, 0))
+        for record in records:
+            offsets.append(f.tell())
+            f.write(record)
+        index_offset = f.tell()
+        f.write(struct.pack("<%dQ" % len(offsets), *offsets))
+        # 記錄都寫完才補上檔頭的筆數與索引位置
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, rows, cols, len(offsets), index_offset))
+    os.replace(tmp, path)
+    return len(offsets)
+
+class MazeBank:
+    """Read-only, memory-mapped bank of pre-built level layouts.
+
+    Opening only reads the header and index; walls(i) is a zero-copy view
+    into the mapping and layout(i) decodes one record into the same dict
+    build_layout() returns, so MazeGame can apply it directly.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        magic, version, self.rows, self.cols, count, index_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("%s is not a version %d maze bank" % (path, VERSION))
+        self.row_bytes = (self.cols + 7) // 8
+        self.offsets = struct.unpack_from("<%dQ" % count, self._mm, index_offset)
+        self._by_level = {}  # level -> [record index, ...]
+        for i, off in enumerate(self.offsets):
+            self._by_level.setdefault(RECORD.unpack_from(self._mm, off)[2], []).append(i)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __deepcopy__(self, memo):
+        # 唯讀，Replayer 的 keyframe 共用同一個 mmap 即可
+        return self
+
+    def close(self):
+        if self._mm is not None:
+            self._buf.release()
+            self._mm.close()
+            self._mm = None
+
+    def levels(self):
+        return sorted(self._by_level)
+
+    def has_level(self, level):
+        return level in self._by_level
+
+    def record(self, i):
+        """Header fields of record i (no wall or entity data is touched)."""
+        (seed, swarm_seed, level, has_puppy, n_traps, n_pairs, n_quiz,
+         sr, sc, er, ec) = RECORD.unpack_from(self._mm, self.offsets[i])
+        return {
+            'seed': seed, 'swarm_seed': swarm_seed, 'level': level, 'has_puppy': bool(has_puppy),
+            'traps': n_traps, 'monsters': n_pairs, 'quiz': n_quiz,
+            'start': (sr, sc), 'exit_pos': {'x': er, 'y': ec},
+        }
+
+    def walls(self, i):
+        """Zero-copy memoryview of record i's wall bitmap."""
+        start = self.offsets[i] + RECORD.size
+        return self._buf[start:start + self.rows * self.row_bytes]
+
+    def layout(self, i, use_numpy=False, packed=False):
+        """Record i as a build_layout()-style dict."""
+        rec = self.record(i)
+        maze = unpack_walls(self.walls(i), self.rows, self.cols, use_numpy, packed)
+        n_cells = rec['traps'] + 2 * rec['monsters'] + rec['has_puppy'] + rec['quiz']
+        coords = struct.unpack_from("<%dI" % (2 * n_cells), self._mm,
+                                    self.offsets[i] + RECORD.size + self.rows * self.row_bytes)
+        cells = list(zip(coords[0::2], coords[1::2]))
+        traps, cells = cells[:rec['traps']], cells[rec['traps']:]
+        monsters = [set(cells[2*k:2*k + 2]) for k in range(rec['monsters'])]
+        cells = cells[2 * rec['monsters']:]
+        puppy = cells.pop(0) if rec['has_puppy'] else None
+        exit_pos = rec['exit_pos']
+        blocked = set(traps).union(*monsters)
+        blocked.add((exit_pos['x'], exit_pos['y']))
+        return {
+            'level': rec['level'],
+            'seed': rec['seed'],
+            'maze': maze,
+            'exit_pos': exit_pos,
+            'traps': traps,
+            'monsters': monsters,
+            'puppy': puppy,
+            'quiz_cells': cells,
+            'swarm_seed': rec['swarm_seed'],
+            'teleport_cells': floor_cells(maze, blocked),
+            'path_graph': None,  # 題庫沒有建關過程可追蹤，MazeGame 用到時才建
+        }
+
+    def choose(self, level, seed, use_numpy=False, packed=False):
+        """A layout for `level` picked by `seed`, or None if the bank has none."""
+        records = self._by_level.get(level)
+        if not records:
+            return None
+        return self.layout(records[seed % len(records)], use_numpy, packed)
+
+# ---------------------- 批次產生 ----------------------
+def _build_record(job):
+    rows, cols, level, seed, start, quiz_count = job
+    layout = build_layout(rows, cols, level, seed, start, quiz_count=quiz_count)
+    return pack_layout(cols, layout, start)
+
+def build_bank(path, rows, cols, count, levels=(1, 2, 3), seed=0, workers=None, quiz_count=None):
+    """Generate `count` layouts (levels taken in turn) in a process pool into `path`."""
+    rng = random.Random(seed)
+    # 一律以 (1, 1) 為起點：換關時玩家站在出口，而出口本來就不會放陷阱和怪物
+    jobs = [(rows, cols, levels[i % len(levels)], rng.getrandbits(63), (1, 1), quiz_count)
+            for i in range(count)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return write_bank(path, rows, cols, map(_build_record, jobs))
+    with ProcessPoolExecutor(workers) as pool:
+        chunksize = max(1, count // (workers * 8))
+        return write_bank(path, rows, cols, pool.map(_build_record, jobs, chunksize=chunksize))
+
+def main(argv=None):
+    # python mazebank.py build levels.bank --size 301x301 --count 3000
+    # python mazebank.py info levels.bank
+    parser = argparse.ArgumentParser(description="Pre-generated maze bank")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="batch-generate layouts into a bank file")
+    build.add_argument("path")
+    build.add_argument("--size", default="24x36", help="maze size ROWSxCOLS")
+    build.add_argument("--count", type=int, default=1000)
+    build.add_argument("--levels", default="1,2,3", help="comma-separated levels, generated in turn")
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--workers", type=int, help="processes (default: CPU count)")
+    build.add_argument("--quiz-count", type=int, help="quiz monsters per level (default 5~6)")
+    info = sub.add_parser("info", help="summarize a bank file")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        rows, _, cols = args.size.partition("x")
+        rows, cols = int(rows), int(cols or rows)
+        levels = tuple(int(v) for v in args.levels.split(","))
+        start = time.perf_counter()
+        n = build_bank(args.path, rows, cols, args.count, levels, args.seed, args.workers, args.quiz_count)
+        elapsed = time.perf_counter() - start
+        print("%d layouts (%dx%d) written to %s in %.1f s (%.0f/s, %d bytes)"
+              % (n, rows, cols, args.path, elapsed, n / max(elapsed, 1e-9), os.path.getsize(args.path)))
+    else:
+        with MazeBank(args.path) as bank:
+            print("%s: %d layouts, %dx%d" % (args.path, len(bank), bank.rows, bank.cols))
+            for level in bank.levels():
+                print("  level %d: %d" % (level, len(bank._by_level[level])))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
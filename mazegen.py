@@ -0,0 +1,138 @@
+import random
+import sys
+import time
+from itertools import permutations
+
+from bitgrid import BitGrid, pack_rows
+from grid import from_bytes, open_cells
+
+# ---------------------- 迷宮生成 ----------------------
+EXTRA_PATHS = 350
+
+# 四個方向的 24 種排列；每格只抽一次亂數就決定嘗試順序
+_DIR_ORDERS = [tuple(p) for p in permutations([(1,0), (-1,0), (0,1), (0,-1)])]
+
+def generate_perfect_maze(rows, cols, use_numpy=False, rng=None, packed=False):
+    """Recursive-backtracker perfect maze carved from (1, 1).
+
+    Uses an explicit stack instead of recursion, so any rows/cols work
+    (no recursion limit). Pass a random.Random as `rng` for reproducible
+    mazes; the module-level random is used otherwise. packed=True returns
+    a BitGrid (one bit per cell) for very large mazes.
+    """
+    if rng is None:
+        rng = random
+    rand = rng.random
+    orders = _DIR_ORDERS
+    # 在扁平的 bytearray 上挖（1 = 牆），最後再轉成 list of lists、NumPy 陣列或 BitGrid
+    cells = bytearray(b'\x01') * (rows * cols)
+    cells[cols + 1] = 0
+    stack = [(1, 1, iter(orders[int(rand() * 24)]))]
+    push, pop = stack.append, stack.pop
+    r_max, c_max = rows - 1, cols - 1
+    while stack:
+        x, y, dirs = stack[-1]
+        for dx, dy in dirs:
+            nx, ny = x + dx*2, y + dy*2
+            if 0 < nx < r_max and 0 < ny < c_max and cells[nx*cols + ny]:
+                cells[(x+dx)*cols + y + dy] = 0
+                cells[nx*cols + ny] = 0
+                push((nx, ny, iter(orders[int(rand() * 24)])))
+                break
+        else:
+            pop()
+    return from_bytes(cells, rows, cols, use_numpy, packed)
+
+def eller_rows(cols, rows=None, rng=None):
+    """Rows of a perfect maze (lists of 0/1, 1 = wall), produced one at a time.
+
+    Eller's algorithm: only the set labels of the current cell row are
+    kept, so memory is O(cols) and rows=None streams an endless maze.
+    With `rows`, the last cell row joins every set and the output has the
+    same shape as generate_perfect_maze (cells on odd coordinates).
+    """
+    if rng is None:
+        rng = random
+    rand = rng.random
+    n = (cols - 1) // 2  # 每列的格子數（在奇數欄）
+    cell_rows = None if rows is None else (rows - 1) // 2
+    emitted = 1
+    yield [1] * cols  # 上方外牆
+    sets = [0] * n  # 每格所屬的集合，0 = 還沒有
+    members = {}  # 集合 -> 這一列屬於它的格子
+    next_id = 1
+    i = 0
+    while cell_rows is None or i < cell_rows:
+        last = cell_rows is not None and i == cell_rows - 1
+        for k in range(n):
+            if not sets[k]:
+                sets[k] = next_id
+                members[next_id] = [k]
+                next_id += 1
+        row = [1] * cols
+        for k in range(n):
+            row[2*k + 1] = 0
+        # 橫向：相鄰但不同集合的格子隨機打通（最後一列全部打通），小集合併進大集合
+        for k in range(n - 1):
+            a, b = sets[k], sets[k + 1]
+            if a != b and (last or rand() < 0.5):
+                row[2*k + 2] = 0
+                if len(members[a]) < len(members[b]):
+                    a, b = b, a
+                for j in members[b]:
+                    sets[j] = a
+                members[a].extend(members.pop(b))
+        yield row
+        emitted += 1
+        i += 1
+        if last:
+            break
+        # 縱向：每個集合至少往下打通一格，往下的格子把集合帶到下一列
+        below = [1] * cols
+        next_sets = [0] * n
+        next_members = {}
+        for sid, cells in members.items():
+            down = [k for k in cells if rand() < 0.5] or [cells[int(rand() * len(cells))]]
+            for k in down:
+                below[2*k + 1] = 0
+                next_sets[k] = sid
+            next_members[sid] = down
+        sets, members = next_sets, next_members
+        yield below
+        emitted += 1
+    # 剩下的列（下方外牆）都是牆
+    while rows is not None and emitted < rows:
+        yield [1] * cols
+        emitted += 1
+
+def generate_eller_maze(rows, cols, use_numpy=False, rng=None, packed=False):
+    """A rows x cols perfect maze from eller_rows (same shape as generate_perfect_maze)."""
+    stream = eller_rows(cols, rows, rng)
+    if packed:
+        # 一列一列直接壓成 bit，不會有整張一格一 byte 的暫存
+        return BitGrid(rows, cols, bits=pack_rows(stream, cols))
+    return from_bytes(b"".join(map(bytes, stream)), rows, cols, use_numpy)
+
+def add_extra_paths(maze, amount=EXTRA_PATHS, rng=None, on_change=None):
+    # on_change(cells)：通知打開的格子（例如讓 hpa.HierarchicalMap 局部重算）
+    if rng is None:
+        rng = random
+    rows, cols = len(maze), len(maze[0])
+    cells = [(rng.randint(0, rows-1), rng.randint(0, cols-1)) for _ in range(amount)]
+    open_cells(maze, cells)
+    if on_change is not None:
+        on_change(cells)
+
+# ---------------------- 產生速度 ----------------------
+def throughput(rows, cols, use_numpy=False, seed=0, generate=generate_perfect_maze):
+    """Cells per second for one generate(rows, cols) call."""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    generate(rows, cols, use_numpy, rng)
+    return rows * cols / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    # python mazegen.py [size ...]   例如 python mazegen.py 100 1000 4000
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 1000, 4000]
+    for n in sizes:
+        print(f"{n}x{n}: {throughput(n, n):,.0f} cells/s, eller {throughput(n, n, generate=generate_eller_maze):,.0f} cells/s")
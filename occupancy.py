@@ -0,0 +1,50 @@
+# ---------------------- 格子 -> 實體索引 ----------------------
+# MazeGame 在實體移動、陷阱被踩掉、小狗跟隨時同步更新，
+# 擋路、碰撞與繪圖都只要查一格，不用掃過所有怪物。
+
+class OccupancyIndex:
+    """Cell -> [(kind, entity), ...] lookup for traps, monsters, puppy and quiz monsters."""
+
+    def __init__(self):
+        self._cells = {}
+
+    def __len__(self):
+        # 被占用的格子數
+        return len(self._cells)
+
+    def clear(self):
+        self._cells.clear()
+
+    def add(self, cell, kind, entity):
+        self._cells.setdefault(cell, []).append((kind, entity))
+
+    def remove(self, cell, kind, entity):
+        records = self._cells.get(cell)
+        if not records:
+            return
+        for i, (k, e) in enumerate(records):
+            if k == kind and e is entity:
+                del records[i]
+                break
+        if not records:
+            del self._cells[cell]
+
+    def move(self, old, new, kind, entity):
+        if old != new:
+            self.remove(old, kind, entity)
+            self.add(new, kind, entity)
+
+    def at(self, cell):
+        return self._cells.get(cell, ())
+
+    def first(self, cell, kind):
+        for k, e in self._cells.get(cell, ()):
+            if k == kind:
+                return e
+        return None
+
+    def has(self, cell, kind):
+        return self.first(cell, kind) is not None
+
+    def items(self):
+        return self._cells.items()
@@ -0,0 +1,217 @@
+import random
+
+from grid import np, as_array, is_packed, probe_floor_cell
+
+# ---------------------- 擋路實體的放置 ----------------------
+# 情侶（兩格）與心碎小狗（一格）會擋路，放下去之後起點仍必須走得到出口。
+# 每張迷宮只做一次 DFS：找出起點 -> 出口之間的割點（每條路都必經的格子）
+# 以及一條目前的路線；之後只從非割點的地面格抽樣。放下的格子若不在路線上，
+# 出口一定還連得通，不必再搜尋；只有擋到路線時才重算一次。
+
+_DIRS = [(1,0), (-1,0), (0,1), (0,-1)]
+
+def st_separators(maze, start, end, blocked=()):
+    """Cut cells between start and end, plus one start->end route.
+
+    Returns (separators, route) as sets of flat indices (r*cols + c), or
+    None if end cannot be reached. `blocked` holds flat indices that count
+    as walls. Iterative Tarjan DFS, O(rows*cols).
+    """
+    rows, cols = len(maze), len(maze[0])
+    si = start[0]*cols + start[1]
+    ti = end[0]*cols + end[1]
+    disc = [0] * (rows * cols)
+    low = [0] * (rows * cols)
+    parent = [-1] * (rows * cols)
+    counter = 1
+    disc[si] = low[si] = counter
+    stack = [(si, start[0], start[1], 0)]
+    while stack:
+        i, r, c, k = stack[-1]
+        if k < 4:
+            stack[-1] = (i, r, c, k + 1)
+            dr, dc = _DIRS[k]
+            nr, nc = r + dr, c + dc
+            if not (0 <= nr < rows and 0 <= nc < cols) or maze[nr][nc] != 0:
+                continue
+            j = nr*cols + nc
+            if j in blocked:
+                continue
+            if disc[j] == 0:
+                counter += 1
+                disc[j] = low[j] = counter
+                parent[j] = i
+                stack.append((j, nr, nc, 0))
+            elif j != parent[i] and disc[j] < low[i]:
+                low[i] = disc[j]
+        else:
+            stack.pop()
+            p = parent[i]
+            if p != -1 and low[i] < low[p]:
+                low[p] = low[i]
+    if disc[ti] == 0:
+        return None
+
+    # DFS 樹上 start -> end 的路徑；v 是割點 <=> 往 end 的那個子樹無法繞過 v
+    separators = set()
+    route = {ti}
+    w, v = ti, parent[ti]
+    while v != -1:
+        route.add(v)
+        if v != si and low[w] >= disc[v]:
+            separators.add(v)
+        w, v = v, parent[v]
+    return separators, route
+
+def _candidate_cells(maze, exclude, separators):
+    # 內圈地面的 flat index（row-major），扣掉 exclude 與割點；有 NumPy 就整張遮罩一次算
+    rows, cols = len(maze), len(maze[0])
+    skip = set(separators)
+    skip.update(r*cols + c for r, c in exclude)
+    if np is not None:
+        mask = as_array(maze) == 0
+        mask[[0, -1], :] = False
+        mask[:, [0, -1]] = False
+        mask.ravel()[list(skip)] = False
+        return np.flatnonzero(mask).tolist()
+    candidates = []
+    for r in range(1, rows - 1):
+        base = r*cols
+        row = maze.zeros(r) if is_packed(maze) else (c for c, v in enumerate(maze[r]) if v == 0)
+        candidates.extend(base + c for c in row if 0 < c < cols - 1 and base + c not in skip)
+    return candidates
+
+class PlacementPlanner:
+    """Places path-blocking entities while keeping start -> end connected."""
+
+    def __init__(self, maze, start, end, exclude=(), rng=None):
+        self.maze = maze
+        self.cols = len(maze[0])
+        self.start = start
+        self.end = end
+        self.rng = random if rng is None else rng
+        self.blocked = set()  # flat indices of cells taken by placed entities
+        self.separators, self.route = st_separators(maze, start, end)
+        # 可抽樣的格子（flat index）：內圈地面，扣掉起點、出口、exclude 與割點
+        exclude = set(exclude) | {start, end}
+        self.candidates = _candidate_cells(maze, exclude, self.separators)
+        self.taken = set(exclude)
+
+    def try_block(self, cells):
+        """Reserve `cells` if start -> end stays connected; returns True on success."""
+        idx = {r*self.cols + c for r, c in cells}
+        # 割點只會越擋越多，舊的割點仍然是割點
+        if idx & self.separators or idx & self.blocked:
+            return False
+        if self.route.isdisjoint(idx):
+            # 目前的路線沒有被擋到，一定還連得通
+            self.blocked |= idx
+            self.taken.update(cells)
+            return True
+        result = st_separators(self.maze, self.start, self.end, self.blocked | idx)
+        if result is None:
+            return False
+        self.separators, self.route = result
+        self.blocked |= idx
+        self.taken.update(cells)
+        return True
+
+    def _candidate_order(self, quick_tries=64):
+        # 大部分時候隨機抽幾格就夠了；不夠時才把整份候選名單洗牌走一遍
+        if not self.candidates:
+            return
+        cols = self.cols
+        for _ in range(quick_tries):
+            yield divmod(self.rng.choice(self.candidates), cols)
+        order = self.candidates[:]
+        self.rng.shuffle(order)
+        for i in order:
+            yield divmod(i, cols)
+
+    def place_pairs(self, count):
+        """Up to `count` two-cell blockers on adjacent floor cells."""
+        maze = self.maze
+        rows, cols = len(maze), self.cols
+        pairs = []
+        if count <= 0:
+            return pairs
+        for r, c in self._candidate_order():
+            if (r, c) in self.taken:
+                continue
+            dirs = _DIRS[:]
+            self.rng.shuffle(dirs)
+            for dr, dc in dirs:
+                r2, c2 = r + dr, c + dc
+                if not (0 <= r2 < rows and 0 <= c2 < cols) or maze[r2][c2] != 0:
+                    continue
+                if (r2, c2) in self.taken or r2*cols + c2 in self.separators:
+                    continue
+                if self.try_block([(r, c), (r2, c2)]):
+                    pairs.append({(r, c), (r2, c2)})
+                    break
+            if len(pairs) >= count:
+                break
+        return pairs
+
+    def place_single(self):
+        """One single-cell blocker, or None if no safe cell is left."""
+        for r, c in self._candidate_order():
+            if (r, c) not in self.taken and self.try_block([(r, c)]):
+                return (r, c)
+        return None
+
+class DeadEndPlanner:
+    """Blocker placement without any path search, for worlds too big to search.
+
+    A floor cell with a single open neighbour is a dead end: walling it off,
+    or it plus a corridor cell that only leads to it, cannot disconnect any
+    other cell, so start -> end stays connected without checking. Placed
+    blockers count as walls for later ones. Dead ends are found by probing.
+    """
+
+    def __init__(self, maze, exclude=(), rng=None, tries=100000):
+        self.maze = maze
+        self.rows, self.cols = len(maze), len(maze[0])
+        self.rng = random if rng is None else rng
+        self.tries = tries
+        self.blocked = set()  # cells taken by placed blockers
+        self.taken = set(exclude)  # exclude + blocked: never placed on
+
+    def _open_neighbors(self, r, c):
+        maze, blocked = self.maze, self.blocked
+        return [(r + dr, c + dc) for dr, dc in _DIRS
+                if 0 <= r + dr < self.rows and 0 <= c + dc < self.cols
+                and maze[r + dr][c + dc] == 0 and (r + dr, c + dc) not in blocked]
+
+    def _dead_ends(self):
+        # (死路格, 它唯一的相鄰地面)
+        for _ in range(self.tries):
+            cell = probe_floor_cell(self.maze, self.taken, self.rng, tries=1)
+            if cell is not None:
+                around = self._open_neighbors(*cell)
+                if len(around) == 1:
+                    yield cell, around[0]
+
+    def _block(self, cells):
+        self.blocked.update(cells)
+        self.taken.update(cells)
+
+    def place_pairs(self, count):
+        """Up to `count` two-cell blockers: a dead end and the corridor cell leading to it."""
+        pairs = []
+        if count <= 0:
+            return pairs
+        for cell, corridor in self._dead_ends():
+            if corridor not in self.taken and len(self._open_neighbors(*corridor)) == 2:
+                self._block((cell, corridor))
+                pairs.append({cell, corridor})
+                if len(pairs) >= count:
+                    break
+        return pairs
+
+    def place_single(self):
+        """One single-cell blocker on a dead end, or None if none was found."""
+        for cell, _ in self._dead_ends():
+            self._block((cell,))
+            return cell
+        return None
@@ -0,0 +1,124 @@
+import csv
+import time
+
+# ---------------------- 每幀分段計時 ----------------------
+# 主迴圈在每個階段結束時呼叫 mark(name)，時間記進固定大小的環狀緩衝區
+# （預先配置好的 list，不會隨著遊戲時間變大）。關閉時每個呼叫只做一次
+# `if not self.enabled` 就回傳；計數器則是開啟時才把函式換成會計數的包裝，
+# 關閉時換回原本的函式，所以平常完全沒有額外負擔。
+
+PHASES = ('events', 'tick', 'draw', 'flip')
+
+class FrameProfiler:
+    """Ring buffer of per-phase frame times (ms) and per-frame call counters."""
+
+    def __init__(self, capacity=600, phases=PHASES, counters=(), enabled=False):
+        self.capacity = capacity
+        self.phases = tuple(phases)
+        self.counter_names = tuple(counters)
+        if set(self.phases) & set(self.counter_names) or 'dt' in self.phases + self.counter_names:
+            raise ValueError("phase and counter names must be distinct")
+        self.enabled = enabled
+        self.times = {p: [0.0] * capacity for p in self.phases}
+        self.dt = [0] * capacity  # clock.tick 的回傳值（含等待時間）
+        self.counts = {n: [0] * capacity for n in self.counter_names}
+        self.frames = 0  # frames recorded so far; slot = frames % capacity
+        self.current = {}  # phase / counter values of the frame being measured
+        self._last = None
+        self._wrapped = []  # [(owner, attr, original)]
+
+    # ---------------------- 計時 ----------------------
+    def begin_frame(self, dt=0):
+        if not self.enabled:
+            return
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.current.update(dict.fromkeys(self.counter_names, 0))
+        self.current['dt'] = dt
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        # 從上一個 mark（或 begin_frame）到現在的時間算在 phase 上
+        if not self.enabled or self._last is None:
+            return
+        now = time.perf_counter()
+        self.current[phase] += (now - self._last) * 1000
+        self._last = now
+
+    def count(self, name, n=1):
+        if self.enabled and self._last is not None:
+            self.current[name] += n
+
+    def end_frame(self):
+        if not self.enabled or self._last is None:
+            return
+        i = self.frames % self.capacity
+        cur = self.current
+        for p in self.phases:
+            self.times[p][i] = cur[p]
+        for n in self.counter_names:
+            self.counts[n][i] = cur[n]
+        self.dt[i] = cur['dt']
+        self.frames += 1
+        self._last = None
+
+    def cancel_frame(self):
+        # 丟掉量到一半的這一幀（幀中間關掉 profiler 時用，免得重開後接著舊的時間點算）
+        self._last = None
+
+    # ---------------------- 計數器 ----------------------
+    def watch(self, owner, attr, counter):
+        """Count calls to owner.attr under `counter` until unwatch_all()."""
+        original = getattr(owner, attr)
+        profiler = self
+
+        def counted(*args, **kwargs):
+            if profiler._last is not None:
+                profiler.current[counter] += 1
+            return original(*args, **kwargs)
+        counted.__wrapped__ = original
+        setattr(owner, attr, counted)
+        self._wrapped.append((owner, attr, original))
+
+    def unwatch_all(self):
+        while self._wrapped:
+            owner, attr, original = self._wrapped.pop()
+            setattr(owner, attr, original)
+
+    # ---------------------- 統計與匯出 ----------------------
+    def _slots(self):
+        # 依時間先後排列的緩衝區位置
+        n = min(self.frames, self.capacity)
+        start = self.frames - n
+        return [(start + k) % self.capacity for k in range(n)]
+
+    def frame_totals(self):
+        return [sum(self.times[p][i] for p in self.phases) for i in self._slots()]
+
+    def percentiles(self, values, ps=(50, 95, 99)):
+        if not values:
+            return [0.0] * len(ps)
+        ordered = sorted(values)
+        # nearest-rank
+        return [ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] for p in ps]
+
+    def summary(self):
+        """{'frame': (p50, p95, p99), phase: mean, ..., counter: last value}."""
+        slots = self._slots()
+        out = {'frames': len(slots), 'frame': tuple(self.percentiles(self.frame_totals()))}
+        for p in self.phases:
+            out[p] = sum(self.times[p][i] for i in slots) / len(slots) if slots else 0.0
+        for n in self.counter_names:
+            out[n] = self.counts[n][slots[-1]] if slots else 0
+        return out
+
+    def dump_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'dt_ms'] + ['%s_ms' % p for p in self.phases] + ['total_ms']
+                            + list(self.counter_names))
+            first = self.frames - min(self.frames, self.capacity)
+            for k, i in enumerate(self._slots()):
+                phase_ms = [self.times[p][i] for p in self.phases]
+                writer.writerow([first + k, self.dt[i]] + ['%.3f' % t for t in phase_ms]
+                                + ['%.3f' % sum(phase_ms)] + [self.counts[n][i] for n in self.counter_names])
+        return path
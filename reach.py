@@ -0,0 +1,205 @@
+import random
+import threading
+from collections import deque
+from itertools import permutations
+
+from bitgrid import BitGrid
+
+# ---------------------- 可達性 ----------------------
+_DIRS = [(1,0), (-1,0), (0,1), (0,-1)]
+_DIR_ORDERS = list(permutations(_DIRS))
+
+_scratch = threading.local()  # 每個執行緒重複使用的 visited（不再每次配置 list of lists）
+
+def _visited(rows, cols, packed):
+    # packed：一格一個 bit 的 BitGrid；否則每列一個 bytearray（一格一個 byte，
+    # 在 Python 裡查起來和 list of lists 一樣快），每次只把內容清成 0
+    key = (rows, cols, packed)
+    if getattr(_scratch, 'key', None) != key:
+        _scratch.key = key
+        _scratch.zero = bytes(cols)
+        _scratch.grid = BitGrid(rows, cols) if packed else [bytearray(cols) for _ in range(rows)]
+    elif packed:
+        _scratch.grid.clear()
+    else:
+        zero = _scratch.zero
+        for row in _scratch.grid:
+            row[:] = zero
+    return _scratch.grid
+
+def is_reachable(maze, startX, startY, endX, endY, graph=None):
+    # graph：這張迷宮的 hpa.HierarchicalMap（大迷宮建關時就有）；有的話只搜起點、終點兩塊，
+    # 它的 blocked 格也算牆
+    if graph is not None:
+        return graph.is_reachable((startX, startY), (endX, endY))
+    if isinstance(maze, BitGrid):
+        return _is_reachable_packed(maze, startX, startY, endX, endY)
+    rows, cols = len(maze), len(maze[0])
+    visited = _visited(rows, cols, False)
+    queue = deque([(startX, startY)])
+    visited[startX][startY] = 1
+    while queue:
+        x, y = queue.popleft()
+        if x == endX and y == endY:
+            return True
+        for dx, dy in _DIRS:
+            nx, ny = x+dx, y+dy
+            if 0<=nx<rows and 0<=ny<cols and not visited[nx][ny] and maze[nx][ny]==0:
+                visited[nx][ny] = 1
+                queue.append((nx, ny))
+    return False
+
+def _is_reachable_packed(maze, startX, startY, endX, endY):
+    # 牆與 visited 都是同樣大小的 BitGrid，共用同一個 flat bit index
+    rows, cols = maze.rows, maze.cols
+    walls, stride = maze.bits, maze.stride
+    seen = _visited(rows, cols, True).bits
+    i = startX*stride + startY
+    seen[i >> 3] |= 128 >> (i & 7)
+    queue = deque([(startX, startY)])
+    while queue:
+        x, y = queue.popleft()
+        if x == endX and y == endY:
+            return True
+        for dx, dy in _DIRS:
+            nx, ny = x+dx, y+dy
+            if 0<=nx<rows and 0<=ny<cols:
+                i = nx*stride + ny
+                byte, mask = i >> 3, 128 >> (i & 7)
+                if not (seen[byte] | walls[byte]) & mask:
+                    seen[byte] |= mask
+                    queue.append((nx, ny))
+    return False
+
+class ReachField:
+    """Floor cells connected to `source`, kept up to date as walls are opened.
+
+    The field is flooded once; open_cell() only floods the cells that the
+    opened wall newly connects, so each cell is visited O(1) times in total.
+    A BitGrid maze gets a BitGrid field, so memory stays at one bit per cell.
+    """
+
+    def __init__(self, maze, source=(1, 1)):
+        self.maze = maze
+        self.rows, self.cols = len(maze), len(maze[0])
+        self.packed = isinstance(maze, BitGrid)
+        self.reached = BitGrid(self.rows, self.cols) if self.packed else bytearray(self.rows * self.cols)
+        if maze[source[0]][source[1]] == 0:
+            self._flood(source)
+
+    def is_reached(self, r, c):
+        if self.packed:
+            return self.reached.get(r, c) == 1
+        return self.reached[r*self.cols + c] == 1
+
+    def _flood(self, start):
+        if self.packed:
+            return self._flood_packed(start)
+        maze, reached = self.maze, self.reached
+        rows, cols = self.rows, self.cols
+        reached[start[0]*cols + start[1]] = 1
+        queue = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for dx, dy in _DIRS:
+                nx, ny = x+dx, y+dy
+                if 0<=nx<rows and 0<=ny<cols and not reached[nx*cols + ny] and maze[nx][ny]==0:
+                    reached[nx*cols + ny] = 1
+                    queue.append((nx, ny))
+
+    def _flood_packed(self, start):
+        walls, reached = self.maze.bits, self.reached.bits
+        rows, cols, stride = self.rows, self.cols, self.maze.stride
+        i = start[0]*stride + start[1]
+        reached[i >> 3] |= 128 >> (i & 7)
+        queue = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for dx, dy in _DIRS:
+                nx, ny = x+dx, y+dy
+                if 0<=nx<rows and 0<=ny<cols:
+                    i = nx*stride + ny
+                    byte, mask = i >> 3, 128 >> (i & 7)
+                    if not (reached[byte] | walls[byte]) & mask:
+                        reached[byte] |= mask
+                        queue.append((nx, ny))
+
+    def open_cell(self, r, c):
+        # 打掉一面牆；若它接上已連通的區域，就把新接上的地面一起標記
+        self.maze[r][c] = 0
+        if self.is_reached(r, c):
+            return
+        for dr, dc in _DIRS:
+            nr, nc = r+dr, c+dc
+            if 0<=nr<self.rows and 0<=nc<self.cols and self.is_reached(nr, nc):
+                self._flood((r, c))
+                return
+
+    def tunnel_to(self, r, c, rng=None):
+        """Fewest interior walls to open so (r, c) joins the field (0-1 BFS)."""
+        if rng is None:
+            rng = random
+        rand = rng.random
+        rows, cols = self.rows, self.cols
+        maze, is_reached = self.maze, self.is_reached
+        unseen = rows * cols
+        dist = [unseen] * (rows * cols)
+        parent = [-1] * (rows * cols)
+        dist[r*cols + c] = 0
+        queue = deque([(0, r, c)])
+        while queue:
+            d, x, y = queue.popleft()
+            i = x*cols + y
+            if d > dist[i]:
+                continue
+            if is_reached(x, y):
+                # 沿著 parent 走回去，收集路上的牆
+                walls = []
+                while i != -1:
+                    wr, wc = divmod(i, cols)
+                    if maze[wr][wc] != 0:
+                        walls.append((wr, wc))
+                    i = parent[i]
+                return walls
+            for dx, dy in _DIR_ORDERS[int(rand() * 24)]:
+                nx, ny = x+dx, y+dy
+                if not (0 < nx < rows-1 and 0 < ny < cols-1):
+                    continue
+                # 走地面不用打牆，穿過牆成本 +1
+                wall = maze[nx][ny] != 0
+                nd = d + wall
+                j = nx*cols + ny
+                if nd < dist[j]:
+                    dist[j] = nd
+                    parent[j] = i
+                    if wall:
+                        queue.append((nd, nx, ny))
+                    else:
+                        queue.appendleft((nd, nx, ny))
+        return []
+
+def ensure_exit_reachable(maze, rng=None, on_change=None):
+    # 出口固定在右下角；若與起點不連通，打通最少的牆，回傳 exit_pos
+    # on_change(cells)：通知打開的格子（同 add_extra_paths）
+    rows, cols = len(maze), len(maze[0])
+    exit_pos = {'x': rows-2, 'y': cols-2}
+    field = ReachField(maze, (1, 1))
+    opened = [(exit_pos['x'], exit_pos['y'])]
+    field.open_cell(*opened[0])
+    if not field.is_reached(exit_pos['x'], exit_pos['y']):
+        for r, c in field.tunnel_to(exit_pos['x'], exit_pos['y'], rng):
+            field.open_cell(r, c)
+            opened.append((r, c))
+    if on_change is not None:
+        on_change(opened)
+    return exit_pos
+
+def link_exit(maze):
+    # 給 eller_rows 這種「奇數座標的格子全部連通」的迷宮用：不必搜尋，
+    # 從出口往上、往左打通到最近的奇數座標格子（最多兩格），O(1)
+    rows, cols = len(maze), len(maze[0])
+    er, ec = rows-2, cols-2
+    r, c = er - (1 - er % 2), ec - (1 - ec % 2)
+    for x, y in ((er, ec), (r, ec), (r, c)):
+        maze[x][y] = 0
+    return {'x': er, 'y': ec}
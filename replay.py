@@ -0,0 +1,221 @@
+import copy
+import json
+import sys
+import time
+from bisect import bisect_right
+
+from game import MazeGame
+from mazebank import MazeBank
+from swarm import QuizSwarm
+
+# ---------------------- 輸入紀錄與重播 ----------------------
+# MazeGame 的亂數都來自自己的 seed，時間也只由 tick(dt) 推進，所以
+# 「seed + 依序的輸入（按鍵、作答、每幀的 dt）」就能完整重現一局。
+#
+# 紀錄檔是純文字：第一行是標頭（建立 MazeGame 的參數），之後每行一筆輸入：
+#   u d l r   方向鍵          R   重來
+#   i"..."    輸入文字        b   倒退鍵
+#   s / s"."  送出答案        m   關閉訊息
+#   t16,17,16*40              連續的 tick(dt)，"*n" 表示重複 n 次
+
+MAGIC = "#maze-replay 2 "  # 2: level layouts use their own seed stream (levels.py)
+
+_CODES = {
+    'up': 'u', 'down': 'd', 'left': 'l', 'right': 'r', 'restart': 'R',
+    'text': 'i', 'backspace': 'b', 'submit': 's', 'dismiss': 'm', 'tick': 't',
+}
+_OPS = {code: op for op, code in _CODES.items()}
+
+class InputLog:
+    """Seed + ordered inputs of one session; attach as MazeGame.recorder."""
+
+    def __init__(self, header):
+        self.header = header
+        self.events = []  # [(op, arg), ...]
+
+    @classmethod
+    def for_game(cls, game):
+        # 在 generate_maze() 之前或剛產生第一張迷宮時建立：重播會從同一個 seed 重來
+        return cls({
+            'seed': game.seed, 'rows': game.rows, 'cols': game.cols, 'level': game.level,
+            'use_numpy': game.use_numpy, 'quiz_count': game.quiz_count,
+            'vectorized': game.quiz_monsters.vectorized,
+            'bank': game.bank.path if game.bank is not None else None,
+            'packed': game.packed,
+            'chunked': game.chunked,
+            'chase': game.chase,
+        })
+
+    def record(self, op, arg=None):
+        self.events.append((op, arg))
+
+    def duration(self):
+        return sum(arg for op, arg in self.events if op == 'tick')
+
+    def dumps(self):
+        lines = [MAGIC + json.dumps(self.header, sort_keys=True)]
+        ticks = []  # [[dt, count], ...] of the current tick run
+
+        def flush():
+            if ticks:
+                lines.append('t' + ','.join(str(dt) if n == 1 else "%d*%d" % (dt, n) for dt, n in ticks))
+                ticks.clear()
+
+        for op, arg in self.events:
+            if op == 'tick':
+                if ticks and ticks[-1][0] == arg:
+                    ticks[-1][1] += 1
+                else:
+                    ticks.append([arg, 1])
+                continue
+            flush()
+            code = _CODES[op]
+            lines.append(code if arg is None else code + json.dumps(arg, ensure_ascii=False))
+        flush()
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def loads(cls, text):
+        lines = text.splitlines()
+        if not lines or not lines[0].startswith(MAGIC):
+            raise ValueError("not a maze replay log")
+        log = cls(json.loads(lines[0][len(MAGIC):]))
+        for line in lines[1:]:
+            if not line:
+                continue
+            op = _OPS.get(line[0])
+            if op is None:
+                raise ValueError("unknown replay record: %r" % line)
+            if op == 'tick':
+                for token in line[1:].split(','):
+                    dt, _, n = token.partition('*')
+                    log.events.extend([('tick', int(dt))] * (int(n) if n else 1))
+            else:
+                log.events.append((op, json.loads(line[1:]) if len(line) > 1 else None))
+        return log
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.loads(f.read())
+
+def new_game(log):
+    """A MazeGame in the state the recorded session started from."""
+    h = log.header
+    bank = MazeBank(h['bank']) if h.get('bank') else None
+    game = MazeGame(h['rows'], h['cols'], level=h['level'], use_numpy=h['use_numpy'],
+                    quiz_count=h['quiz_count'], seed=h['seed'], bank=bank,
+                    packed=h.get('packed', False), chunked=h.get('chunked', False),
+                    chase=h.get('chase', False))
+    # 向量化與純 Python 的怪物移動用不同的亂數流，重播時要用同一種
+    game.quiz_monsters = QuizSwarm(vectorized=h['vectorized'])
+    game.generate_maze()
+    return game
+
+def apply_event(game, op, arg):
+    if op == 'tick':
+        game.tick(arg)
+    elif op == 'text':
+        game.type_text(arg)
+    elif op == 'backspace':
+        game.backspace()
+    elif op == 'submit':
+        game.submit_answer(arg)
+    elif op == 'dismiss':
+        game.dismiss_message()
+    else:
+        game.step(op)
+
+class Replayer:
+    """Re-simulates an InputLog without waiting for real time.
+
+    While simulating forward it keeps a deep copy of the game every
+    `keyframe_interval` ms of game time; seek(t) restores the nearest
+    keyframe at or before t and only re-simulates the rest.
+    """
+
+    def __init__(self, log, keyframe_interval=5000):
+        self.log = log
+        self.keyframe_interval = keyframe_interval
+        self.game = new_game(log)
+        self.pos = 0  # index of the next event to apply
+        self.keyframes = []  # [(game time, event index, snapshot)], sorted
+        self._keyframe_times = []
+        self._keyframe()
+
+    def done(self):
+        return self.pos >= len(self.log.events)
+
+    def _snapshot(self):
+        game = self.game
+        on_explore, recorder = game.on_explore, game.recorder
+        game.on_explore = game.recorder = None
+        try:
+            return copy.deepcopy(game)
+        finally:
+            game.on_explore, game.recorder = on_explore, recorder
+
+    def _keyframe(self):
+        self.keyframes.append((self.game.time, self.pos, self._snapshot()))
+        self._keyframe_times.append(self.game.time)
+
+    def advance_to(self, t):
+        """Apply events until the next tick would pass game time `t`."""
+        game, events = self.game, self.log.events
+        while self.pos < len(events):
+            op, arg = events[self.pos]
+            if op == 'tick' and game.time + arg > t:
+                break
+            apply_event(game, op, arg)
+            self.pos += 1
+            # 只在第一次模擬到這裡時記 keyframe（倒帶後重跑的部分已經有了）
+            if op == 'tick' and self.pos > self.keyframes[-1][1] \
+                    and game.time - self.keyframes[-1][0] >= self.keyframe_interval:
+                self._keyframe()
+        return game
+
+    def run(self):
+        return self.advance_to(float('inf'))
+
+    def seek(self, t):
+        """Game state at time `t`; restores a keyframe instead of replaying from 0."""
+        k = bisect_right(self._keyframe_times, t) - 1
+        kf_time, kf_pos, snapshot = self.keyframes[max(k, 0)]
+        # 往前跳不遠（目前的位置比最近的 keyframe 更接近）就直接繼續跑
+        if not (kf_pos <= self.pos and self.game.time <= t):
+            on_explore = self.game.on_explore
+            self.game = copy.deepcopy(snapshot)
+            self.game.on_explore = on_explore
+            self.pos = kf_pos
+        return self.advance_to(t)
+
+def main(argv=None):
+    # python replay.py session.log [seek_ms]：全速重播並回報速度
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python replay.py LOG [SEEK_MS]")
+        return 2
+    log = InputLog.load(argv[0])
+    replayer = Replayer(log)
+    start = time.perf_counter()
+    game = replayer.run()
+    elapsed = time.perf_counter() - start
+    game_ms = log.duration()
+    print("%d inputs, %.1f s of game time replayed in %.3f s (%.0fx real time), %d keyframes"
+          % (len(log.events), game_ms / 1000, elapsed, game_ms / 1000 / max(elapsed, 1e-9), len(replayer.keyframes)))
+    print("end: level %d, player (%d, %d), finished %s"
+          % (game.level, game.player['x'], game.player['y'], game.finished))
+    if len(argv) > 1:
+        t = int(argv[1])
+        start = time.perf_counter()
+        game = replayer.seek(t)
+        print("seek to %d ms in %.3f s: level %d, player (%d, %d)"
+              % (t, time.perf_counter() - start, game.level, game.player['x'], game.player['y']))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import random
+
+from grid import np, as_array
+
+# ---------------------- 題庫怪物群 ----------------------
+# 位置用 struct-of-arrays 存（NumPy 有裝時是 int32 陣列），每 0.5 秒一次把所有怪物
+# 一起往隨機的合法方向走一步，並在同一批裡找出撞到玩家的怪物。
+# 另外維護每格的怪物數量，讓「這格有沒有問答怪」是 O(1) 查詢。
+# 追人模式：step() 多給一個以玩家為中心的 flowfield.DistanceField，在範圍內的怪物
+# 改沿著距離場朝玩家走一步（每隻 O(1)），其他照常亂走。
+
+_DR = (1, -1, 0, 0)
+_DC = (0, 0, 1, -1)
+
+class QuizSwarm:
+    """All quiz monsters of a level: positions, per-monster question/answer, cell counts."""
+
+    def __init__(self, vectorized=None):
+        # vectorized=None：有 NumPy 就用陣列版本
+        self.vectorized = np is not None if vectorized is None else vectorized
+        self.rows = self.cols = 0
+        self._walkable = None
+        self._rng = None
+        self._py_rng = random
+        self.clear()
+
+    def __len__(self):
+        return len(self.question)
+
+    def reset(self, maze, cells, forbidden=(1, 1), rng=None):
+        """New level: place monsters on `cells`; they never step on `forbidden` (the start).
+
+        Movement randomness is drawn from `rng` (a random.Random; the random
+        module if None), so a seeded game moves its monsters the same way.
+        """
+        if rng is None:
+            rng = random
+        self._py_rng = rng
+        self.rows, self.cols = len(maze), len(maze[0])
+        self._forbidden = forbidden
+        n = len(cells)
+        self.question = [None] * n
+        self.answer = [None] * n
+        rs = [r for r, _ in cells]
+        cs = [c for _, c in cells]
+        if self.vectorized:
+            self.pos_r = np.array(rs, dtype=np.int32)
+            self.pos_c = np.array(cs, dtype=np.int32)
+            # 外圍補一圈牆，移動時就不用檢查邊界
+            walkable = np.zeros((self.rows + 2, self.cols + 2), dtype=bool)
+            walkable[1:-1, 1:-1] = as_array(maze) == 0
+            walkable[forbidden[0] + 1, forbidden[1] + 1] = False
+            self._walkable = walkable
+            self._counts = np.zeros((self.rows, self.cols), dtype=np.int32)
+            self._bump(self.pos_r, self.pos_c, 1)
+            self._rng = np.random.default_rng(rng.getrandbits(64))
+        else:
+            self.pos_r, self.pos_c = rs, cs
+            self._maze = maze
+            self._counts = {}
+            for cell in cells:
+                self._counts[cell] = self._counts.get(cell, 0) + 1
+
+    def clear(self):
+        self.question, self.answer = [], []  # question is None until the monster is triggered
+        if self.vectorized:
+            self.pos_r = np.zeros(0, dtype=np.int32)
+            self.pos_c = np.zeros(0, dtype=np.int32)
+            self._counts = np.zeros((self.rows, self.cols), dtype=np.int32)
+        else:
+            self.pos_r, self.pos_c = [], []
+            self._counts = {}
+
+    def _bump(self, r, c, delta):
+        # 同一格可能有多隻：先合併重複的格子再加減（比 np.add.at 快）
+        cells, n = np.unique(r * self.cols + c, return_counts=True)
+        self._counts.ravel()[cells] += delta * n.astype(np.int32)
+
+    def pos(self, i):
+        return (int(self.pos_r[i]), int(self.pos_c[i]))
+
+    def cells(self):
+        return [(int(r), int(c)) for r, c in zip(self.pos_r, self.pos_c)]
+
+    def cells_in(self, r0, c0, r1, c1):
+        """Cells of monsters inside rows [r0, r1) and cols [c0, c1) (the camera view)."""
+        if self.vectorized:
+            r, c = self.pos_r, self.pos_c
+            inside = np.flatnonzero((r >= r0) & (r < r1) & (c >= c0) & (c < c1))
+            return [(int(r[i]), int(c[i])) for i in inside]
+        return [(r, c) for r, c in zip(self.pos_r, self.pos_c) if r0 <= r < r1 and c0 <= c < c1]
+
+    def count_at(self, cell):
+        r, c = cell
+        if self.vectorized:
+            if 0 <= r < self.rows and 0 <= c < self.cols:
+                return int(self._counts[r, c])
+            return 0
+        return self._counts.get(cell, 0)
+
+    def find(self, cell):
+        """Index of the first monster on `cell`, or None."""
+        if not self.count_at(cell):
+            return None
+        if self.vectorized:
+            return int(np.flatnonzero((self.pos_r == cell[0]) & (self.pos_c == cell[1]))[0])
+        for i in range(len(self.question)):
+            if (self.pos_r[i], self.pos_c[i]) == cell:
+                return i
+        return None
+
+    def remove(self, i):
+        cell = self.pos(i)
+        self._counts[cell] -= 1
+        if self.vectorized:
+            self.pos_r = np.delete(self.pos_r, i)
+            self.pos_c = np.delete(self.pos_c, i)
+        else:
+            if not self._counts[cell]:
+                del self._counts[cell]
+            del self.pos_r[i]
+            del self.pos_c[i]
+        del self.question[i]
+        del self.answer[i]
+
+    def _chase_step(self, field, r, c):
+        # 距離場上往玩家走的下一格；不在範圍內或下一格是起點就 None（改成亂走）
+        step = field.next_step(r, c)
+        if step is None or step == self._forbidden:
+            return None
+        return step
+
+    def step(self, player, field=None):
+        """Move every monster one step; return the first index now on `player`.
+
+        Monsters move to a random legal neighbour, except that with a
+        DistanceField centred on the player (`field`) those it reaches follow
+        it one step toward the player instead.
+        """
+        if not len(self):
+            return None
+        if not self.vectorized:
+            return self._step_loop(player, field)
+        r, c = self.pos_r, self.pos_c
+        nr = r[:, None] + np.array(_DR, dtype=np.int32)
+        nc = c[:, None] + np.array(_DC, dtype=np.int32)
+        ok = self._walkable[nr + 1, nc + 1]
+        # 在合法方向中均勻挑一個：隨機分數，非法方向設為 -1，取最大
+        keys = self._rng.random(ok.shape)
+        keys[~ok] = -1.0
+        pick = keys.argmax(axis=1)
+        moving = np.flatnonzero(ok.any(axis=1))
+        if field is not None:
+            # 先照常抽亂走的方向（亂數流不變），再把追得到玩家的怪物改成沿距離場走
+            new_r, new_c = r.copy(), c.copy()
+            new_r[moving] = nr[moving, pick[moving]]
+            new_c[moving] = nc[moving, pick[moving]]
+            near = range(len(r))
+            if field.radius is not None:
+                # 曼哈頓距離超過半徑的一定不在距離場裡，不用逐隻查
+                near = np.flatnonzero(np.abs(r - player[0]) + np.abs(c - player[1]) <= field.radius)
+            for i in near:
+                step = self._chase_step(field, int(r[i]), int(c[i]))
+                if step is not None:
+                    new_r[i], new_c[i] = step
+            self._bump(r, c, -1)
+            self.pos_r, self.pos_c = r, c = new_r, new_c
+            self._bump(r, c, 1)
+        elif len(moving):
+            self._bump(r[moving], c[moving], -1)
+            r[moving] = nr[moving, pick[moving]]
+            c[moving] = nc[moving, pick[moving]]
+            self._bump(r[moving], c[moving], 1)
+        hits = np.flatnonzero((r == player[0]) & (c == player[1]))
+        return int(hits[0]) if len(hits) else None
+
+    def _step_loop(self, player, field=None):
+        maze, forbidden = self._maze, self._forbidden
+        shuffle = self._py_rng.shuffle
+        hit = None
+        for i in range(len(self.question)):
+            dirs = list(zip(_DR, _DC))
+            shuffle(dirs)
+            step = None if field is None else self._chase_step(field, self.pos_r[i], self.pos_c[i])
+            if step is not None:
+                dirs = [(step[0] - self.pos_r[i], step[1] - self.pos_c[i])]
+            for dr, dc in dirs:
+                nr, nc = self.pos_r[i] + dr, self.pos_c[i] + dc
+                # cannot move out of bounds, into wall, or into start (1,1)
+                if 0 <= nr < self.rows and 0 <= nc < self.cols and maze[nr][nc] == 0 and (nr, nc) != forbidden:
+                    old = (self.pos_r[i], self.pos_c[i])
+                    self._counts[old] -= 1
+                    if not self._counts[old]:
+                        del self._counts[old]
+                    self._counts[(nr, nc)] = self._counts.get((nr, nc), 0) + 1
+                    self.pos_r[i], self.pos_c[i] = nr, nc
+                    break
+            if hit is None and (self.pos_r[i], self.pos_c[i]) == player:
+                hit = i
+        return hit
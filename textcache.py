@@ -0,0 +1,61 @@
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate
+
+# ---------------------- 文字渲染快取 ----------------------
+# font.render 很貴，而畫面上的文字（勝利、訊息、題目、作答）幾乎每幀都一樣，
+# 所以把算好的 Surface 以 (font, text, color) 為鍵存進 LRU 快取。
+
+class TextCache:
+    """LRU cache of rendered text surfaces and of 'fit the tail' cuts."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._surfaces = OrderedDict()
+        self._tails = OrderedDict()
+        self._advance = {}  # (font, ch) -> glyph advance in px
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return value
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+        return self._remember(self._surfaces, key, font.render(text, antialias, color))
+
+    def glyph_advance(self, font, ch):
+        key = (font, ch)
+        adv = self._advance.get(key)
+        if adv is None:
+            metrics = font.metrics(ch)
+            # 字型缺字時 metrics 會是 None，改用 font.size 量
+            adv = metrics[0][4] if metrics and metrics[0] else font.size(ch)[0]
+            self._advance[key] = adv
+        return adv
+
+    def fit_tail(self, font, text, max_width):
+        """Longest suffix of `text` whose width fits in `max_width` px.
+
+        Widths come from per-glyph advances with prefix sums, so finding
+        the cut is one pass plus a binary search instead of one render per
+        candidate suffix; the result is cached per (font, text, width).
+        """
+        key = (font, text, max_width)
+        tail = self._tails.get(key)
+        if tail is not None:
+            self._tails.move_to_end(key)
+            return tail
+        prefix = [0] + list(accumulate(self.glyph_advance(font, ch) for ch in text))
+        total = prefix[-1]
+        # 最小的 k 使得 text[k:] 的寬度 total - prefix[k] <= max_width
+        k = bisect_left(prefix, total - max_width)
+        # 字距與字形外擴會讓實際寬度略大於 advance 總和，用 font.size 再修正一兩格
+        while k < len(text) and font.size(text[k:])[0] > max_width:
+            k += 1
+        return self._remember(self._tails, key, text[k:])